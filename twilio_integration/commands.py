@@ -0,0 +1,40 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("whatsapp-dispatcher")
+@pass_context
+def whatsapp_dispatcher(context):
+	"""Send queued WhatsApp messages as soon as they are queued"""
+	from twilio_integration.twilio_integration.dispatcher import run_dispatcher
+
+	run_dispatcher(get_site(context))
+
+
+@click.command("whatsapp-benchmark")
+@click.option("--provider", type=click.Choice(["Twilio", "Freshchat", "Genesys"]), default="Twilio")
+@click.option("--messages", type=int, default=100, help="Messages sent in each stage")
+@click.option("--latency", type=float, default=0.05, help="Seconds the fake provider takes to respond")
+@click.option("--latency-jitter", type=float, default=0, help="Up to this many seconds are added to the latency")
+@click.option("--error-rate", type=float, default=0, help="Fraction of provider requests failing with 500")
+@click.option("--rate-limit-rate", type=float, default=0, help="Fraction of provider requests failing with 429")
+@click.option("--force", is_flag=True, default=False, help="Run on a site without developer mode")
+@pass_context
+def whatsapp_benchmark(context, provider, messages, latency, latency_jitter, error_rate, rate_limit_rate, force):
+	"""Measure WhatsApp sends, flush, reconciliation and status webhooks against a fake provider.
+	Changes are rolled back, runs only in developer mode unless forced."""
+	import frappe
+	from twilio_integration.twilio_integration.benchmark import format_results, run_benchmark
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+	try:
+		frappe.set_user("Administrator")
+		benchmark = run_benchmark(provider=provider, messages=messages, latency=latency,
+			latency_jitter=latency_jitter, error_rate=error_rate, rate_limit_rate=rate_limit_rate, force=force)
+		click.echo(format_results(benchmark))
+	finally:
+		frappe.destroy()
+
+
+commands = [whatsapp_dispatcher, whatsapp_benchmark]
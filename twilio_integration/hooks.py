@@ -16,8 +16,11 @@ override_whitelisted_methods = {
 	"twilio.incoming_whatsapp_message_handler": "twilio_integration.twilio_integration.api.incoming_whatsapp_message_handler",
 	"twilio.whatsapp_media": "twilio_integration.twilio_integration.api.download_whatsapp_media",
 	"twilio.whatsapp_message_status_callback": "twilio_integration.twilio_integration.api.whatsapp_message_status_callback",
+	"whatsapp.freshchat_status_callback": "twilio_integration.twilio_integration.api.freshchat_whatsapp_status_callback",
+	"whatsapp.genesys_status_callback": "twilio_integration.twilio_integration.api.genesys_whatsapp_status_callback",
 	"whatsapp.secure_whatsapp_media": "twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.secure_whatsapp_media",
 	"whatsapp.secure_whatsapp_media.pdf": "twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.secure_whatsapp_media",
+	"whatsapp.metrics": "twilio_integration.twilio_integration.metrics.prometheus_metrics",
 	# "twilio.webhook_sink_handler": "twilio_integration.twilio_integration.api.whatsapp_message_status_callback",
 }
 
@@ -38,6 +41,18 @@ doctype_js = {
 	# "Voice Call Settings": "public/js/voice_call_settings.js"
 }
 
+doc_events = {
+	"Voice Call Settings": {
+		"on_update": "twilio_integration.twilio_integration.twilio_handler.clear_voice_routing_table",
+		"on_trash": "twilio_integration.twilio_integration.twilio_handler.clear_voice_routing_table",
+	},
+	"User": {
+		"on_update": "twilio_integration.twilio_integration.twilio_handler.clear_voice_routing_table",
+		"on_trash": "twilio_integration.twilio_integration.twilio_handler.clear_voice_routing_table",
+		"after_rename": "twilio_integration.twilio_integration.twilio_handler.clear_voice_routing_table",
+	},
+}
+
 fixtures = [
 	{
 		"dt": "Custom Field",
@@ -49,6 +64,10 @@ fixtures = [
 				"Notification-custom_column_break_nckpb",
 				"Notification-whatsapp_reply_handler",
 				"Notification-whatsapp_provider",
+				"Call Log-twilio_recording_sid",
+				"Call Log-twilio_recording_status",
+				"Call Log-twilio_recording_retry",
+				"Notification-whatsapp_lane",
 			]]
 		}
 	},
@@ -66,10 +85,15 @@ fixtures = [
 scheduler_events = {
 	"all": [
 		"twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.flush_outgoing_message_queue",
+		"twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.flush_outgoing_media_queue",
+		"twilio_integration.twilio_integration.call_log.flush_call_log_queue",
+		"twilio_integration.twilio_integration.message_rollup.flush_message_rollups",
 	],
 	"hourly_long": [
 		"twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.update_messages_pending_status_reconciliation",
 		"twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.flush_incoming_media_queue",
+		"twilio_integration.twilio_integration.doctype.twilio_content_template.twilio_content_template.sync_twilio_content_templates",
+		"twilio_integration.twilio_integration.call_recording.flush_call_recording_queue",
 	],
 	"daily": [
 		"twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.expire_whatsapp_message_queue",
@@ -77,3 +101,7 @@ scheduler_events = {
 }
 
 page_renderer = "twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.WhatsAppMediaRenderer"
+
+default_log_clearing_doctypes = {
+	"WhatsApp Slow Trace": 30,
+}
@@ -130,6 +130,7 @@ class NotificationTwilio(Notification):
 			automated=True,
 			attachment=attachments[0] if attachments else None,
 			now=False,
+			lane=self.get("whatsapp_lane"),
 		)
 
 
@@ -0,0 +1,53 @@
+import frappe
+from twilio_integration.twilio_integration.doctype.whatsapp_conversation.whatsapp_conversation import (
+	PREVIEW_LENGTH,
+	get_or_create_conversation,
+)
+
+
+def execute():
+	pairs = frappe.db.sql("""
+		select
+			if(sent_received = 'Received', `to`, from_) as business_number,
+			if(sent_received = 'Received', from_, `to`) as customer_number,
+			count(*) as message_count
+		from `tabWhatsApp Message`
+		where conversation is null and from_ is not null and `to` is not null
+		group by business_number, customer_number
+	""", as_dict=True)
+
+	for i, pair in enumerate(pairs):
+		pair.conversation = get_or_create_conversation(pair.business_number, pair.customer_number)
+		if i % 100 == 0:
+			frappe.db.commit()
+
+	frappe.db.sql("""
+		update `tabWhatsApp Message` message
+		join `tabWhatsApp Conversation` conversation
+			on conversation.business_number = if(message.sent_received = 'Received', message.`to`, message.from_)
+			and conversation.customer_number = if(message.sent_received = 'Received', message.from_, message.`to`)
+		set message.conversation = conversation.name
+		where message.conversation is null
+	""")
+	frappe.db.commit()
+
+	for i, pair in enumerate(pairs):
+		conversation = pair.conversation
+		last_message = frappe.db.get_value("WhatsApp Message", {"conversation": conversation},
+			["name", "date_sent", "creation", "message", "sent_received", "status", "party_doctype", "party"],
+			as_dict=True, order_by="creation desc")
+
+		if last_message:
+			frappe.db.set_value("WhatsApp Conversation", conversation, {
+				"last_message": last_message.name,
+				"last_message_at": last_message.date_sent or last_message.creation,
+				"last_message_preview": (last_message.message or "")[:PREVIEW_LENGTH],
+				"last_direction": last_message.sent_received,
+				"last_status": last_message.status,
+				"party_doctype": last_message.party_doctype,
+				"party": last_message.party,
+				"message_count": pair.message_count,
+			}, update_modified=False)
+
+		if i % 100 == 0:
+			frappe.db.commit()
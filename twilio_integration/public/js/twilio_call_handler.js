@@ -2,6 +2,7 @@ var onload_script = function() {
 	frappe.provide('frappe.phone_call');
 	frappe.provide('frappe.twilio_conn_dialog_map')
 	let device;
+	let presence_heartbeat;
 
 	if (frappe.boot.twilio_enabled){
 		frappe.run_serially([
@@ -24,6 +25,12 @@ var onload_script = function() {
 					Object.values(frappe.twilio_conn_dialog_map).forEach(function(popup){
 						popup.set_header('available');
 					})
+					start_presence_heartbeat();
+				});
+
+				device.on("offline", function () {
+					stop_presence_heartbeat();
+					refresh_device_token();
 				});
 
 				device.on("error", function (error) {
@@ -36,6 +43,7 @@ var onload_script = function() {
 
 				device.on("disconnect", function (conn) {
 					update_call_log(conn);
+					update_presence(get_presence_status());
 					const popup = frappe.twilio_conn_dialog_map[conn];
 					// Reomove the connection from map object
 					delete frappe.twilio_conn_dialog_map[conn]
@@ -60,6 +68,7 @@ var onload_script = function() {
 				});
 
 				device.on("connect", function (conn) {
+					update_presence("busy");
 					const popup = frappe.twilio_conn_dialog_map[conn];
 					popup.setup_mute_button(conn);
 					popup.dialog.set_secondary_action_label("Hang Up")
@@ -88,6 +97,47 @@ var onload_script = function() {
 		});
 	}
 
+	function refresh_device_token() {
+		// Device goes offline when its token expires, setup again with a fresh token
+		frappe.call({
+			method: "twilio_integration.twilio_integration.api.generate_access_token",
+			callback: (data) => {
+				if (data.message && data.message.token) {
+					device.setup(data.message.token, {
+						codecPreferences: ["opus", "pcmu"],
+						fakeLocalDTMF: true,
+						enableRingingState: true,
+					});
+				}
+			}
+		});
+	}
+
+	function get_presence_status() {
+		return device && device.activeConnection() ? "busy" : "available";
+	}
+
+	function update_presence(status) {
+		frappe.call({
+			method: "twilio_integration.twilio_integration.api.update_agent_presence",
+			args: {
+				"status": status
+			}
+		});
+	}
+
+	function start_presence_heartbeat() {
+		// Presence expires on the server if heartbeats stop, e.g. when the tab is closed
+		clearInterval(presence_heartbeat);
+		update_presence(get_presence_status());
+		presence_heartbeat = setInterval(() => update_presence(get_presence_status()), 30000);
+	}
+
+	function stop_presence_heartbeat() {
+		clearInterval(presence_heartbeat);
+		update_presence("offline");
+	}
+
 	function dialer_screen() {
 		frappe.phone_call.handler = (to_number, frm) => {
 			let to_numbers;
@@ -4,10 +4,22 @@ import frappe
 from frappe import _
 from frappe.utils import cstr
 from frappe.contacts.doctype.contact.contact import get_contact_with_phone_number
-from .twilio_handler import Twilio, IncomingCall, TwilioCallDetails, validate_twilio_request
+from .twilio_handler import (
+	Twilio,
+	IncomingCall,
+	TwilioCallDetails,
+	validate_twilio_request,
+	set_agent_presence,
+	set_agent_last_busy,
+	get_user_twilio_number,
+)
+from .call_log import queue_call_log_update
+from .profiling import slow_trace
 from twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message import (
 	incoming_message_callback,
 	outgoing_message_status_callback,
+	freshchat_status_callback,
+	genesys_status_callback,
 	serve_whatsapp_media,
 )
 from twilio.twiml.messaging_response import MessagingResponse
@@ -27,7 +39,7 @@ def generate_access_token():
 	if not twilio:
 		return {}
 
-	from_number = frappe.db.get_value('Voice Call Settings', frappe.session.user, 'twilio_number')
+	from_number = get_user_twilio_number(frappe.session.user)
 	if not from_number:
 		return {
 			"ok": False,
@@ -35,12 +47,19 @@ def generate_access_token():
 			"detail": "Phone number is not mapped to the caller"
 		}
 
-	token=twilio.generate_voice_access_token(from_number=from_number, identity=frappe.session.user)
+	token = twilio.get_voice_access_token(from_number=from_number, identity=frappe.session.user)
 	return {
-		'token': frappe.safe_decode(token)
+		'token': token
 	}
 
 
+@frappe.whitelist()
+def update_agent_presence(status="available"):
+	"""Heartbeat from the browser softphone, marks the user available, busy (on a call) or offline for incoming calls.
+	"""
+	set_agent_presence(frappe.session.user, status)
+
+
 @frappe.whitelist(allow_guest=True)
 @validate_twilio_request
 def voice(**kwargs):
@@ -49,7 +68,7 @@ def voice(**kwargs):
 	def _get_caller_number(caller):
 		identity = caller.replace('client:', '').strip()
 		user = Twilio.emailid_from_identity(identity)
-		return frappe.db.get_value('Voice Call Settings', user, 'twilio_number')
+		return get_user_twilio_number(user)
 
 	args = frappe._dict(kwargs)
 	twilio = Twilio.connect()
@@ -81,14 +100,9 @@ def twilio_incoming_call_handler(**kwargs):
 
 @frappe.whitelist()
 def create_call_log(call_details: TwilioCallDetails):
-	call_log = frappe.get_doc({**call_details.to_dict(),
-		'doctype': 'Call Log',
-		'medium': 'Twilio'
-	})
-
-	call_log.flags.ignore_permissions = True
-	call_log.save()
-	frappe.db.commit()
+	"""Queue the Call Log creation, it is written in the background.
+	"""
+	queue_call_log_update(call_details.call_sid, call_details.to_dict())
 
 
 @frappe.whitelist()
@@ -96,15 +110,14 @@ def update_call_log(call_sid, status=None):
 	"""Update call log status.
 	"""
 	twilio = Twilio.connect()
-	if not (twilio and frappe.db.exists("Call Log", call_sid)): return
+	if not twilio: return
+
+	# status and duration are fetched from Twilio when the update is applied
+	queue_call_log_update(call_sid, {'status': status}, fetch_call_info=True)
 
-	call_details = twilio.get_call_info(call_sid)
-	call_log = frappe.get_doc("Call Log", call_sid)
-	call_log.status = status or TwilioCallDetails.get_call_status(call_details.status)
-	call_log.duration = call_details.duration
-	call_log.flags.ignore_permissions = True
-	call_log.save()
-	frappe.db.commit()
+	# Called by the agent's softphone when the call ends
+	if frappe.session.user != "Guest":
+		set_agent_last_busy(frappe.session.user)
 
 
 @frappe.whitelist(allow_guest=True)
@@ -114,8 +127,10 @@ def update_recording_info(**kwargs):
 		args = frappe._dict(kwargs)
 		recording_url = args.RecordingUrl
 		call_sid = args.CallSid
-		update_call_log(call_sid)
-		frappe.db.set_value("Call Log", call_sid, "recording_url", recording_url)
+		queue_call_log_update(call_sid, {
+			'recording_url': recording_url,
+			'twilio_recording_sid': args.RecordingSid,
+		}, fetch_call_info=True)
 	except:
 		frappe.log_error(title=_("Failed to capture Twilio recording"))
 
@@ -170,6 +185,32 @@ def whatsapp_message_status_callback(**kwargs):
 	outgoing_message_status_callback(args, auto_commit=True)
 
 
+@frappe.whitelist(allow_guest=True)
+@slow_trace("Webhook")
+def freshchat_whatsapp_status_callback(**kwargs):
+	"""This is a webhook called by Freshchat whenever sent WhatsApp message status is changed.
+	"""
+	payload = frappe.request.get_data()
+	frappe.get_cached_doc("Freshchat Settings").validate_webhook_signature(
+		payload, frappe.request.headers.get("X-Freshchat-Signature"))
+
+	frappe.set_user("Administrator")
+	freshchat_status_callback(frappe.parse_json(payload), auto_commit=True)
+
+
+@frappe.whitelist(allow_guest=True)
+@slow_trace("Webhook")
+def genesys_whatsapp_status_callback(**kwargs):
+	"""This is a webhook called by Genesys with receipts of sent WhatsApp messages.
+	"""
+	payload = frappe.request.get_data()
+	frappe.get_cached_doc("Genesys WhatsApp Settings").validate_webhook_signature(
+		payload, frappe.request.headers.get("X-Hub-Signature-256"))
+
+	frappe.set_user("Administrator")
+	genesys_status_callback(frappe.parse_json(payload), auto_commit=True)
+
+
 @frappe.whitelist(allow_guest=True)
 @validate_twilio_request
 def download_whatsapp_media(**kwargs):
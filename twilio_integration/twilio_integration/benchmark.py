@@ -0,0 +1,307 @@
+import frappe
+from frappe import _
+from twilio.rest import Client as TwilioClient
+from collections import Counter
+from unittest.mock import patch
+import json
+import math
+import time
+
+from . import circuit_breaker
+from .fake_providers import FakeProviderServer, FakeTwilioHttpClient
+from .profiling import capture_queries
+from .twilio_handler import Twilio, _connections
+from .doctype.whatsapp_message.whatsapp_message import (
+	flush_outgoing_message_queue,
+	freshchat_status_callback,
+	genesys_status_callback,
+	outgoing_message_status_callback,
+	reconcile_freshchat_message_statuses,
+	reconcile_message_status,
+	send_whatsapp_message,
+)
+
+SETTINGS_DOCTYPES = ("WhatsApp Settings", "Twilio Settings", "Freshchat Settings", "Genesys WhatsApp Settings")
+FROM_NUMBER = "whatsapp:+10000000000"
+CIRCUIT_BREAKER_PREFIX = "benchmark"
+
+
+def run_benchmark(provider="Twilio", messages=100, latency=0.05, latency_jitter=0, error_rate=0, rate_limit_rate=0,
+	force=False):
+	"""
+	Send WhatsApp messages through a fake provider server and measure sends, the flush job, status
+	reconciliation and status webhooks. Returns results of each stage with messages per second, latency
+	percentiles and queries per message, and the requests answered by the fake server.
+
+	Runs only in developer mode unless `force` is set. Provider settings are overridden for this process
+	and the circuit breaker state is kept apart, other workers keep using the real provider. Messages are
+	created in one transaction that is rolled back, send metrics are kept in Redis. Webhook signatures
+	are not part of the measurement.
+	"""
+	if not (frappe.conf.developer_mode or force):
+		frappe.throw(_("WhatsApp benchmark runs only in developer mode, force it to run on this site"))
+
+	server = FakeProviderServer(provider, latency=latency, latency_jitter=latency_jitter,
+		error_rate=error_rate, rate_limit_rate=rate_limit_rate)
+	base_url = server.start()
+
+	stages = []
+	previous_connection = _connections.get(frappe.local.site)
+	with patch.object(circuit_breaker, "get_key", get_circuit_breaker_key_function()):
+		try:
+			configure_provider(provider, base_url)
+
+			message_names = create_messages(provider, messages)
+			stages.append(run_stage("Send", message_names, send_whatsapp_message, auto_commit=False))
+
+			stages.append(run_flush_stage(provider, messages, exclude=message_names))
+			message_names += stages[-1].message_names
+
+			sent_message_names = frappe.get_all("WhatsApp Message",
+				filters={"name": ("in", message_names), "status": ("in", ("Queued", "Sent"))},
+				pluck="name")
+			stages.append(run_reconcile_stage(provider, sent_message_names))
+			stages.append(run_stage("Status Webhook", sent_message_names, get_status_webhook(provider)))
+
+		finally:
+			frappe.db.rollback()
+			reset_provider(provider, previous_connection)
+			server.stop()
+
+	return frappe._dict({
+		"provider": provider,
+		"stages": stages,
+		"provider_requests": server.request_count,
+		"provider_responses": server.response_counts,
+	})
+
+
+def configure_provider(provider, base_url):
+	"""
+	Point the provider at the fake server for this process only. Settings are overridden in the local
+	document cache, the database and the shared cache keep the real settings.
+	"""
+	set_local_settings("WhatsApp Settings", {"whatsapp_no": FROM_NUMBER, "whatsapp_provider": provider})
+
+	if provider == "Twilio":
+		settings = set_local_settings("Twilio Settings", {
+			"enabled": 1,
+			"account_sid": "AC" + "0" * 32,
+			"auth_token": "benchmark",
+		})
+		twilio = _connections[frappe.local.site] = Twilio(settings=settings)
+		twilio.twilio_client = TwilioClient(twilio.account_sid, twilio.auth_token,
+			http_client=FakeTwilioHttpClient(base_url))
+	elif provider == "Freshchat":
+		set_local_settings("Freshchat Settings", {
+			"enabled": 1,
+			"api_endpoint": base_url,
+			"api_key": "benchmark",
+			"namespace": "benchmark",
+			"channel_id": "benchmark",
+			"bulk_status_reconciliation": 1,
+		})
+	elif provider == "Genesys":
+		settings = set_local_settings("Genesys WhatsApp Settings", {
+			"enabled": 1,
+			"client_id": "benchmark",
+			"client_secret": "benchmark",
+			"login_base_url": base_url,
+			"api_base_url": base_url,
+			"from_address": "benchmark",
+		})
+		# the access token is shared by workers through Redis, a fixed one keeps the real token untouched
+		settings.get_access_token = lambda: "benchmark"
+
+
+def set_local_settings(doctype, values):
+	"""Settings returned by `frappe.get_cached_doc` in this process until `reset_provider`"""
+	settings = frappe.get_doc(doctype)
+	settings.update(values)
+	frappe.local.document_cache[frappe.get_document_cache_key(doctype, doctype)] = settings
+	return settings
+
+
+def reset_provider(provider, previous_connection=None):
+	for doctype in SETTINGS_DOCTYPES:
+		frappe.local.document_cache.pop(frappe.get_document_cache_key(doctype, doctype), None)
+
+	if previous_connection:
+		_connections[frappe.local.site] = previous_connection
+	else:
+		_connections.pop(frappe.local.site, None)
+
+	circuit_breaker.close_circuit(provider)
+
+
+def get_circuit_breaker_key_function():
+	"""Circuit breaker keys of one benchmark run, failures of the fake provider do not open the real circuit"""
+	run = frappe.generate_hash(length=10)
+	get_key = circuit_breaker.get_key
+
+	def get_benchmark_key(provider, *args):
+		return get_key(f"{CIRCUIT_BREAKER_PREFIX}|{run}|{provider}", *args)
+
+	return get_benchmark_key
+
+
+def create_messages(provider, count):
+	message_names = []
+	for i in range(count):
+		message = frappe.get_doc({
+			"doctype": "WhatsApp Message",
+			"sent_received": "Sent",
+			"status": "Not Sent",
+			"whatsapp_provider": provider,
+			"from_": FROM_NUMBER,
+			"to": f"whatsapp:+1555{i:07d}",
+			"message": f"Benchmark message {i}",
+			"template_sid": "benchmark_template" if provider != "Twilio" else None,
+			"content_variables": json.dumps({"1": f"Benchmark {i}"}) if provider != "Twilio" else None,
+		})
+		message.insert(ignore_permissions=True)
+		message_names.append(message.name)
+
+	return message_names
+
+
+def run_stage(stage, items, method, **kwargs):
+	latencies = []
+	errors = 0
+	queries = []
+
+	stop_query_capture = capture_queries(lambda query, duration: queries.append(duration))
+	start = time.perf_counter()
+	try:
+		for item in items:
+			item_start = time.perf_counter()
+			try:
+				method(item, **kwargs)
+			except Exception:
+				errors += 1
+			latencies.append(time.perf_counter() - item_start)
+	finally:
+		elapsed = time.perf_counter() - start
+		stop_query_capture()
+
+	return get_result(stage, items, elapsed, len(queries), latencies=latencies, errors=errors)
+
+
+def run_batch_stage(stage, items, method, **kwargs):
+	"""Stage handling all items in one call, latency percentiles are not available"""
+	queries = []
+
+	stop_query_capture = capture_queries(lambda query, duration: queries.append(duration))
+	start = time.perf_counter()
+	try:
+		method(**kwargs)
+	finally:
+		elapsed = time.perf_counter() - start
+		stop_query_capture()
+
+	return get_result(stage, items, elapsed, len(queries))
+
+
+def run_flush_stage(provider, count, exclude):
+	# the flush job sends every queued message, it is only measured if all of them are benchmark messages
+	if frappe.db.count("WhatsApp Message",
+		{"status": "Not Sent", "sent_received": "Sent", "name": ("not in", exclude or [""])}):
+		return get_result("Flush Job", [], 0, 0, note="Skipped, the site has other queued messages")
+
+	message_names = create_messages(provider, count)
+	return run_batch_stage("Flush Job", message_names, flush_outgoing_message_queue, from_test=True)
+
+
+def run_reconcile_stage(provider, message_names):
+	if provider == "Freshchat":
+		messages = frappe.get_all("WhatsApp Message",
+			filters={"name": ("in", message_names or [""])},
+			fields=["name", "id", "status", "communication", "date_sent", "creation",
+				"whatsapp_provider", "template_sid", "notification_type"])
+		return run_batch_stage("Reconciliation", message_names, reconcile_freshchat_message_statuses,
+			messages=messages, auto_commit=False)
+
+	def reconcile(message_name):
+		reconcile_message_status(frappe.get_doc("WhatsApp Message", message_name, for_update=True), auto_commit=False)
+
+	return run_stage("Reconciliation", message_names, reconcile)
+
+
+def get_status_webhook(provider):
+	"""Status callback handler of the provider, called with a read receipt of a message"""
+	def twilio_status_webhook(message_name):
+		message = frappe.db.get_value("WhatsApp Message", message_name, ["id", "from_", "to"], as_dict=True)
+		outgoing_message_status_callback(frappe._dict({
+			"MessageSid": message.id,
+			"From": message.from_,
+			"To": message.to,
+			"MessageStatus": "read",
+		}))
+
+	def freshchat_status_webhook(message_name):
+		message_id = frappe.db.get_value("WhatsApp Message", message_name, "id")
+		freshchat_status_callback({"data": {"outbound_message": {"request_id": message_id, "status": "READ"}}})
+
+	def genesys_status_webhook(message_name):
+		message_id = frappe.db.get_value("WhatsApp Message", message_name, "id")
+		genesys_status_callback({"id": message_id, "status": "Read"})
+
+	return {
+		"Twilio": twilio_status_webhook,
+		"Freshchat": freshchat_status_webhook,
+		"Genesys": genesys_status_webhook,
+	}[provider]
+
+
+def get_result(stage, items, elapsed, query_count, latencies=None, errors=0, note=None):
+	statuses = Counter(frappe.get_all("WhatsApp Message", filters={"name": ("in", items)}, pluck="status")) \
+		if items else Counter()
+
+	return frappe._dict({
+		"stage": stage,
+		"messages": len(items),
+		"message_names": list(items),
+		"errors": errors,
+		"statuses": dict(statuses),
+		"elapsed": elapsed,
+		"throughput": len(items) / elapsed if elapsed else 0,
+		"p50": get_percentile(latencies, 50),
+		"p95": get_percentile(latencies, 95),
+		"p99": get_percentile(latencies, 99),
+		"queries_per_message": query_count / len(items) if items else 0,
+		"note": note,
+	})
+
+
+def get_percentile(values, percentile):
+	if not values:
+		return None
+
+	values = sorted(values)
+	return values[max(math.ceil(len(values) * percentile / 100) - 1, 0)]
+
+
+def format_results(benchmark):
+	def milliseconds(value):
+		return f"{value * 1000:.1f}" if value is not None else "-"
+
+	lines = [
+		f"{'Stage':<16}{'Messages':>10}{'Msgs/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Queries/msg':>13}"
+		"  Statuses",
+	]
+	for result in benchmark.stages:
+		if result.note:
+			lines.append(f"{result.stage:<16}{result.note}")
+			continue
+
+		statuses = ", ".join(f"{status} {count}" for status, count in sorted(result.statuses.items()))
+		lines.append(
+			f"{result.stage:<16}{result.messages:>10}{result.throughput:>10.1f}{milliseconds(result.p50):>10}"
+			f"{milliseconds(result.p95):>10}{milliseconds(result.p99):>10}{result.queries_per_message:>13.1f}"
+			f"  {statuses}"
+		)
+
+	responses = ", ".join(f"{status_code}: {count}" for status_code, count in sorted(benchmark.provider_responses.items()))
+	lines.append(f"{benchmark.provider} requests: {benchmark.provider_requests} ({responses})")
+
+	return "\n".join(lines)
@@ -0,0 +1,135 @@
+import frappe
+from frappe import _
+from redis.exceptions import LockError
+from .twilio_handler import Twilio, TwilioCallDetails
+from .call_recording import is_recording_storage_enabled, enqueue_call_recording_download
+import json
+
+CALL_LOG_QUEUE_KEY = "twilio_call_log_queue"
+CALL_LOG_FLUSH_SCHEDULED_KEY = "twilio_call_log_flush_scheduled"
+CALL_LOG_FLUSH_LOCK_KEY = "twilio_call_log_flush_lock"
+BATCH_SIZE = 500
+LOCK_TIMEOUT = 300  # seconds, extended for every call of a batch
+
+
+def queue_call_log_update(call_sid, values, fetch_call_info=False):
+	"""Queue a Call Log write, applied in the background so that webhooks return without DB writes.
+
+	:param values: Call Log fields, creates the Call Log if it contains `type`
+	:param fetch_call_info: fetch status and duration from Twilio when applying
+	"""
+	entry = {k: v for k, v in values.items() if v is not None}
+	entry["id"] = call_sid
+	if fetch_call_info:
+		entry["fetch_call_info"] = 1
+
+	frappe.cache().rpush(CALL_LOG_QUEUE_KEY, json.dumps(entry, default=str))
+	schedule_call_log_flush()
+
+
+def schedule_call_log_flush():
+	# only one flush job is enqueued at a time, the scheduler flushes if it did not run
+	if frappe.cache().set(frappe.cache().make_key(CALL_LOG_FLUSH_SCHEDULED_KEY), 1, nx=True, ex=60):
+		frappe.enqueue(
+			"twilio_integration.twilio_integration.call_log.flush_call_log_queue",
+			queue="short",
+			enqueue_after_commit=False,
+		)
+
+
+def flush_call_log_queue():
+	"""Apply queued Call Log writes in batches, one update per call. Called from background job and scheduler."""
+	frappe.cache().delete_value(CALL_LOG_FLUSH_SCHEDULED_KEY)
+
+	lock = frappe.cache().lock(frappe.cache().make_key(CALL_LOG_FLUSH_LOCK_KEY), timeout=LOCK_TIMEOUT)
+	if not lock.acquire(blocking=False):
+		# already being flushed, the running flush or the next one picks up new writes
+		return
+
+	try:
+		while True:
+			entries = frappe.cache().lrange(CALL_LOG_QUEUE_KEY, 0, BATCH_SIZE - 1)
+			if not entries:
+				break
+
+			for call_sid, values in merge_call_log_updates(entries).items():
+				# a batch can take longer than the lock timeout, another flush must not apply and trim it again
+				lock.extend(LOCK_TIMEOUT, replace_ttl=True)
+				try:
+					apply_call_log_update(call_sid, values)
+					frappe.db.commit()
+				except Exception:
+					frappe.db.rollback()
+					frappe.log_error(title=_("Failed to update Twilio Call Log {0}").format(call_sid))
+
+			frappe.cache().ltrim(CALL_LOG_QUEUE_KEY, len(entries), -1)
+	finally:
+		try:
+			lock.release()
+		except LockError:
+			pass
+
+
+def merge_call_log_updates(entries):
+	"""Merge queued writes per call in the order they were queued"""
+	updates = {}
+	for entry in entries:
+		entry = json.loads(frappe.safe_decode(entry))
+		call_sid = entry.pop("id", None)
+		if not call_sid:
+			continue
+
+		values = updates.setdefault(call_sid, {})
+		fetch_call_info = values.get("fetch_call_info") or entry.get("fetch_call_info")
+		if entry.get("fetch_call_info"):
+			# the status fetched from Twilio replaces a merged one unless this callback passed its own
+			values["fetch_status"] = 0 if entry.get("status") else 1
+		elif entry.get("status"):
+			values["fetch_status"] = 0
+
+		values.update(entry)
+		if fetch_call_info:
+			values["fetch_call_info"] = 1
+
+	return updates
+
+
+def apply_call_log_update(call_sid, values):
+	values = values.copy()
+	fetch_call_info = values.pop("fetch_call_info", None)
+	fetch_status = values.pop("fetch_status", None)
+
+	if frappe.db.exists("Call Log", call_sid):
+		call_log = frappe.get_doc("Call Log", call_sid)
+	elif values.get("type"):
+		call_log = frappe.new_doc("Call Log")
+		call_log.id = call_sid
+		call_log.medium = "Twilio"
+	else:
+		# update for a call not logged by this integration
+		return
+
+	if fetch_call_info:
+		call_info = Twilio.connect().get_call_info(call_sid)
+		if fetch_status or not values.get("status"):
+			values["status"] = TwilioCallDetails.get_call_status(call_info.status)
+		values["duration"] = call_info.duration
+
+	# recordings stored locally are downloaded in the background, the Twilio URL is kept until then
+	download_recording = (
+		values.get("twilio_recording_sid")
+		and values.get("twilio_recording_sid") != call_log.get("twilio_recording_sid")
+		and is_recording_storage_enabled()
+	)
+	if download_recording:
+		values["twilio_recording_status"] = "To Download"
+		values["twilio_recording_retry"] = 0
+
+	call_log.update(values)
+	call_log.flags.ignore_permissions = True
+	call_log.save()
+
+	if download_recording:
+		enqueue_call_recording_download(call_log.name)
+
+	return call_log
@@ -0,0 +1,168 @@
+import frappe
+from frappe import _
+from frappe.utils import add_to_date, cint, now_datetime
+from redis.exceptions import LockError
+from .twilio_handler import Twilio
+import requests
+import os
+
+RECORDING_SLOT_LOCK_KEY = "twilio_recording_download_slot"
+RECORDING_SLOT_TIMEOUT = 30 * 60  # seconds
+DEFAULT_CONCURRENCY = 2
+MAX_RETRY = 5
+CHUNK_SIZE = 1024 * 1024
+
+
+def is_recording_storage_enabled():
+	return cint(frappe.get_cached_value("Twilio Settings", None, "store_recordings_locally"))
+
+
+def enqueue_call_recording_download(call_sid):
+	frappe.enqueue(
+		"twilio_integration.twilio_integration.call_recording.download_call_recording",
+		call_sid=call_sid,
+		queue="long",
+		enqueue_after_commit=True,
+	)
+
+
+def flush_call_recording_queue():
+	"""Download recordings whose download did not run or failed, called from scheduler"""
+	if not is_recording_storage_enabled():
+		return
+
+	# downloads interrupted by a worker restart
+	frappe.db.set_value("Call Log", {
+		"twilio_recording_status": "Downloading",
+		"modified": ("<", add_to_date(now_datetime(), seconds=-RECORDING_SLOT_TIMEOUT)),
+	}, "twilio_recording_status", "To Download", update_modified=False)
+
+	for call_sid in frappe.get_all("Call Log",
+		filters={"twilio_recording_status": "To Download"},
+		order_by="modified asc",
+		limit=get_concurrency() * 10,
+		pluck="name",
+	):
+		download_call_recording(call_sid)
+
+
+def download_call_recording(call_sid):
+	"""
+	Stream a completed recording from Twilio into a private File attached to the Call Log.
+	A partially downloaded recording is resumed on retry. Downloads run in a bounded number of slots,
+	when all are taken the recording is left for the scheduler.
+	"""
+	slot = acquire_download_slot()
+	if not slot:
+		return
+
+	try:
+		call_log = frappe.get_doc("Call Log", call_sid, for_update=True)
+		if call_log.twilio_recording_status != "To Download" or not call_log.twilio_recording_sid:
+			frappe.db.rollback()
+			return
+
+		call_log.db_set("twilio_recording_status", "Downloading", commit=True)
+
+		try:
+			file = store_recording(call_log)
+			call_log.db_set({
+				"recording_url": file.file_url,
+				"twilio_recording_status": "Attached",
+			}, commit=True)
+
+		except Exception:
+			frappe.db.rollback()
+			call_log.db_set({
+				"twilio_recording_status": "To Download" if cint(call_log.twilio_recording_retry) < MAX_RETRY else "Error",
+				"twilio_recording_retry": cint(call_log.twilio_recording_retry) + 1,
+			}, commit=True)
+			frappe.log_error(
+				title=_("Failed to download Twilio call recording"),
+				reference_doctype="Call Log",
+				reference_name=call_sid,
+			)
+			return
+
+		if cint(frappe.get_cached_value("Twilio Settings", None, "delete_recordings_from_twilio")):
+			try:
+				Twilio.get_twilio_client().recordings(call_log.twilio_recording_sid).delete()
+			except Exception:
+				frappe.log_error(
+					title=_("Failed to delete Twilio call recording"),
+					reference_doctype="Call Log",
+					reference_name=call_sid,
+				)
+
+	finally:
+		release_download_slot(slot)
+
+
+def store_recording(call_log):
+	file_name = f"{call_log.twilio_recording_sid}.mp3"
+	file_url = f"/private/files/{file_name}"
+
+	existing_file = frappe.db.get_value("File", {"file_url": file_url, "attached_to_doctype": "Call Log"})
+	if existing_file:
+		return frappe.get_doc("File", existing_file)
+
+	file_path = frappe.get_site_path("private", "files", file_name)
+	partial_path = file_path + ".part"
+
+	twilio = Twilio.connect()
+	media_url = get_recording_media_url(twilio, call_log.twilio_recording_sid)
+
+	# resume a previously interrupted download
+	headers = {}
+	downloaded = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+	if downloaded:
+		headers["Range"] = f"bytes={downloaded}-"
+
+	with requests.get(media_url, headers=headers, auth=(twilio.account_sid, twilio.auth_token),
+			stream=True, timeout=60) as response:
+		if response.status_code == 416:
+			# already complete
+			pass
+		else:
+			response.raise_for_status()
+			mode = "ab" if response.status_code == 206 else "wb"
+			with open(partial_path, mode) as f:
+				for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+					f.write(chunk)
+
+	os.replace(partial_path, file_path)
+
+	file = frappe.get_doc({
+		"doctype": "File",
+		"file_name": file_name,
+		"file_url": file_url,
+		"is_private": 1,
+		"attached_to_doctype": "Call Log",
+		"attached_to_name": call_log.name,
+	})
+	file.insert(ignore_permissions=True)
+
+	return file
+
+
+def get_recording_media_url(twilio, recording_sid):
+	return f"https://api.twilio.com/2010-04-01/Accounts/{twilio.account_sid}/Recordings/{recording_sid}.mp3"
+
+
+def acquire_download_slot():
+	for i in range(get_concurrency()):
+		lock = frappe.cache().lock(frappe.cache().make_key(f"{RECORDING_SLOT_LOCK_KEY}|{i}"),
+			timeout=RECORDING_SLOT_TIMEOUT)
+		if lock.acquire(blocking=False):
+			return lock
+
+
+def release_download_slot(slot):
+	try:
+		slot.release()
+	except LockError:
+		pass
+
+
+def get_concurrency():
+	return cint(frappe.conf.get("twilio_recording_download_concurrency")) or DEFAULT_CONCURRENCY
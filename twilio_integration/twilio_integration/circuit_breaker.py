@@ -0,0 +1,128 @@
+import frappe
+from frappe.utils import cint, flt
+from .retry_policy import is_transport_error
+import time
+
+CACHE_KEY_PREFIX = "whatsapp_circuit_breaker"
+
+# A provider's circuit opens when at least MIN_CALLS requests were made within WINDOW seconds and
+# FAILURE_RATE of them failed. Requests are skipped while it is open, after OPEN_DURATION seconds a
+# single probe request is let through (half-open) which closes the circuit again or keeps it open.
+DEFAULT_WINDOW = 60
+DEFAULT_MIN_CALLS = 10
+DEFAULT_FAILURE_RATE = 0.5
+DEFAULT_OPEN_DURATION = 60
+PROBE_TIMEOUT = 60
+
+
+class CircuitOpenError(frappe.ValidationError):
+	pass
+
+
+def allow_request(provider):
+	"""Returns False if requests to `provider` should be skipped, lets one probe through when half-open."""
+	if not provider:
+		return True
+
+	open_until = get_open_until(provider)
+	if not open_until:
+		return True
+
+	if time.time() < open_until:
+		return False
+
+	# half-open, only one worker probes the provider
+	return bool(frappe.cache().set(get_key(provider, "probe"), 1, nx=True, ex=PROBE_TIMEOUT))
+
+
+def is_open(provider):
+	if not provider:
+		return False
+
+	open_until = get_open_until(provider)
+	return bool(open_until and time.time() < open_until)
+
+
+def get_open_providers():
+	return [provider for provider in ("Twilio", "Freshchat", "Genesys") if is_open(provider)]
+
+
+def record_success(provider):
+	if not provider:
+		return
+
+	if get_open_until(provider):
+		close_circuit(provider)
+		return
+
+	count_request(provider)
+
+
+def record_failure(provider, exc):
+	"""Counts a failed request to `provider`. Only transport failures count, see `is_transport_error`."""
+	if not provider or not is_transport_error(exc):
+		return
+
+	if get_open_until(provider):
+		# probe failed
+		open_circuit(provider)
+		return
+
+	calls, failures = count_request(provider, failed=True)
+	config = get_config()
+	if calls >= config.min_calls and failures / calls >= config.failure_rate:
+		open_circuit(provider)
+
+
+def open_circuit(provider):
+	frappe.cache().set(get_key(provider, "open_until"), time.time() + get_config().open_duration)
+	frappe.cache().delete(get_key(provider, "probe"))
+
+
+def close_circuit(provider):
+	frappe.cache().delete(
+		get_key(provider, "open_until"),
+		get_key(provider, "probe"),
+		get_key(provider, "calls", get_window()),
+		get_key(provider, "failures", get_window()),
+	)
+
+
+def count_request(provider, failed=False):
+	window = get_window()
+	calls_key = get_key(provider, "calls", window)
+	failures_key = get_key(provider, "failures", window)
+	expiry = get_config().window * 2
+
+	pipeline = frappe.cache().pipeline()
+	pipeline.incr(calls_key)
+	pipeline.expire(calls_key, expiry)
+	if failed:
+		pipeline.incr(failures_key)
+		pipeline.expire(failures_key, expiry)
+	else:
+		pipeline.get(failures_key)
+
+	result = pipeline.execute()
+	return cint(result[0]), cint(result[2])
+
+
+def get_open_until(provider):
+	return flt(frappe.safe_decode(frappe.cache().get(get_key(provider, "open_until")) or 0))
+
+
+def get_window():
+	return int(time.time() // get_config().window)
+
+
+def get_key(provider, *args):
+	return frappe.cache().make_key("|".join([CACHE_KEY_PREFIX, provider, *(str(a) for a in args)]))
+
+
+def get_config():
+	return frappe._dict({
+		"window": cint(frappe.conf.get("whatsapp_circuit_breaker_window")) or DEFAULT_WINDOW,
+		"min_calls": cint(frappe.conf.get("whatsapp_circuit_breaker_min_calls")) or DEFAULT_MIN_CALLS,
+		"failure_rate": flt(frappe.conf.get("whatsapp_circuit_breaker_failure_rate")) or DEFAULT_FAILURE_RATE,
+		"open_duration": cint(frappe.conf.get("whatsapp_circuit_breaker_open_duration")) or DEFAULT_OPEN_DURATION,
+	})
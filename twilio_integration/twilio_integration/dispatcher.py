@@ -0,0 +1,206 @@
+import frappe
+from frappe import _
+from . import outbound_stream
+import os
+import signal
+import time
+
+WAKEUP_KEY = "whatsapp_dispatcher_wakeup"
+HEARTBEAT_KEY = "whatsapp_dispatcher_heartbeat"
+
+HEARTBEAT_TIMEOUT = 30  # seconds
+IDLE_TIMEOUT = 10  # seconds waited for a wakeup before the queue is checked again
+SWEEP_INTERVAL = 60  # seconds between database sweeps when consuming the Redis Stream
+BATCH_SIZE = 100
+
+
+def is_dispatcher_running():
+	return bool(frappe.cache().get(frappe.cache().make_key(HEARTBEAT_KEY)))
+
+
+def notify_dispatcher():
+	"""Wake the dispatcher once the current transaction commits, no-op if it is not running"""
+	if is_dispatcher_running():
+		frappe.db.after_commit.add(push_wakeup)
+
+
+def push_wakeup():
+	frappe.cache().rpush(WAKEUP_KEY, 1)
+	# one pending wakeup is enough, the dispatcher drains the whole queue
+	frappe.cache().ltrim(WAKEUP_KEY, -1, -1)
+
+
+def run_dispatcher(site):
+	"""
+	Send queued WhatsApp messages as soon as they are queued, runs until terminated.
+	Only one dispatcher is active per site, others wait on standby. With the Redis Stream backend all
+	dispatchers consume the stream and the database is only swept for retries that are due.
+	"""
+	stopping = []
+	signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+	signal.signal(signal.SIGINT, lambda *args: stopping.append(True))
+
+	frappe.init(site=site)
+	frappe.connect()
+	frappe.set_user("Administrator")
+
+	last_sweep = 0
+	last_reclaim = 0
+	try:
+		while not stopping:
+			reset_local_caches()
+
+			use_stream = outbound_stream.is_stream_backend_enabled()
+			if not keep_heartbeat(shared=use_stream):
+				# standby, takes over once the active dispatcher stops
+				time.sleep(IDLE_TIMEOUT)
+				continue
+
+			try:
+				if use_stream:
+					if time.time() - last_reclaim >= outbound_stream.RECLAIM_INTERVAL:
+						last_reclaim = time.time()
+						dispatch_stream_messages(reclaim=True)
+
+					# blocks until messages are published
+					dispatch_stream_messages()
+					if time.time() - last_sweep < SWEEP_INTERVAL:
+						continue
+
+					last_sweep = time.time()
+
+				sent = dispatch_outgoing_messages()
+			except Exception:
+				recover_from_error()
+				sent = 0
+				if use_stream:
+					time.sleep(IDLE_TIMEOUT)
+					continue
+
+			if not sent and not use_stream:
+				wait_for_wakeup()
+	finally:
+		release_heartbeat()
+		frappe.destroy()
+
+
+def reset_local_caches():
+	"""
+	The dispatcher runs as one long request, forget what was cached for it so that changes to settings
+	and site config, e.g. muting messages or new credentials, are seen
+	"""
+	frappe.local.document_cache = {}
+	frappe.local.cache = {}
+	frappe.local.conf = frappe._dict(frappe.get_site_config())
+
+
+def recover_from_error():
+	try:
+		frappe.db.rollback()
+	except Exception:
+		# connection was lost, e.g. the database restarted
+		reconnect()
+
+	try:
+		frappe.log_error(title=_("WhatsApp Dispatcher Error"))
+		frappe.db.commit()
+	except Exception:
+		reconnect()
+
+
+def reconnect():
+	try:
+		frappe.db.close()
+	except Exception:
+		pass
+
+	try:
+		frappe.connect()
+		frappe.set_user("Administrator")
+	except Exception:
+		# database is still down, connecting is tried again after the next failure
+		time.sleep(IDLE_TIMEOUT)
+
+
+def dispatch_outgoing_messages():
+	"""Send one batch of queued messages, returns the number of messages that left the queue"""
+	from .doctype.whatsapp_message.whatsapp_message import (
+		are_whatsapp_messages_muted,
+		get_queued_outgoing_messages,
+		send_whatsapp_message,
+	)
+	from . import circuit_breaker
+
+	if are_whatsapp_messages_muted():
+		return 0
+
+	sent = 0
+	for message_name in get_queued_outgoing_messages(
+		exclude_providers=circuit_breaker.get_open_providers(), limit=BATCH_SIZE
+	):
+		keep_heartbeat()
+
+		message_doc = frappe.get_doc("WhatsApp Message", message_name, for_update=True)
+		retry = message_doc.retry
+		send_whatsapp_message(message_doc, auto_commit=True)
+
+		# messages skipped for lane limits, open circuits or pending media stay queued
+		if message_doc.status != "Not Sent" or message_doc.retry != retry:
+			sent += 1
+
+	return sent
+
+
+def dispatch_stream_messages(reclaim=False):
+	"""
+	Send messages read from the Redis Stream, or messages taken over from stopped dispatchers if `reclaim`.
+	Every entry read is acknowledged, messages that stay queued, e.g. over their lane's limits, are sent by
+	the database sweep.
+	"""
+	from .doctype.whatsapp_message.whatsapp_message import send_whatsapp_message
+
+	if reclaim:
+		entries = outbound_stream.reclaim_messages(count=BATCH_SIZE)
+	else:
+		entries = outbound_stream.read_messages(count=BATCH_SIZE, block=IDLE_TIMEOUT * 1000)
+
+	done = []
+	try:
+		for entry_id, message_name in entries:
+			keep_heartbeat(shared=True)
+
+			if message_name and frappe.db.exists("WhatsApp Message", message_name):
+				send_whatsapp_message(frappe.get_doc("WhatsApp Message", message_name, for_update=True), auto_commit=True)
+
+			done.append(entry_id)
+	finally:
+		outbound_stream.ack_messages(done)
+
+
+def wait_for_wakeup():
+	frappe.cache().blpop(frappe.cache().make_key(WAKEUP_KEY), timeout=IDLE_TIMEOUT)
+
+
+def keep_heartbeat(shared=False):
+	"""Returns True if this process is the active dispatcher, always if dispatchers share the work"""
+	key = frappe.cache().make_key(HEARTBEAT_KEY)
+	pid = str(os.getpid())
+
+	if shared:
+		frappe.cache().set(key, pid, ex=HEARTBEAT_TIMEOUT)
+		return True
+
+	if frappe.cache().set(key, pid, nx=True, ex=HEARTBEAT_TIMEOUT):
+		return True
+
+	if frappe.safe_decode(frappe.cache().get(key)) == pid:
+		frappe.cache().expire(key, HEARTBEAT_TIMEOUT)
+		return True
+
+	return False
+
+
+def release_heartbeat():
+	key = frappe.cache().make_key(HEARTBEAT_KEY)
+	if frappe.safe_decode(frappe.cache().get(key)) == str(os.getpid()):
+		frappe.cache().delete(key)
@@ -1,9 +1,32 @@
 # Copyright (c) 2025, Frappe and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
+from frappe import _
 from frappe.model.document import Document
+import base64
 
 
 class FreshchatSettings(Document):
-	pass
+	def validate_webhook_signature(self, payload, signature):
+		"""Freshchat signs webhook payloads with its private key (RSA SHA256), verified with the public key"""
+		from cryptography.exceptions import InvalidSignature
+		from cryptography.hazmat.primitives import hashes, serialization
+		from cryptography.hazmat.primitives.asymmetric import padding
+
+		if not self.webhook_public_key or not signature:
+			frappe.throw(_("Invalid Signature"), exc=frappe.PermissionError)
+
+		public_key = self.webhook_public_key.strip()
+		if "BEGIN" not in public_key:
+			public_key = f"-----BEGIN PUBLIC KEY-----\n{public_key}\n-----END PUBLIC KEY-----"
+
+		try:
+			serialization.load_pem_public_key(public_key.encode()).verify(
+				base64.b64decode(signature),
+				payload,
+				padding.PKCS1v15(),
+				hashes.SHA256(),
+			)
+		except (InvalidSignature, ValueError):
+			frappe.throw(_("Invalid Signature"), exc=frappe.PermissionError)
@@ -2,20 +2,60 @@
 # For license information, please see license.txt
 
 import frappe
+from frappe import _
 from frappe.utils import cint
 from frappe.model.document import Document
+from redis.exceptions import LockError
 from urllib.parse import urljoin
+import base64
+import hashlib
+import hmac
 import requests
+import time
 
 CACHE_KEY = "genesys_access_token"
+LOCK_KEY = "genesys_access_token_lock"
+
+# The token is refreshed this many seconds before it expires. Within this window a single worker
+# refreshes it while the others keep using the current token.
+REFRESH_WINDOW = 600
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 15
 
 
 class GenesysWhatsAppSettings(Document):
 	def get_access_token(self):
-		access_token = frappe.cache().get_value(CACHE_KEY)
-		if access_token:
-			return access_token
+		token = get_cached_access_token()
+		if token and time.time() < token.refresh_at:
+			return token.access_token
+
+		stale_token = token if token and time.time() < token.expires_at else None
+
+		# Only one worker refreshes, others reuse the stale token or wait for the refresh
+		lock = frappe.cache().lock(frappe.cache().make_key(LOCK_KEY), timeout=LOCK_TIMEOUT)
+		if lock.acquire(blocking=not stale_token, blocking_timeout=LOCK_WAIT):
+			try:
+				token = get_cached_access_token()
+				if token and time.time() < token.refresh_at:
+					return token.access_token
+
+				return self.refresh_access_token()
+			finally:
+				try:
+					lock.release()
+				except LockError:
+					pass
+
+		if stale_token:
+			return stale_token.access_token
+
+		token = get_cached_access_token()
+		if token and time.time() < token.expires_at:
+			return token.access_token
+
+		frappe.throw(_("Timed out waiting for Genesys access token"))
 
+	def refresh_access_token(self):
 		url = urljoin(self.login_base_url, "/oauth/token")
 		client_secret = self.get_password("client_secret")
 
@@ -31,10 +71,34 @@ class GenesysWhatsAppSettings(Document):
 
 		access_token = token_data.get("access_token")
 		expires_in = cint(token_data.get("expires_in", 3600))
-		expires_in = max(expires_in - 600, 0)
 
-		# cache with a small buffer so we refresh before actual expiry
+		# cache for the token lifetime, refresh starts a buffer before actual expiry
 		if access_token and expires_in:
-			frappe.cache().set_value(CACHE_KEY, access_token, expires_in_sec=expires_in)
+			now = time.time()
+			frappe.cache().set_value(CACHE_KEY, {
+				"access_token": access_token,
+				"refresh_at": now + max(expires_in - REFRESH_WINDOW, 0),
+				"expires_at": now + expires_in,
+			}, expires_in_sec=expires_in)
 
 		return access_token
+
+	def validate_webhook_signature(self, payload, signature):
+		"""Receipts are signed with HMAC SHA256 of the payload using the webhook secret, sent as `sha256=<base64>`"""
+		secret = self.get_password("webhook_secret", raise_exception=False)
+		if not secret or not signature:
+			frappe.throw(_("Invalid Signature"), exc=frappe.PermissionError)
+
+		digest = hmac.new(secret.encode(), payload, hashlib.sha256).digest()
+		expected_signature = "sha256=" + base64.b64encode(digest).decode()
+
+		if not hmac.compare_digest(expected_signature, signature):
+			frappe.throw(_("Invalid Signature"), exc=frappe.PermissionError)
+
+
+def get_cached_access_token():
+	token = frappe.cache().get_value(CACHE_KEY, expires=True)
+	if not isinstance(token, dict) or not token.get("access_token"):
+		return None
+
+	return frappe._dict(token)
@@ -0,0 +1,69 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+from frappe.tests.utils import FrappeTestCase
+from twilio_integration.twilio_integration.doctype.twilio_content_template import twilio_content_template
+from twilio_integration.twilio_integration.doctype.twilio_content_template.twilio_content_template import (
+	get_system_datetime,
+	sync_twilio_content_templates,
+)
+
+DATE_UPDATED = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def get_content(sid, date_updated=DATE_UPDATED, status="approved"):
+	return frappe._dict({
+		"sid": sid,
+		"date_updated": date_updated,
+		"approval_requests": {"status": status, "category": "UTILITY"},
+	})
+
+
+class TestTwilioContentTemplate(FrappeTestCase):
+	def setUp(self):
+		for sid in ("HX_unchanged", "HX_updated", "HX_approved", "HX_deleted"):
+			frappe.get_doc({
+				"doctype": "Twilio Content Template",
+				"content_sid": sid,
+				"date_updated": get_system_datetime(DATE_UPDATED),
+				"approval_status": "Pending" if sid == "HX_approved" else "Approved",
+			}).insert(ignore_permissions=True)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def sync(self, contents, **kwargs):
+		client = MagicMock()
+		client.content.v1.content_and_approvals.stream.return_value = iter(contents)
+
+		with patch.object(twilio_content_template.Twilio, "get_twilio_client", return_value=client), \
+			patch.object(twilio_content_template, "update_twilio_content_template") as update, \
+			patch.object(frappe.db, "get_single_value", return_value=1), \
+			patch.object(frappe.db, "commit"):
+			sync_twilio_content_templates(**kwargs)
+
+		return sorted(call.args[0].sid for call in update.call_args_list)
+
+	def get_contents(self):
+		return [
+			get_content("HX_unchanged"),
+			get_content("HX_updated", date_updated=datetime(2026, 2, 1, tzinfo=timezone.utc)),
+			get_content("HX_approved"),
+			get_content("HX_new"),
+		]
+
+	def test_only_changed_templates_are_written(self):
+		self.assertEqual(self.sync(self.get_contents()), ["HX_approved", "HX_new", "HX_updated"])
+
+	def test_templates_deleted_on_twilio_are_removed(self):
+		self.sync(self.get_contents())
+
+		self.assertFalse(frappe.db.exists("Twilio Content Template", "HX_deleted"))
+		self.assertTrue(frappe.db.exists("Twilio Content Template", "HX_unchanged"))
+
+	def test_update_all_writes_every_template(self):
+		self.assertEqual(self.sync(self.get_contents(), update_all=True),
+			["HX_approved", "HX_new", "HX_unchanged", "HX_updated"])
@@ -0,0 +1,135 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint, convert_utc_to_system_timezone, now_datetime
+from ...twilio_handler import Twilio
+import json
+
+PAGE_SIZE = 100
+
+
+class TwilioContentTemplate(Document):
+	def get_variables(self):
+		return json.loads(self.variables) if self.variables else {}
+
+	def get_types(self):
+		return json.loads(self.types) if self.types else {}
+
+
+@frappe.whitelist()
+def enqueue_twilio_content_template_sync(update_all=False):
+	frappe.only_for("System Manager")
+
+	frappe.enqueue(
+		"twilio_integration.twilio_integration.doctype.twilio_content_template.twilio_content_template.sync_twilio_content_templates",
+		update_all=cint(update_all),
+		queue="long",
+		job_name="sync_twilio_content_templates",
+	)
+
+
+def sync_twilio_content_templates(update_all=False):
+	"""
+	Page through the Twilio Content API once and update the local template catalog, called from scheduler.
+	Every template is listed as templates deleted on Twilio are removed from the catalog, the API does not
+	list by update date. Only templates whose update date or approval status changed are written unless
+	`update_all` is set.
+	"""
+	if not frappe.db.get_single_value("Twilio Settings", "enabled"):
+		return
+
+	client = Twilio.get_twilio_client()
+
+	local_templates = {
+		d.name: d for d in frappe.get_all("Twilio Content Template", fields=["name", "date_updated", "approval_status"])
+	}
+	synced = set()
+
+	for i, content in enumerate(client.content.v1.content_and_approvals.stream(page_size=PAGE_SIZE), 1):
+		synced.add(content.sid)
+		if i % PAGE_SIZE == 0:
+			frappe.db.commit()
+
+		approval = get_approval_details(content.approval_requests)
+		local = local_templates.get(content.sid)
+		if (
+			not update_all
+			and local
+			and local.date_updated == get_system_datetime(content.date_updated)
+			and (local.approval_status or None) == approval.status
+		):
+			continue
+
+		update_twilio_content_template(content, approval)
+
+	for name in set(local_templates) - synced:
+		frappe.delete_doc("Twilio Content Template", name, ignore_permissions=True)
+
+	frappe.db.commit()
+
+
+def get_twilio_content_template(content_sid):
+	"""Returns the catalog entry for a Content SID, fetching it from Twilio if it has not been synced yet."""
+	if frappe.db.exists("Twilio Content Template", content_sid):
+		return frappe.get_cached_doc("Twilio Content Template", content_sid)
+
+	content = Twilio.get_whatsapp_template(content_sid)
+	return update_twilio_content_template(content)
+
+
+def update_twilio_content_template(content, approval=None):
+	if frappe.db.exists("Twilio Content Template", content.sid):
+		doc = frappe.get_doc("Twilio Content Template", content.sid)
+	else:
+		doc = frappe.new_doc("Twilio Content Template")
+		doc.content_sid = content.sid
+
+	types = content.types or {}
+	doc.update({
+		"friendly_name": content.friendly_name,
+		"language": content.language,
+		"date_updated": get_system_datetime(content.date_updated),
+		"last_synced": now_datetime(),
+		"body": get_content_body(types),
+		"types": json.dumps(types, indent=1),
+		"variables": json.dumps(content.variables or {}, indent=1),
+	})
+
+	if approval:
+		doc.update({
+			"approval_status": approval.status,
+			"approval_category": approval.category,
+		})
+
+	doc.flags.ignore_permissions = True
+	doc.save()
+
+	return doc
+
+
+def get_content_body(types):
+	if types.get("twilio/text"):
+		return types.get("twilio/text", {}).get("body", "")
+
+	for obj in types.values():
+		if obj.get("body"):
+			return obj.get("body")
+
+	return ""
+
+
+def get_approval_details(approval_requests):
+	approval_requests = approval_requests or {}
+	return frappe._dict({
+		"status": (approval_requests.get("status") or "").title() or None,
+		"category": approval_requests.get("category"),
+	})
+
+
+def get_system_datetime(date):
+	if not date:
+		return None
+
+	return convert_utc_to_system_timezone(date).replace(tzinfo=None)
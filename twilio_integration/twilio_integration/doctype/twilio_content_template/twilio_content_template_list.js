@@ -0,0 +1,18 @@
+frappe.listview_settings['Twilio Content Template'] = {
+	onload: function (listview) {
+		listview.page.add_inner_button(__("Sync from Twilio"), function () {
+			frappe.call({
+				method: "twilio_integration.twilio_integration.doctype.twilio_content_template.twilio_content_template.enqueue_twilio_content_template_sync",
+				args: {
+					update_all: 1,
+				},
+				callback: () => {
+					frappe.show_alert({
+						message: __("Syncing Twilio Content Templates in the background"),
+						indicator: "blue",
+					});
+				},
+			});
+		});
+	},
+}
@@ -1,8 +1,26 @@
 # Copyright (c) 2021, Frappe and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 import unittest
+from unittest.mock import patch
+from twilio_integration.twilio_integration.doctype.whatsapp_campaign.whatsapp_campaign import WhatsAppCampaign
+from twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message import WhatsAppMessage
 
 class TestWhatsAppCampaign(unittest.TestCase):
-	pass
+	def test_send_now_uses_campaign_lane(self):
+		campaign = frappe.get_doc({
+			"doctype": "WhatsApp Campaign",
+			"message": "Hello",
+			"recipients": [{"campaign_for": "Contact", "recipient": "_Test Contact", "whatsapp_no": "+15550000001"}],
+		})
+
+		# autospec fails the call on arguments send_whatsapp_message does not take
+		with patch.object(WhatsAppMessage, "send_whatsapp_message", autospec=True) as send_whatsapp_message, \
+			patch.object(WhatsAppCampaign, "db_set"):
+			campaign.send_now()
+
+		kwargs = send_whatsapp_message.call_args.kwargs
+		self.assertEqual(kwargs["lane"], "Campaign")
+		self.assertEqual(kwargs["receiver_list"], ["+15550000001"])
+		self.assertIsNone(kwargs["attachment"])
@@ -3,7 +3,6 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import get_site_url
 from twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message import WhatsAppMessage
 
 supported_file_ext = ['jpg',
@@ -42,7 +41,7 @@ class WhatsAppCampaign(Document):
 				frappe.throw(_('Attachment format not supported.'))
 
 	def get_attachment(self):
-		file = frappe.db.get_value("File", {"attached_to_name": self.doctype, "attached_to_doctype": self.name, "is_private":0}, 'name')
+		file = frappe.db.get_value("File", {"attached_to_doctype": self.doctype, "attached_to_name": self.name, "is_private":0}, 'name')
 
 		if file:
 			return frappe.get_doc('File', file)
@@ -77,15 +76,14 @@ class WhatsAppCampaign(Document):
 		self.validate_attachment()
 		media = self.get_attachment()
 		self.db_set('status', 'In Progress')
-		if media:
-			media = get_site_url(frappe.local.site) + media.file_url
 
 		WhatsAppMessage.send_whatsapp_message(
 			receiver_list = self.get_whatsapp_contact(),
 			message = self.message,
 			reference_doctype= self.doctype,
 			reference_name= self.name,
-			media = media
+			attachment = {"fid": media.name} if media else None,
+			lane = "Campaign"
 		)
 
 		self.db_set('status', 'Completed')
@@ -0,0 +1,96 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, get_datetime
+from twilio_integration.twilio_integration.doctype.whatsapp_conversation.whatsapp_conversation import (
+	get_thread,
+	update_reply_window,
+)
+
+BUSINESS_NUMBER = "whatsapp:+15550000001"
+CUSTOMER_NUMBER = "whatsapp:+15550000002"
+TEST_USER = "test-whatsapp-conversation@example.com"
+DATE_SENT = get_datetime("2026-01-01 12:00:00")
+
+
+class TestWhatsAppConversation(FrappeTestCase):
+	def setUp(self):
+		if not frappe.db.exists("WhatsApp Reply Handler", "_Test Reply Window"):
+			frappe.get_doc({
+				"doctype": "WhatsApp Reply Handler",
+				"handler_name": "_Test Reply Window",
+				"allow_indirect_reply": 1,
+				"expiry_indirect_reply": 3600,
+			}).insert(ignore_permissions=True)
+
+	def tearDown(self):
+		frappe.set_user("Administrator")
+		frappe.db.rollback()
+
+	def insert_message(self, sent_received="Received", **values):
+		from_, to = (CUSTOMER_NUMBER, BUSINESS_NUMBER) if sent_received == "Received" else (BUSINESS_NUMBER, CUSTOMER_NUMBER)
+		return frappe.get_doc(dict({
+			"doctype": "WhatsApp Message",
+			"from_": from_,
+			"to": to,
+			"message": "Hello",
+			"sent_received": sent_received,
+			"status": "Received" if sent_received == "Received" else "Queued",
+			"whatsapp_provider": "Twilio",
+		}, **values)).insert(ignore_permissions=True)
+
+	def get_user(self):
+		if not frappe.db.exists("User", TEST_USER):
+			frappe.get_doc({
+				"doctype": "User",
+				"email": TEST_USER,
+				"first_name": "WhatsApp",
+				"send_welcome_email": 0,
+			}).insert(ignore_permissions=True)
+
+		return TEST_USER
+
+	def test_thread_pages_newest_first(self):
+		messages = [self.insert_message(message=f"Message {i}") for i in range(3)]
+		for i, message in enumerate(messages):
+			message.db_set("creation", add_to_date(DATE_SENT, minutes=i), update_modified=False)
+
+		thread = get_thread(messages[0].conversation, page_length=2)
+		self.assertEqual([m.name for m in thread], [messages[2].name, messages[1].name])
+
+		thread = get_thread(messages[0].conversation, before=thread[-1].creation, page_length=2)
+		self.assertEqual([m.name for m in thread], [messages[0].name])
+
+	def test_thread_only_has_messages_the_user_can_read(self):
+		shared = self.insert_message()
+		self.insert_message()
+		user = self.get_user()
+		frappe.share.add("WhatsApp Conversation", shared.conversation, user, flags={"ignore_share_permission": True})
+		frappe.share.add("WhatsApp Message", shared.name, user, flags={"ignore_share_permission": True})
+
+		frappe.set_user(user)
+		thread = get_thread(shared.conversation)
+
+		self.assertEqual([m.name for m in thread], [shared.name])
+
+	def test_reply_window_starts_when_message_is_sent(self):
+		message = self.insert_message("Sent", reply_handler="_Test Reply Window")
+		self.assertIsNone(frappe.db.get_value("WhatsApp Conversation", message.conversation, "reply_window_expires_at"))
+
+		message.db_set({"status": "Sent", "date_sent": DATE_SENT})
+		update_reply_window(message)
+
+		self.assertEqual(
+			frappe.db.get_value("WhatsApp Conversation", message.conversation, "reply_window_expires_at"),
+			add_to_date(DATE_SENT, hours=1),
+		)
+
+	def test_reply_window_of_stored_sent_message(self):
+		message = self.insert_message("Sent", reply_handler="_Test Reply Window", status="Sent", date_sent=DATE_SENT)
+
+		self.assertEqual(
+			frappe.db.get_value("WhatsApp Conversation", message.conversation, "reply_window_expires_at"),
+			add_to_date(DATE_SENT, hours=1),
+		)
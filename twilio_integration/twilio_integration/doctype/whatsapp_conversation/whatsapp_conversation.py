@@ -0,0 +1,178 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_to_date, cint, get_datetime, now_datetime
+
+PREVIEW_LENGTH = 140
+
+
+class WhatsAppConversation(Document):
+	pass
+
+
+def get_message_conversation(message_doc):
+	"""Returns the conversation of the message's business and customer number, created if it does not exist"""
+	if message_doc.sent_received == "Received":
+		business_number, customer_number = message_doc.to, message_doc.from_
+	else:
+		business_number, customer_number = message_doc.from_, message_doc.to
+
+	if not business_number or not customer_number:
+		return None
+
+	return get_or_create_conversation(business_number, customer_number)
+
+
+def update_conversation(message_doc):
+	"""Record a stored message as the latest message of its conversation"""
+	if not message_doc.conversation:
+		return
+
+	values = {
+		"last_message": message_doc.name,
+		"last_message_at": message_doc.date_sent or message_doc.creation or now_datetime(),
+		"last_message_preview": (message_doc.message or "")[:PREVIEW_LENGTH],
+		"last_direction": message_doc.sent_received,
+		"last_status": message_doc.status,
+		"party_doctype": message_doc.party_doctype,
+		"party": message_doc.party,
+	}
+
+	if message_doc.sent_received == "Received":
+		if message_doc.profile_name:
+			values["profile_name"] = message_doc.profile_name
+	elif message_doc.reply_handler:
+		values["reply_handler"] = message_doc.reply_handler
+		values["reply_window_expires_at"] = get_reply_window_expiry(message_doc.reply_handler, message_doc.date_sent)
+
+	set_clause = ", ".join(f"`{fieldname}` = %({fieldname})s" for fieldname, value in values.items() if value)
+	unread_increment = 1 if message_doc.sent_received == "Received" else 0
+
+	# counters are incremented in the query so that concurrent messages are not lost
+	frappe.db.sql(f"""
+		update `tabWhatsApp Conversation`
+		set {set_clause},
+			unread_count = unread_count + %(unread_increment)s,
+			message_count = message_count + 1,
+			modified = %(modified)s
+		where name = %(name)s
+	""", dict(values, name=message_doc.conversation, unread_increment=unread_increment, modified=now_datetime()))
+
+
+def update_reply_window(message_doc):
+	"""Start the conversation's reply window once a message with a reply handler has been sent"""
+	if not message_doc.conversation or not message_doc.reply_handler:
+		return
+
+	expires_at = get_reply_window_expiry(message_doc.reply_handler, message_doc.date_sent)
+	if not expires_at:
+		return
+
+	frappe.db.set_value("WhatsApp Conversation", message_doc.conversation, {
+		"reply_handler": message_doc.reply_handler,
+		"reply_window_expires_at": expires_at,
+	}, update_modified=False)
+
+
+def update_conversation_status(message_names, status):
+	"""Set the status shown for conversations whose last message is one of `message_names`"""
+	if isinstance(message_names, str):
+		message_names = [message_names]
+
+	if not message_names or not status:
+		return
+
+	frappe.db.sql("""
+		update `tabWhatsApp Conversation`
+		set last_status = %(status)s
+		where last_message in %(message_names)s
+	""", {"status": status, "message_names": message_names})
+
+
+def get_or_create_conversation(business_number, customer_number):
+	filters = {"business_number": business_number, "customer_number": customer_number}
+	conversation = frappe.db.get_value("WhatsApp Conversation", filters)
+	if conversation:
+		return conversation
+
+	doc = frappe.new_doc("WhatsApp Conversation")
+	doc.update(filters)
+
+	try:
+		doc.insert(ignore_permissions=True)
+	except (frappe.DuplicateEntryError, frappe.UniqueValidationError):
+		# created by a concurrent message, a locking read waits for its transaction and sees the committed row
+		return frappe.db.get_value("WhatsApp Conversation", filters, for_update=True)
+
+	return doc.name
+
+
+def get_reply_window_expiry(reply_handler, date_sent):
+	"""The window runs from the time the provider sent the message, as checked when a reply comes in"""
+	if not date_sent:
+		return None
+
+	handler = frappe.get_cached_value("WhatsApp Reply Handler", reply_handler,
+		["allow_indirect_reply", "expiry_indirect_reply"], as_dict=True)
+	if not handler or not handler.allow_indirect_reply or cint(handler.expiry_indirect_reply) <= 0:
+		return None
+
+	return add_to_date(get_datetime(date_sent), seconds=cint(handler.expiry_indirect_reply))
+
+
+@frappe.whitelist()
+def get_inbox(business_number=None, unread_only=False, start=0, page_length=20):
+	"""Conversations ordered by their latest message"""
+	filters = {}
+	if business_number:
+		filters["business_number"] = business_number
+	if cint(unread_only):
+		filters["unread_count"] = (">", 0)
+
+	return frappe.get_list("WhatsApp Conversation",
+		filters=filters,
+		fields=[
+			"name", "customer_number", "business_number", "profile_name", "party_doctype", "party",
+			"last_message", "last_message_at", "last_message_preview", "last_direction", "last_status",
+			"unread_count", "reply_window_expires_at",
+		],
+		order_by="last_message_at desc",
+		start=cint(start),
+		page_length=cint(page_length),
+	)
+
+
+@frappe.whitelist()
+def get_thread(conversation, before=None, page_length=50):
+	"""Messages of a conversation the user can read, newest first. Pass the `creation` of the oldest message
+	loaded as `before` to load the previous page."""
+	frappe.get_doc("WhatsApp Conversation", conversation).check_permission()
+
+	filters = {"conversation": conversation}
+	if before:
+		filters["creation"] = ("<", before)
+
+	return frappe.get_list("WhatsApp Message",
+		filters=filters,
+		fields=[
+			"name", "sent_received", "message", "status", "date_sent", "creation", "profile_name",
+			"attachment", "incoming_media_status", "error",
+		],
+		order_by="creation desc",
+		limit=cint(page_length),
+	)
+
+
+@frappe.whitelist()
+def mark_as_read(conversation):
+	doc = frappe.get_doc("WhatsApp Conversation", conversation)
+	doc.check_permission()
+	doc.db_set("unread_count", 0, update_modified=False)
+
+
+def on_doctype_update():
+	frappe.db.add_unique("WhatsApp Conversation", ("business_number", "customer_number"),
+		constraint_name="unique_whatsapp_conversation")
+	frappe.db.add_index("WhatsApp Conversation", ("last_message_at",), "index_last_message_at")
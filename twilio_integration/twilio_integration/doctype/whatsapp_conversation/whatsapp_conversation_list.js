@@ -0,0 +1,7 @@
+frappe.listview_settings['WhatsApp Conversation'] = {
+	get_indicator: function (doc) {
+		if (doc.unread_count) {
+			return [__("{0} Unread", [doc.unread_count]), "blue", "unread_count,>,0"];
+		}
+	},
+}
@@ -1,8 +1,66 @@
 # Copyright (c) 2021, Frappe and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from frappe.utils import add_to_date
+from twilio_integration.twilio_integration.doctype.whatsapp_message import whatsapp_message
+from twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message import (
+	get_message_time_ranges,
+	reconcile_freshchat_message_statuses,
+)
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def get_message(minutes, sent=True):
+	date = add_to_date(START, minutes=minutes)
+	return frappe._dict({"date_sent": date if sent else None, "creation": date})
+
 
 class TestWhatsAppMessage(unittest.TestCase):
-	pass
+	def test_time_ranges_merge_close_messages(self):
+		ranges = get_message_time_ranges([get_message(0), get_message(20), get_message(45)])
+
+		self.assertEqual(ranges, [(add_to_date(START, minutes=-5), add_to_date(START, minutes=50))])
+
+	def test_time_ranges_split_at_gap(self):
+		ranges = get_message_time_ranges([get_message(90), get_message(0), get_message(10)])
+
+		self.assertEqual(ranges, [
+			(add_to_date(START, minutes=-5), add_to_date(START, minutes=15)),
+			(add_to_date(START, minutes=85), add_to_date(START, minutes=95)),
+		])
+
+	def test_time_ranges_use_creation_of_unsent_messages(self):
+		ranges = get_message_time_ranges([get_message(0, sent=False)], margin=0)
+
+		self.assertEqual(ranges, [(START, START)])
+
+	def test_time_ranges_of_no_messages(self):
+		self.assertEqual(get_message_time_ranges([]), [])
+
+	def test_bulk_lookup_pages_scale_with_pending_messages(self):
+		messages = [
+			frappe._dict(get_message(i), name=f"message-{i}", id=f"request-{i}", status="Sent")
+			for i in range(150)
+		]
+		# full pages of messages sent by others on the channel
+		response = MagicMock()
+		response.json.return_value = {"outbound_messages": [
+			{"request_id": f"other-{i}", "status": "DELIVERED"} for i in range(100)
+		]}
+		session = MagicMock()
+		session.__enter__.return_value = session
+		session.get.return_value = response
+
+		with patch.object(whatsapp_message.requests, "Session", return_value=session), \
+			patch.object(whatsapp_message.frappe, "get_cached_doc", return_value=MagicMock(api_endpoint="https://freshchat.test")), \
+			patch.object(whatsapp_message.circuit_breaker, "allow_request", return_value=True), \
+			patch.object(whatsapp_message.circuit_breaker, "record_success"):
+			reconciled = reconcile_freshchat_message_statuses(messages, auto_commit=False)
+
+		self.assertEqual(session.get.call_count, 3)
+		self.assertEqual(reconciled, set())
@@ -25,6 +25,22 @@ frappe.ui.form.on('WhatsApp Message', {
 			});
 		}
 
+		if ((frm.doc.status == "Error" && frm.doc.sent_received == "Sent") || frm.doc.incoming_media_status == "Error") {
+			let button = frm.add_custom_button("Requeue", function () {
+				frappe.call({
+					method: "twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.requeue_messages",
+					args: {
+						message_names: [frm.doc.name],
+					},
+					freeze: 1,
+					btn: button,
+					callback: () => {
+						frm.reload_doc();
+					},
+				});
+			});
+		}
+
 		if (frm.doc.id && frm.doc.sent_received == "Sent") {
 			let button = frm.add_custom_button("Update Delivery Status", function () {
 				frappe.call({
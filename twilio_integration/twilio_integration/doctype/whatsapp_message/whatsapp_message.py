@@ -5,19 +5,50 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils.password import get_decrypted_password
-from frappe.utils import get_site_url, convert_utc_to_system_timezone, time_diff, now_datetime, cint
+from frappe.utils.file_manager import get_content_hash
+from frappe.utils import get_site_url, convert_utc_to_system_timezone, time_diff, now_datetime, cint, add_to_date
 from frappe.utils.response import build_response
 from frappe.utils.verified_command import get_signed_params, verify_request
 from frappe.website.page_renderers.base_renderer import BaseRenderer
 from frappe.website.router import evaluate_dynamic_routes
 from ...twilio_handler import Twilio
+from ...print_format_cache import get_print_format_pdf
+from ... import circuit_breaker, message_lanes, message_rollup, metrics, outbound_stream, retry_policy
+from ...dispatcher import is_dispatcher_running, notify_dispatcher
+from ...profiling import set_trace_reference, slow_trace
+from ..whatsapp_conversation.whatsapp_conversation import (
+	get_message_conversation,
+	update_conversation,
+	update_conversation_status,
+	update_reply_window,
+)
 from urllib.parse import quote, urlparse, urljoin
-from datetime import timedelta
+from datetime import datetime, timedelta
 import json
+import math
 import requests
 
 
+# Order of delivery statuses, callbacks arriving out of order do not move a message back
+MESSAGE_STATUS_RANK = {
+	"Queued": 0,
+	"Sent": 1,
+	"Delivered": 2,
+	"Read": 3,
+}
+
+FRESHCHAT_PAGE_SIZE = 100  # outbound messages per page of bulk status lookups
+
+
 class WhatsAppMessage(Document):
+	def before_insert(self):
+		self.conversation = get_message_conversation(self)
+
+	def after_insert(self):
+		update_conversation(self)
+		if self.sent_received == "Received":
+			message_rollup.record_status_change([self], "Received")
+
 	def on_trash(self):
 		if frappe.session.user != 'Administrator':
 			frappe.throw(_('Only Administrator can delete WhatsApp Message'))
@@ -43,38 +74,31 @@ class WhatsAppMessage(Document):
 
 		print_format_file = self.get_print_format_file(attachment)
 
-		file_data = frappe._dict(file_name=print_format_file["fname"], is_private=1)
-
 		# Store on communication if available, else email queue doc
 		if self.communication:
-			file_data.attached_to_doctype = "Communication"
-			file_data.attached_to_name = self.communication
+			attached_to_doctype, attached_to_name = "Communication", self.communication
 		else:
-			file_data.attached_to_doctype = self.doctype
-			file_data.attached_to_name = self.name
+			attached_to_doctype, attached_to_name = self.doctype, self.name
 
-		fid = frappe.db.get_value("File", file_data)
-		if not fid:
-			file = frappe.new_doc("File", **file_data)
-			file.content = print_format_file["fcontent"]
-			file.insert(ignore_permissions=True)
-			fid = file.name
+		fid, content_hash = store_media_file(
+			print_format_file["fcontent"],
+			print_format_file["fname"],
+			attached_to_doctype,
+			attached_to_name,
+		)
 
 		# not needed becuase twilio downloads the file before sending message and callback
 		# if self.communication:
 		# 	frappe.get_doc("Communication", self.communication).notify_change("update")
 
-		updated_attachment = {"fid": fid}
+		updated_attachment = {"fid": fid, "content_hash": content_hash}
 		self.db_set("attachment", json.dumps(updated_attachment), commit=auto_commit)
 
 		return updated_attachment
 
 	@classmethod
 	def get_print_format_file(cls, attachment):
-		attachment = attachment.copy()
-		attachment.pop("print_format_attachment", None)
-		print_format_file = frappe.attach_print(**attachment)
-		return print_format_file
+		return get_print_format_pdf(attachment)
 
 	@classmethod
 	def send_whatsapp_message(
@@ -96,6 +120,7 @@ class WhatsAppMessage(Document):
 		automated=False,
 		delayed=False,
 		now=False,
+		lane=None,
 	):
 		from frappe.email.doctype.notification.notification import get_doc_for_notification_triggers
 
@@ -127,6 +152,9 @@ class WhatsAppMessage(Document):
 			child_name=child_name,
 		)
 
+		prepare_media = cls.should_prepare_media(attachment)
+		media_messages = []
+
 		for rec in receiver_list:
 			wa_msg = cls.store_whatsapp_message(
 				to=rec,
@@ -144,17 +172,41 @@ class WhatsAppMessage(Document):
 				whatsapp_reply_handler=whatsapp_reply_handler,
 				content_variables=content_variables,
 				notification_type=notification_type,
+				prepare_media=prepare_media,
+				lane=lane,
 			)
 
-			if not delayed:
-				if now:
-					send_whatsapp_message(wa_msg, auto_commit=not now, now=now)
-				else:
-					frappe.enqueue(
-						"twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.send_whatsapp_message",
-						message_doc=wa_msg.name,
-						enqueue_after_commit=True
-					)
+			if prepare_media:
+				media_messages.append(wa_msg.name)
+				continue
+
+			if now and not delayed:
+				send_whatsapp_message(wa_msg, auto_commit=not now, now=now)
+			else:
+				queue_outgoing_message(wa_msg.name, lane=wa_msg.lane, delayed=delayed)
+
+		if media_messages:
+			if now:
+				prepare_outgoing_media(media_messages, send=not delayed, auto_commit=False, now=True)
+			else:
+				frappe.enqueue(
+					"twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.prepare_outgoing_media",
+					message_names=media_messages,
+					send=not delayed,
+					queue=get_media_queue(),
+					enqueue_after_commit=True
+				)
+
+	@classmethod
+	def should_prepare_media(cls, attachment):
+		"""Print format attachments are rendered ahead of dispatch if enabled in WhatsApp Settings"""
+		if isinstance(attachment, str):
+			attachment = json.loads(attachment)
+
+		if not attachment or attachment.get("print_format_attachment") != 1:
+			return False
+
+		return cint(frappe.get_cached_value("WhatsApp Settings", None, "prepare_media_before_sending"))
 
 	@classmethod
 	def create_outgoing_communication(
@@ -278,6 +330,8 @@ class WhatsAppMessage(Document):
 		whatsapp_reply_handler=None,
 		content_variables=None,
 		notification_type=None,
+		prepare_media=False,
+		lane=None,
 	):
 		sender = frappe.db.get_single_value('WhatsApp Settings', 'whatsapp_no')
 		if not sender:
@@ -308,6 +362,8 @@ class WhatsAppMessage(Document):
 			'template_sid': template.template_sid or None,
 			'reply_handler': reply_handler or None,
 			'whatsapp_provider': whatsapp_provider or None,
+			'outgoing_media_status': 'To Prepare' if prepare_media else None,
+			'lane': message_lanes.get_lane(lane),
 			'status': 'Not Sent',
 			'retry': 0,
 		})
@@ -364,9 +420,12 @@ class WhatsAppMessage(Document):
 		return wa_msg
 
 	def send_whatsapp_via_twilio(self):
-		client = Twilio.get_twilio_client()
-		message_dict = self.get_twilio_message_dict()
-		response = client.messages.create(**message_dict)
+		with metrics.timed("payload"):
+			client = Twilio.get_twilio_client()
+			message_dict = self.get_twilio_message_dict()
+
+		with metrics.timed("provider_http"):
+			response = client.messages.create(**message_dict)
 
 		date_sent = response.date_sent or response.date_created
 		if date_sent:
@@ -403,7 +462,7 @@ class WhatsAppMessage(Document):
 		return args
 
 	def send_whatsapp_via_genesys(self):
-		genesys_settings = frappe.get_single("Genesys WhatsApp Settings")
+		genesys_settings = frappe.get_cached_doc("Genesys WhatsApp Settings")
 
 		url = urljoin(genesys_settings.api_base_url, "/api/v2/conversations/messages/agentless")
 		from_address = genesys_settings.from_address
@@ -429,7 +488,9 @@ class WhatsAppMessage(Document):
 		if self.button_url:
 			button_parameters.append({"id": 1, "value": self.button_url})
 
-		access_token = genesys_settings.get_access_token()
+		with metrics.timed("auth"):
+			access_token = genesys_settings.get_access_token()
+
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {access_token}",
@@ -448,12 +509,13 @@ class WhatsAppMessage(Document):
 			}
 		}
 
-		response = requests.post(
-			url,
-			headers=headers,
-			json=payload,
-			timeout=30,
-		)
+		with metrics.timed("provider_http"):
+			response = requests.post(
+				url,
+				headers=headers,
+				json=payload,
+				timeout=30,
+			)
 
 		try:
 			response.raise_for_status()
@@ -482,7 +544,7 @@ class WhatsAppMessage(Document):
 		return out
 
 	def send_whatsapp_via_freshchat(self):
-		freshchat_settings = frappe.get_single("Freshchat Settings")
+		freshchat_settings = frappe.get_cached_doc("Freshchat Settings")
 
 		api_key = freshchat_settings.get_password("api_key")
 		api_endpoint = urljoin(freshchat_settings.api_endpoint, "/v2/outbound-messages/whatsapp")
@@ -546,12 +608,13 @@ class WhatsAppMessage(Document):
 			"data": message_data,
 		}
 
-		response = requests.post(
-			api_endpoint,
-			headers=headers,
-			json=payload,
-			timeout=30,
-		)
+		with metrics.timed("provider_http"):
+			response = requests.post(
+				api_endpoint,
+				headers=headers,
+				json=payload,
+				timeout=30,
+			)
 		response.raise_for_status()
 		response_data = response.json()
 
@@ -628,6 +691,7 @@ class WhatsAppMessage(Document):
 		if not message_status.status or (message_status.status == previous_status):
 			return
 
+		on_message_status_change([self], message_status.status)
 		self.db_set({
 			"status": message_status.status,
 			"error": message_status.error,
@@ -665,7 +729,7 @@ class WhatsAppMessage(Document):
 		if not self.id:
 			return out
 
-		freshchat_settings = frappe.get_single("Freshchat Settings")
+		freshchat_settings = frappe.get_cached_doc("Freshchat Settings")
 
 		api_key = freshchat_settings.get_password("api_key")
 		api_endpoint = urljoin(freshchat_settings.api_endpoint, "/v2/outbound-messages")
@@ -690,11 +754,7 @@ class WhatsAppMessage(Document):
 		if not message_data or not message_data.get("status"):
 			return out
 
-		if message_data.get("status") in ("IN_PROGRESS", "ACCEPTED"):
-			out.status = "Queued"
-		else:
-			out.status = message_data.get("status").title()
-
+		out.status = get_freshchat_message_status(message_data.get("status"))
 		if out.status == "Failed":
 			out.error = message_data.get("failure_reason")
 
@@ -708,7 +768,7 @@ class WhatsAppMessage(Document):
 		if not self.id or not self.conversation_id:
 			return out
 
-		genesys_settings = frappe.get_single("Genesys WhatsApp Settings")
+		genesys_settings = frappe.get_cached_doc("Genesys WhatsApp Settings")
 
 		url = urljoin(genesys_settings.api_base_url, f"/api/v2/conversations/messages/{quote(self.conversation_id)}/messages/{quote(self.id)}")
 		access_token = genesys_settings.get_access_token()
@@ -725,12 +785,7 @@ class WhatsAppMessage(Document):
 		if not response_data or not response_data.get("status"):
 			return out
 
-		if response_data.get("status") == "delivery-success":
-			out.status = "Delivered"
-		elif response_data.get("status") == "delivery-failed":
-			out.status = "Failed"
-		else:
-			out.status = response_data.get("status").title()
+		out.status = get_genesys_message_status(response_data.get("status"))
 
 		# todo get error message
 		# if out.status == "delivery-failed":
@@ -740,22 +795,109 @@ class WhatsAppMessage(Document):
 
 
 def outgoing_message_status_callback(args, auto_commit=False):
-	message = frappe.db.get_value("WhatsApp Message", filters={
+	update_outgoing_message_status({
 		'id': args.MessageSid,
 		'from_': args.From,
 		'to': args.To
-	}, fieldname=["name", "communication"], as_dict=1)
+	}, args.MessageStatus.title(), auto_commit=auto_commit)
 
-	if message:
-		frappe.db.set_value("WhatsApp Message", message.name, {
-			"status": args.MessageStatus.title(),
-		})
-		if auto_commit:
-			frappe.db.commit()
 
-		if message.communication:
-			comm = frappe.get_doc("Communication", message.communication)
-			comm.set_delivery_status(commit=auto_commit)
+def freshchat_status_callback(payload, auto_commit=False):
+	"""Status update webhook of Freshchat outbound messages, events that are not status updates are ignored"""
+	for event in payload if isinstance(payload, list) else [payload]:
+		data = event.get("data") or {}
+		message_data = data.get("outbound_message") or data.get("message") or data
+		if not message_data.get("request_id") or not message_data.get("status"):
+			continue
+
+		status = get_freshchat_message_status(message_data.get("status"))
+		update_outgoing_message_status({
+			"id": message_data.get("request_id"),
+			"whatsapp_provider": "Freshchat",
+		}, status, error=message_data.get("failure_reason") if status == "Failed" else None, auto_commit=auto_commit)
+
+
+def genesys_status_callback(payload, auto_commit=False):
+	"""Message receipt webhook of Genesys Open Messaging"""
+	message_id = payload.get("id") or payload.get("messageId")
+	if not message_id or not payload.get("status"):
+		return
+
+	status = get_genesys_message_status(payload.get("status"))
+
+	error = None
+	if status == "Failed":
+		error = ", ".join(reason.get("message") or reason.get("code") or "" for reason in payload.get("reasons") or [])
+
+	update_outgoing_message_status({
+		"id": message_id,
+		"whatsapp_provider": "Genesys",
+	}, status, error=error or None, auto_commit=auto_commit)
+
+
+def update_outgoing_message_status(filters, status, error=None, auto_commit=False):
+	"""Apply a status reported by a provider callback. Out of order updates do not move a message back."""
+	message = frappe.db.get_value("WhatsApp Message", filters=filters,
+		fieldname=["name", "status", "communication", "whatsapp_provider", "template_sid", "notification_type"], as_dict=1)
+
+	if not message or not status or message.status == status:
+		return
+
+	current_rank = MESSAGE_STATUS_RANK.get(message.status)
+	new_rank = MESSAGE_STATUS_RANK.get(status)
+	if current_rank is not None and new_rank is not None and new_rank < current_rank:
+		return
+
+	values = {"status": status}
+	if error:
+		values["error"] = error
+
+	frappe.db.set_value("WhatsApp Message", message.name, values)
+	on_message_status_change([message], status)
+	if auto_commit:
+		frappe.db.commit()
+
+	if message.communication:
+		comm = frappe.get_doc("Communication", message.communication)
+		comm.set_delivery_status(commit=auto_commit)
+
+
+def on_message_status_change(messages, status):
+	"""
+	Update conversations and delivery rollups of messages moving into `status`. Called before the status
+	is written, `messages` still carry their previous status.
+	"""
+	if status != message_rollup.DISPATCHED:
+		update_conversation_status([message.name for message in messages], status)
+
+	if status != "Delivered":
+		message_rollup.record_status_change(messages, status)
+
+	# counted as delivered once, when a message first reaches Delivered or a later status like Read
+	delivered_rank = MESSAGE_STATUS_RANK["Delivered"]
+	if MESSAGE_STATUS_RANK.get(status, -1) >= delivered_rank:
+		message_rollup.record_status_change([
+			message for message in messages
+			if MESSAGE_STATUS_RANK.get(message.get("status"), -1) < delivered_rank
+		], "Delivered")
+
+
+def get_freshchat_message_status(status):
+	if status in ("IN_PROGRESS", "ACCEPTED"):
+		return "Queued"
+
+	return status.title()
+
+
+def get_genesys_message_status(status):
+	if status == "delivery-success":
+		return "Delivered"
+	elif status == "delivery-failed":
+		return "Failed"
+	elif status == "Published":
+		return "Sent"
+
+	return status.title()
 
 
 def run_before_send_method(
@@ -831,25 +973,66 @@ def send_now(message_name):
 		frappe.throw(str(e))
 
 
+@frappe.whitelist()
+def requeue_messages(message_names):
+	"""Requeue messages that gave up retrying, outgoing messages are sent again and incoming media is downloaded again"""
+	message_names = frappe.parse_json(message_names)
+	if isinstance(message_names, str):
+		message_names = [message_names]
+
+	requeued = 0
+	for message_name in message_names:
+		message_doc = frappe.get_doc("WhatsApp Message", message_name, for_update=True)
+		message_doc.check_permission("write")
+
+		reset = {
+			"retry": 0,
+			"next_attempt_at": None,
+			"error_class": None,
+		}
+		if message_doc.sent_received == "Sent" and message_doc.status == "Error":
+			reset["status"] = "Not Sent"
+		elif message_doc.sent_received == "Received" and message_doc.incoming_media_status == "Error":
+			reset["incoming_media_status"] = "To Download"
+		else:
+			continue
+
+		message_doc.db_set(reset)
+		if reset.get("status"):
+			queue_outgoing_message(message_doc.name, lane=message_doc.lane, delayed=True)
+			if message_doc.communication:
+				frappe.get_doc('Communication', message_doc.communication).set_delivery_status(commit=False)
+
+		requeued += 1
+
+	return requeued
+
+
 def flush_outgoing_message_queue(from_test=False):
-	"""Flush queued WhatsApp Messages, called from scheduler"""
+	"""Flush queued WhatsApp Messages, called from scheduler. Skipped while the dispatcher is running."""
 	auto_commit = not from_test
 
 	if are_whatsapp_messages_muted():
 		frappe.msgprint(_("WhatsApp messages are muted"))
 		return
 
-	for message_name in get_queued_outgoing_messages():
+	if is_dispatcher_running() and not from_test:
+		return
+
+	for message_name in get_queued_outgoing_messages(exclude_providers=circuit_breaker.get_open_providers()):
 		message_doc = frappe.get_doc("WhatsApp Message", message_name, for_update=True)
 		send_whatsapp_message(message_doc, auto_commit=auto_commit)
 
 
+@slow_trace("Send")
 def send_whatsapp_message(message_doc, auto_commit=True, now=False):
 	from frappe.email.doctype.notification.notification import get_doc_for_notification_triggers
 
 	if isinstance(message_doc, str):
 		message_doc = frappe.get_doc("WhatsApp Message", message_doc, for_update=True)
 
+	set_trace_reference("WhatsApp Message", message_doc.name)
+
 	if are_whatsapp_messages_muted(message_doc.whatsapp_provider):
 		frappe.msgprint(_("WhatsApp messages are muted"))
 		return
@@ -859,18 +1042,54 @@ def send_whatsapp_message(message_doc, auto_commit=True, now=False):
 			frappe.db.rollback()
 		return
 
-	message_doc.db_set("status", "Sending", commit=auto_commit)
-	if message_doc.communication:
-		frappe.get_doc('Communication', message_doc.communication).set_delivery_status(commit=auto_commit)
+	# Media is still being rendered, message is sent once it is ready
+	if message_doc.outgoing_media_status == "To Prepare" and not now:
+		if auto_commit:
+			frappe.db.rollback()
+		return
+
+	# Provider is failing, message stays queued without spending a retry
+	if not circuit_breaker.allow_request(message_doc.whatsapp_provider):
+		if auto_commit:
+			frappe.db.rollback()
+		if now:
+			frappe.throw(_("{0} is currently unavailable, the message will be sent once it recovers")
+				.format(message_doc.whatsapp_provider), exc=circuit_breaker.CircuitOpenError)
+		return
+
+	# Lane concurrency and rate budget, messages sent right away are not limited
+	slot = None
+	if not now:
+		slot = message_lanes.acquire_send_slot(message_doc.lane)
+		if slot is False or not message_lanes.consume_rate_budget(message_doc.lane):
+			message_lanes.release_send_slot(slot)
+			if auto_commit:
+				frappe.db.rollback()
+			return
+
+	timer = metrics.start_send_timer(message_doc.whatsapp_provider)
 
 	try:
-		doc = get_doc_for_notification_triggers(message_doc.reference_doctype, message_doc.reference_name)
-		run_before_send_method(
-			doc,
-			notification_type=message_doc.notification_type,
-			child_doctype=message_doc.child_doctype,
-			child_name=message_doc.child_name,
-		)
+		with metrics.timed("db_write"):
+			message_doc.db_set("status", "Sending", commit=auto_commit)
+		if message_doc.communication:
+			with metrics.timed("communication"):
+				frappe.get_doc('Communication', message_doc.communication).set_delivery_status(commit=auto_commit)
+	except Exception:
+		# not sent, the timer and lane slot are given back before the error is raised
+		message_lanes.release_send_slot(slot)
+		metrics.finish_send_timer(timer)
+		raise
+
+	try:
+		with metrics.timed("before_send"):
+			doc = get_doc_for_notification_triggers(message_doc.reference_doctype, message_doc.reference_name)
+			run_before_send_method(
+				doc,
+				notification_type=message_doc.notification_type,
+				child_doctype=message_doc.child_doctype,
+				child_name=message_doc.child_name,
+			)
 
 		whatsapp_provider = message_doc.whatsapp_provider
 		if whatsapp_provider == "Twilio":
@@ -882,39 +1101,62 @@ def send_whatsapp_message(message_doc, auto_commit=True, now=False):
 		else:
 			frappe.throw(_("Please configure WhatsApp Provider"))
 
-		message_doc.db_set({
-			"id": result.get("id"),
-			"conversation_id": result.get("conversation_id"),
-			"status": result.get("status"),
-			"date_sent": result.get("date_sent"),
-			"error": result.get("error"),
-		}, commit=auto_commit)
+		circuit_breaker.record_success(whatsapp_provider)
 
-		if message_doc.communication:
-			frappe.get_doc('Communication', message_doc.communication).set_delivery_status(commit=auto_commit)
+		timer.count(metrics.MESSAGES_COUNTER, "Dispatched")
 
-		run_after_send_method(
-			reference_doctype=message_doc.reference_doctype,
-			reference_name=message_doc.reference_name,
-			notification_type=message_doc.notification_type,
-			child_doctype=message_doc.child_doctype,
-			child_name=message_doc.child_name,
-		)
+		with metrics.timed("db_write"):
+			on_message_status_change([message_doc], message_rollup.DISPATCHED)
+			on_message_status_change([message_doc], result.get("status"))
+			message_doc.db_set({
+				"id": result.get("id"),
+				"conversation_id": result.get("conversation_id"),
+				"status": result.get("status"),
+				"date_sent": result.get("date_sent"),
+				"error": result.get("error"),
+			})
+			update_reply_window(message_doc)
+
+			if auto_commit:
+				frappe.db.commit()
+
+		if message_doc.communication:
+			with metrics.timed("communication"):
+				frappe.get_doc('Communication', message_doc.communication).set_delivery_status(commit=auto_commit)
+
+		with metrics.timed("after_send"):
+			run_after_send_method(
+				reference_doctype=message_doc.reference_doctype,
+				reference_name=message_doc.reference_name,
+				notification_type=message_doc.notification_type,
+				child_doctype=message_doc.child_doctype,
+				child_name=message_doc.child_name,
+			)
 
 	except Exception as e:
 		if auto_commit:
 			frappe.db.rollback()
 
-		if message_doc.retry < 3:
+		circuit_breaker.record_failure(message_doc.whatsapp_provider, e)
+
+		error_class = retry_policy.get_error_class(e)
+		if retry_policy.should_retry(message_doc.retry, error_class):
+			timer.count(metrics.MESSAGES_COUNTER, "Retry")
 			message_doc.db_set({
 				"status": "Not Sent",
 				"retry": message_doc.retry + 1,
+				"next_attempt_at": retry_policy.get_next_attempt_at(message_doc.retry, e),
 				"error": str(e),
+				"error_class": error_class,
 			}, commit=auto_commit)
 		else:
+			timer.count(metrics.MESSAGES_COUNTER, "Error")
+			message_doc.error_class = error_class
+			on_message_status_change([message_doc], "Error")
 			message_doc.db_set({
 				"status": "Error",
 				"error": str(e),
+				"error_class": error_class,
 			}, commit=auto_commit)
 
 		if message_doc.communication:
@@ -929,6 +1171,87 @@ def send_whatsapp_message(message_doc, auto_commit=True, now=False):
 				reference_name=message_doc.name
 			)
 
+	finally:
+		message_lanes.release_send_slot(slot)
+		metrics.finish_send_timer(timer)
+
+
+def flush_outgoing_media_queue(from_test=False):
+	"""Prepare media of queued WhatsApp Messages whose preparation job did not run, called from scheduler"""
+	auto_commit = not from_test
+
+	if are_whatsapp_messages_muted():
+		frappe.msgprint(_("WhatsApp messages are muted"))
+		return
+
+	message_names = get_queued_outgoing_media_messages()
+	if message_names:
+		prepare_outgoing_media(message_names, send=False, auto_commit=auto_commit)
+
+
+def prepare_outgoing_media(message_names, send=True, auto_commit=True, now=False):
+	"""
+	Render and store print format attachments of outgoing messages before dispatch,
+	so that the provider fetching the media URL does not wait for the render.
+	"""
+	if isinstance(message_names, str):
+		message_names = [message_names]
+
+	for message_name in message_names:
+		message_doc = frappe.get_doc("WhatsApp Message", message_name, for_update=True)
+		if message_doc.outgoing_media_status != "To Prepare":
+			if auto_commit:
+				frappe.db.rollback()
+			continue
+
+		try:
+			attachment = message_doc.get_attachment()
+			if attachment and attachment.get("print_format_attachment") == 1:
+				if not message_doc.store_print_attachment(attachment, auto_commit=auto_commit):
+					# Storing PDFs is disabled, render into the shared cache for the provider fetch instead
+					message_doc.get_print_format_file(attachment)
+
+			message_doc.db_set("outgoing_media_status", "Ready", commit=auto_commit)
+
+		except Exception:
+			if auto_commit:
+				frappe.db.rollback()
+
+			# media is rendered on fetch as a fallback
+			message_doc.db_set("outgoing_media_status", "Error", commit=auto_commit)
+			frappe.log_error(
+				title=_("Failed to prepare WhatsApp media"),
+				reference_doctype="WhatsApp Message",
+				reference_name=message_doc.name
+			)
+
+		if now and send:
+			send_whatsapp_message(message_doc, auto_commit=auto_commit, now=now)
+		else:
+			queue_outgoing_message(message_doc.name, lane=message_doc.lane, delayed=not send)
+
+
+def queue_outgoing_message(message_name, lane=None, delayed=False):
+	"""
+	Hand a stored message over for sending, to the dispatcher's stream if the Redis Stream backend is used,
+	otherwise to a background job. Delayed messages are left for the dispatcher or the scheduler.
+	"""
+	if outbound_stream.is_stream_backend_enabled() and is_dispatcher_running():
+		outbound_stream.publish_message(message_name)
+	elif delayed:
+		notify_dispatcher()
+	else:
+		frappe.enqueue(
+			"twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.send_whatsapp_message",
+			message_doc=message_name,
+			queue=message_lanes.get_lane_queue(lane),
+			enqueue_after_commit=True
+		)
+
+
+def get_media_queue():
+	return frappe.conf.get("whatsapp_media_queue") or "long"
+
 
 def flush_incoming_media_queue(from_test=False):
 	"""Flush queued WhatsApp Messages, called from scheduler"""
@@ -979,25 +1302,19 @@ def download_incoming_media(message_name, auto_commit=True, now=False):
 
 		response = Twilio.download_media_request(media_url)
 
-		file_data = frappe._dict(file_name=filename, is_private=1)
 		if message_doc.communication:
-			file_data.attached_to_doctype = "Communication"
-			file_data.attached_to_name = message_doc.communication
+			attached_to_doctype, attached_to_name = "Communication", message_doc.communication
 		else:
-			file_data.attached_to_doctype = message_doc.doctype
-			file_data.attached_to_name = message_doc.name
+			attached_to_doctype, attached_to_name = message_doc.doctype, message_doc.name
 
-		file = frappe.new_doc("File", **file_data)
-		file.content = response.content
-		file.insert(ignore_permissions=True)
-
-		fid = file.name
+		fid, content_hash = store_media_file(response.content, filename, attached_to_doctype, attached_to_name)
 
 		if message_doc.communication:
 			frappe.get_doc("Communication", message_doc.communication).notify_change("update")
 
 		updated_attachment = attachment.copy()
 		updated_attachment["fid"] = fid
+		updated_attachment["content_hash"] = content_hash
 		message_doc.db_set({
 			"incoming_media_status": "Attached",
 			"attachment": json.dumps(updated_attachment),
@@ -1008,16 +1325,20 @@ def download_incoming_media(message_name, auto_commit=True, now=False):
 		if auto_commit:
 			frappe.db.rollback()
 
-		if message_doc.retry < 3:
+		error_class = retry_policy.get_error_class(e)
+		if retry_policy.should_retry(message_doc.retry, error_class):
 			message_doc.db_set({
 				"incoming_media_status": "To Download",
 				"retry": message_doc.retry + 1,
+				"next_attempt_at": retry_policy.get_next_attempt_at(message_doc.retry, e),
 				"error": str(e),
+				"error_class": error_class,
 			}, commit=auto_commit)
 		else:
 			message_doc.db_set({
 				"incoming_media_status": "Error",
 				"error": str(e),
+				"error_class": error_class,
 			}, commit=auto_commit)
 
 		if now:
@@ -1030,14 +1351,81 @@ def download_incoming_media(message_name, auto_commit=True, now=False):
 			)
 
 
-def get_queued_outgoing_messages():
+def store_media_file(content, file_name, attached_to_doctype, attached_to_name):
+	"""
+	Store WhatsApp media as a private File and return (File name, content hash).
+
+	If the same content is already attached to the document, that File is reused as is. Content stored
+	for other documents is not written again, `File` points new records at the existing file by its
+	content hash.
+	"""
+	content_hash = get_content_hash(content)
+
+	fid = frappe.db.get_value("File", {
+		"content_hash": content_hash,
+		"is_private": 1,
+		"attached_to_doctype": attached_to_doctype,
+		"attached_to_name": attached_to_name,
+	})
+	if fid:
+		return fid, content_hash
+
+	file = frappe.get_doc({
+		"doctype": "File",
+		"file_name": file_name,
+		"is_private": 1,
+		"attached_to_doctype": attached_to_doctype,
+		"attached_to_name": attached_to_name,
+		"content": content,
+	})
+	file.insert(ignore_permissions=True)
+	return file.name, content_hash
+
+
+def get_queued_outgoing_messages(exclude_providers=None, limit=500):
+	"""
+	Queued messages of all lanes, interleaved by lane weight.
+	Each lane is limited to what it may still send in the current minute.
+	"""
+	provider_condition = ""
+	if exclude_providers:
+		provider_condition = "and ifnull(whatsapp_provider, '') not in %(exclude_providers)s"
+
+	messages_by_lane = {}
+	for lane in message_lanes.LANES:
+		lane_limit = message_lanes.get_remaining_rate_budget(lane)
+		lane_limit = limit if lane_limit is None else min(lane_limit, limit)
+		if not lane_limit:
+			continue
+
+		messages_by_lane[lane] = frappe.db.sql_list("""
+			select name
+			from `tabWhatsApp Message`
+			where status = 'Not Sent' and sent_received = 'Sent' and lane = %(lane)s
+				and ifnull(outgoing_media_status, '') != 'To Prepare'
+				and (next_attempt_at is null or next_attempt_at <= %(now)s)
+				{provider_condition}
+			order by priority desc, creation asc
+			limit %(limit)s
+		""".format(provider_condition=provider_condition), {
+			"now": now_datetime(),
+			"lane": lane,
+			"limit": lane_limit,
+			"exclude_providers": exclude_providers,
+		})
+
+	return message_lanes.interleave_lanes(messages_by_lane, limit)
+
+
+def get_queued_outgoing_media_messages():
 	return frappe.db.sql_list("""
 		select name
 		from `tabWhatsApp Message`
-		where status = 'Not Sent' and sent_received = 'Sent'
+		where outgoing_media_status = 'To Prepare' and status = 'Not Sent'
+			and modified < %(modified_before)s
 		order by priority desc, creation asc
-		limit 500
-	""")
+		limit 100
+	""", {"modified_before": add_to_date(now_datetime(), minutes=-10)})
 
 
 def get_queued_incoming_media_messages():
@@ -1045,20 +1433,32 @@ def get_queued_incoming_media_messages():
 		select name
 		from `tabWhatsApp Message`
 		where incoming_media_status = 'To Download' and sent_received = 'Received'
+			and (next_attempt_at is null or next_attempt_at <= %(now)s)
 		order by priority desc, creation asc
 		limit 100
-	""")
+	""", {"now": now_datetime()})
 
 
 def expire_whatsapp_message_queue():
 	"""Expire WhatsApp messages not sent for 7 days. Called daily via scheduler."""
+	# the same cutoff for both queries so that the rollup counts the messages expired
+	values = {"modified_before": add_to_date(now_datetime(), days=-7)}
+
+	expired_messages = frappe.db.sql("""
+		SELECT whatsapp_provider, template_sid, notification_type
+		FROM `tabWhatsApp Message`
+		WHERE modified < %(modified_before)s AND status = 'Not Sent'
+	""", values, as_dict=True)
+	message_rollup.record_status_change(expired_messages, "Expired")
+
 	frappe.db.sql("""
 		UPDATE `tabWhatsApp Message`
 		SET status = 'Expired'
-		WHERE modified < (NOW() - INTERVAL '7' DAY) AND status = 'Not Sent'
-	""")
+		WHERE modified < %(modified_before)s AND status = 'Not Sent'
+	""", values)
 
 
+@slow_trace("Incoming Message")
 def incoming_message_callback(args):
 	out = frappe._dict({
 		"reply_message": None,
@@ -1135,6 +1535,7 @@ def incoming_message_callback(args):
 	)
 
 	incoming_message.insert(ignore_permissions=True)
+	set_trace_reference("WhatsApp Message", incoming_message.name)
 
 	frappe.db.commit()
 
@@ -1176,6 +1577,10 @@ def incoming_message_callback(args):
 def reconcile_status_now(message_name):
 	message_doc = frappe.get_doc("WhatsApp Message", message_name, for_update=True)
 	message_doc.check_permission()
+	if not circuit_breaker.allow_request(message_doc.whatsapp_provider):
+		frappe.throw(_("{0} is currently unavailable, please try again later")
+			.format(message_doc.whatsapp_provider), exc=circuit_breaker.CircuitOpenError)
+
 	reconcile_message_status(message_doc, auto_commit=False)
 
 
@@ -1189,14 +1594,34 @@ def update_messages_pending_status_reconciliation(limit=100, auto_commit=True):
 		frappe.msgprint(_("WhatsApp messages are muted"))
 		return
 
-	for message_name in get_messages_pending_status_reconciliation(limit):
+	message_names = get_messages_pending_status_reconciliation(limit, exclude_providers=circuit_breaker.get_open_providers())
+
+	# Freshchat statuses can be looked up in bulk, messages not found are reconciled one by one
+	freshchat_messages = []
+	if cint(frappe.get_cached_value("Freshchat Settings", None, "bulk_status_reconciliation")):
+		freshchat_messages = frappe.get_all("WhatsApp Message",
+			filters={"name": ("in", message_names or [""]), "whatsapp_provider": "Freshchat"},
+			fields=["name", "id", "status", "communication", "date_sent", "creation",
+				"whatsapp_provider", "template_sid", "notification_type"])
+	if freshchat_messages:
+		reconciled = reconcile_freshchat_message_statuses(freshchat_messages, auto_commit=auto_commit)
+		message_names = [name for name in message_names if name not in reconciled]
+
+	for message_name in message_names:
 		message_doc = frappe.get_doc("WhatsApp Message", message_name, for_update=True)
+		if not circuit_breaker.allow_request(message_doc.whatsapp_provider):
+			# reconciled in a later run once the provider recovers
+			if auto_commit:
+				frappe.db.rollback()
+			continue
+
 		reconcile_message_status(message_doc, auto_commit=auto_commit)
 
 
 def reconcile_message_status(message_doc, auto_commit=True):
 	try:
 		message_doc.update_message_delivery_status()
+		circuit_breaker.record_success(message_doc.whatsapp_provider)
 		if auto_commit:
 			frappe.db.commit()
 
@@ -1204,6 +1629,8 @@ def reconcile_message_status(message_doc, auto_commit=True):
 		if auto_commit:
 			frappe.db.rollback()
 
+		circuit_breaker.record_failure(message_doc.whatsapp_provider, e)
+
 		if message_doc.retry < 3:
 			message_doc.db_set({
 				"retry": message_doc.retry + 1,
@@ -1222,10 +1649,185 @@ def reconcile_message_status(message_doc, auto_commit=True):
 		)
 
 
-def get_messages_pending_status_reconciliation(limit):
+def reconcile_freshchat_message_statuses(messages, auto_commit=True):
+	"""
+	Look up statuses of Freshchat messages with time ranged outbound message queries instead of one request
+	per message and update them in bulk. Returns names of messages found, including those without a change.
+	"""
+	if not circuit_breaker.allow_request("Freshchat"):
+		return set(message.name for message in messages)
+
+	pending = {message.id: message for message in messages if message.id}
+	updates = {}
+
+	# a page can list messages sent by others on the channel, at most twice the pages the pending
+	# messages fill are fetched so that the bulk lookup stays cheaper than one request per message
+	max_pages = math.ceil(len(pending) * 2 / FRESHCHAT_PAGE_SIZE)
+
+	try:
+		time_ranges = get_message_time_ranges(pending.values())
+		for message_data in iter_freshchat_outbound_messages(time_ranges, FRESHCHAT_PAGE_SIZE, max_pages):
+			message = pending.pop(message_data.get("request_id"), None)
+			if not message or not message_data.get("status"):
+				continue
+
+			status = get_freshchat_message_status(message_data.get("status"))
+			error = message_data.get("failure_reason") if status == "Failed" else None
+			updates.setdefault((status, error), []).append(message)
+
+			if not pending:
+				break
+
+		circuit_breaker.record_success("Freshchat")
+
+	except Exception as e:
+		circuit_breaker.record_failure("Freshchat", e)
+		frappe.log_error(title=_("Error Reconciling Freshchat Message Delivery Status"))
+
+		# reconciled one by one unless the provider is failing
+		if circuit_breaker.is_open("Freshchat"):
+			return set(message.name for message in messages)
+
+	for (status, error), status_messages in updates.items():
+		update_message_statuses(status_messages, status, error)
+
+	if auto_commit:
+		frappe.db.commit()
+
+	return set(message.name for message in messages) - set(message.name for message in pending.values())
+
+
+def get_message_time_ranges(messages, gap=30 * 60, margin=5 * 60):
+	"""Time ranges covering when messages were sent, split where no message was sent for `gap` seconds"""
+	dates = sorted(message.date_sent or message.creation for message in messages)
+
+	ranges = []
+	for date in dates:
+		if ranges and (date - ranges[-1][1]).total_seconds() <= gap:
+			ranges[-1][1] = date
+		else:
+			ranges.append([date, date])
+
+	return [
+		(add_to_date(from_date, seconds=-margin), add_to_date(to_date, seconds=margin))
+		for from_date, to_date in ranges
+	]
+
+
+def iter_freshchat_outbound_messages(time_ranges, page_size=FRESHCHAT_PAGE_SIZE, max_pages=50):
 	"""
-	Fetch WhatsApp messages with status 'Sent' or 'Queued' and that haven't received delivery confirmation
+	Yields outbound messages sent within the time ranges, fetching one page at a time. At most `max_pages`
+	are fetched for all ranges together. Paging through a range stops once a page has messages sent before
+	the range, in case the dates are not applied as a filter.
 	"""
+	freshchat_settings = frappe.get_cached_doc("Freshchat Settings")
+
+	api_key = freshchat_settings.get_password("api_key")
+	api_endpoint = urljoin(freshchat_settings.api_endpoint, "/v2/outbound-messages")
+
+	headers = {
+		"Authorization": f"Bearer {api_key}",
+		"Content-Type": "application/json"
+	}
+
+	pages = 0
+	with requests.Session() as session:
+		for from_date, to_date in time_ranges:
+			page = 1
+			while pages < max_pages:
+				response = session.get(
+					api_endpoint,
+					headers=headers,
+					params={
+						"from_date": get_utc_isoformat(from_date),
+						"to_date": get_utc_isoformat(to_date),
+						"page": page,
+						"items_per_page": page_size,
+					},
+					timeout=30,
+				)
+				response.raise_for_status()
+				pages += 1
+				page += 1
+
+				outbound_messages = response.json().get("outbound_messages") or []
+				yield from outbound_messages
+
+				if len(outbound_messages) < page_size or has_messages_before(outbound_messages, from_date):
+					break
+
+
+def has_messages_before(outbound_messages, date):
+	for message_data in outbound_messages:
+		created_on = get_freshchat_datetime(message_data.get("created_on"))
+		if created_on and created_on < date:
+			return True
+
+	return False
+
+
+def get_freshchat_datetime(value):
+	"""Freshchat's UTC ISO 8601 date in system timezone, None if missing or invalid"""
+	if not value:
+		return None
+
+	try:
+		date = datetime.fromisoformat(value.replace("Z", "+00:00"))
+	except (TypeError, ValueError):
+		return None
+
+	return convert_utc_to_system_timezone(date).replace(tzinfo=None)
+
+
+def update_message_statuses(messages, status, error=None):
+	"""Set the status of several messages with one query, skipping out of order updates"""
+	new_rank = MESSAGE_STATUS_RANK.get(status)
+	messages = [
+		message for message in messages
+		if message.status != status
+		and not (new_rank is not None and MESSAGE_STATUS_RANK.get(message.status, -1) > new_rank)
+	]
+	if not messages:
+		return
+
+	frappe.db.sql("""
+		update `tabWhatsApp Message`
+		set status = %(status)s, error = ifnull(%(error)s, error), modified = %(modified)s
+		where name in %(names)s
+	""", {
+		"status": status,
+		"error": error,
+		"modified": now_datetime(),
+		"names": [message.name for message in messages],
+	})
+	on_message_status_change(messages, status)
+
+	for communication in set(message.communication for message in messages if message.communication):
+		frappe.get_doc("Communication", communication).set_delivery_status(commit=False)
+
+
+def get_utc_isoformat(date):
+	from zoneinfo import ZoneInfo
+	from frappe.utils import get_datetime, get_system_timezone
+
+	date = get_datetime(date).replace(tzinfo=ZoneInfo(get_system_timezone()))
+	return date.astimezone(ZoneInfo("UTC")).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def get_messages_pending_status_reconciliation(limit, exclude_providers=None):
+	"""
+	Fetch WhatsApp messages with status 'Sent' or 'Queued' and that haven't received delivery confirmation.
+	Messages of providers that send status webhooks are only polled once the webhook is overdue.
+	"""
+	provider_condition = ""
+	if exclude_providers:
+		provider_condition = "AND IFNULL(whatsapp_provider, '') NOT IN %(exclude_providers)s"
+
+	webhook_providers = get_status_webhook_providers()
+	if webhook_providers:
+		provider_condition += """
+			AND (IFNULL(whatsapp_provider, '') NOT IN %(webhook_providers)s OR modified < %(webhook_overdue)s)"""
+
 	return frappe.db.sql_list("""
 		SELECT name
 		FROM `tabWhatsApp Message`
@@ -1233,9 +1835,29 @@ def get_messages_pending_status_reconciliation(limit):
 			AND sent_received = 'Sent'
 			AND status_reconciliation_failed = 0
 			AND id IS NOT NULL
+			{provider_condition}
 		ORDER BY creation DESC
-		LIMIT %s
-	""", (limit,), as_dict=True)
+		LIMIT %(limit)s
+	""".format(provider_condition=provider_condition), {
+		"limit": limit,
+		"exclude_providers": exclude_providers,
+		"webhook_providers": webhook_providers,
+		"webhook_overdue": add_to_date(now_datetime(), seconds=-get_status_webhook_grace_period()),
+	}, as_dict=True)
+
+
+def get_status_webhook_providers():
+	providers = ["Twilio"]
+	if frappe.get_cached_value("Freshchat Settings", None, "webhook_public_key"):
+		providers.append("Freshchat")
+	if frappe.get_cached_value("Genesys WhatsApp Settings", None, "webhook_secret"):
+		providers.append("Genesys")
+
+	return providers
+
+
+def get_status_webhook_grace_period():
+	return cint(frappe.conf.get("whatsapp_status_webhook_grace_period")) or 60 * 60
 
 
 @frappe.whitelist(allow_guest=True)
@@ -1268,7 +1890,6 @@ def serve_whatsapp_media(message_doc):
 		file_filters["file_url"] = attachment.get("file_url")
 
 	if file_filters:
-		from werkzeug.utils import send_file
 		import mimetypes
 
 		file = frappe.get_doc("File", file_filters)
@@ -1279,23 +1900,96 @@ def serve_whatsapp_media(message_doc):
 		media_filename = file.original_file_name or file.file_name
 		mimetype = mimetypes.guess_type(media_filename)[0] or "application/octet-stream"
 
-		output = open(media_file_path, "rb")
-		return send_file(
-			output,
-			environ=frappe.local.request.environ,
-			mimetype=mimetype,
+		return send_media_file(
+			media_file_path,
+			file_url=file.file_url,
 			download_name=media_filename,
+			mimetype=mimetype,
+			etag=file.content_hash or attachment.get("content_hash"),
 		)
 
 	elif attachment.get("print_format_attachment") == 1:
 		print_format_file = message_doc.get_print_format_file(attachment)
-		frappe.local.response.filename = print_format_file["fname"]
-		frappe.local.response.filecontent = print_format_file["fcontent"]
-		frappe.local.response.type = "download"
+		return send_media_content(
+			print_format_file["fcontent"],
+			download_name=print_format_file["fname"],
+			mimetype="application/pdf",
+		)
 	else:
 		raise frappe.DoesNotExistError
 
 
+def send_media_file(file_path, file_url, download_name, mimetype, etag=None):
+	"""
+	Respond with a stored media file.
+
+	Private files are handed off to the front proxy with `X-Accel-Redirect` (nginx) or `X-Sendfile`
+	when enabled, so the worker does not stream the file. Otherwise the file is sent by the worker.
+	Both support ETag/If-None-Match, the proxy and werkzeug handle Range requests.
+	"""
+	import os
+	from werkzeug.utils import send_file
+	from werkzeug.wrappers import Response
+
+	offload_mode = get_media_offload_mode()
+	if offload_mode and file_url and file_url.startswith("/private/"):
+		response = Response(mimetype=mimetype)
+		response.headers["Content-Disposition"] = get_content_disposition(download_name)
+		response.last_modified = os.path.getmtime(file_path)
+		if etag:
+			response.set_etag(etag)
+
+		response.make_conditional(frappe.local.request.environ)
+		if response.status_code == 304:
+			return response
+
+		if offload_mode == "X-Sendfile":
+			response.headers["X-Sendfile"] = os.path.abspath(file_path)
+		else:
+			# served by the `/protected/` internal location of the bench nginx config
+			response.headers["X-Accel-Redirect"] = quote(frappe.utils.encode("/protected" + file_url))
+
+		return response
+
+	return send_file(
+		file_path,
+		environ=frappe.local.request.environ,
+		mimetype=mimetype,
+		download_name=download_name,
+		conditional=True,
+		etag=etag or True,
+	)
+
+
+def send_media_content(content, download_name, mimetype):
+	"""Respond with rendered media content, supporting ETag/If-None-Match and Range"""
+	from werkzeug.wrappers import Response
+
+	response = Response(content, mimetype=mimetype)
+	response.headers["Content-Disposition"] = get_content_disposition(download_name)
+	response.set_etag(get_content_hash(content))
+	response.make_conditional(frappe.local.request.environ, accept_ranges=True, complete_length=len(content))
+	return response
+
+
+def get_content_disposition(filename):
+	return "inline; filename*=UTF-8''{0}".format(quote(frappe.utils.encode(filename)))
+
+
+def get_media_offload_mode():
+	"""
+	Returns the header used to offload media to the front proxy.
+	Set `whatsapp_media_offload` in site config to "X-Accel-Redirect" or "X-Sendfile" (or 0 to disable).
+	By default nginx offloading is used if the proxy sends `X-Use-X-Accel-Redirect`, like for private files.
+	"""
+	offload_mode = frappe.conf.get("whatsapp_media_offload")
+	if offload_mode is None and frappe.local.request.headers.get("X-Use-X-Accel-Redirect"):
+		offload_mode = "X-Accel-Redirect"
+
+	if offload_mode in ("X-Accel-Redirect", "X-Sendfile"):
+		return offload_mode
+
+
 class WhatsAppMediaRenderer(BaseRenderer):
 	def can_render(self):
 		path = self.path
@@ -1320,5 +2014,7 @@ class WhatsAppMediaRenderer(BaseRenderer):
 
 def on_doctype_update():
 	frappe.db.add_index('WhatsApp Message', ('status', 'priority', 'creation'), 'index_bulk_flush')
+	frappe.db.add_index('WhatsApp Message', ('status', 'lane', 'priority', 'creation'), 'index_lane_flush')
 	frappe.db.add_index('WhatsApp Message', ('incoming_media_status', 'priority', 'creation'), 'index_incoming_media')
 	frappe.db.add_index('WhatsApp Message', ('`to`', 'status', 'date_sent'), 'index_indirect_reply')
+	frappe.db.add_index('WhatsApp Message', ('conversation', 'creation'), 'index_conversation_thread')
@@ -1,4 +1,41 @@
 frappe.listview_settings['WhatsApp Message'] = {
+	onload: function (listview) {
+		// messages that gave up retrying, either can be requeued
+		listview.page.add_inner_button(__("Failed to Send"), () => {
+			listview.filter_area.clear(false).then(() => {
+				listview.filter_area.add([
+					['WhatsApp Message', 'status', '=', 'Error'],
+				]);
+			});
+		}, __("Dead Letters"));
+
+		listview.page.add_inner_button(__("Media Download Failed"), () => {
+			listview.filter_area.clear(false).then(() => {
+				listview.filter_area.add([
+					['WhatsApp Message', 'incoming_media_status', '=', 'Error'],
+				]);
+			});
+		}, __("Dead Letters"));
+
+		listview.page.add_actions_menu_item(__("Requeue"), () => {
+			let names = listview.get_checked_items(true);
+			frappe.call({
+				method: "twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message.requeue_messages",
+				args: {
+					message_names: names,
+				},
+				freeze: 1,
+				callback: (r) => {
+					frappe.show_alert({
+						message: __("{0} messages requeued", [r.message || 0]),
+						indicator: "green",
+					});
+					listview.refresh();
+				},
+			});
+		}, false);
+	},
+
 	get_indicator: function (doc) {
 		let colour = {
 			'Not Sent': 'grey',
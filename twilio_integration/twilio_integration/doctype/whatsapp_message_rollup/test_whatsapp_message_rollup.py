@@ -0,0 +1,82 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+from unittest.mock import patch
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, now_datetime
+from twilio_integration.twilio_integration import message_rollup
+from twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message import (
+	expire_whatsapp_message_queue,
+	on_message_status_change,
+)
+from twilio_integration.twilio_integration.report.whatsapp_delivery_analytics.whatsapp_delivery_analytics import execute
+
+
+class TestWhatsAppMessageRollup(FrappeTestCase):
+	def setUp(self):
+		# rows of this test are told apart by their template
+		self.template_sid = "HX" + frappe.generate_hash(length=10)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def insert_message(self, status="Not Sent"):
+		return frappe.get_doc({
+			"doctype": "WhatsApp Message",
+			"from_": "whatsapp:+15550000001",
+			"to": "whatsapp:+15550000002",
+			"message": "Hello",
+			"sent_received": "Sent",
+			"status": status,
+			"whatsapp_provider": "Twilio",
+			"template_sid": self.template_sid,
+		}).insert(ignore_permissions=True)
+
+	def flush(self):
+		frappe.db.after_commit.run()
+		with patch.object(frappe.db, "commit"):
+			message_rollup.write_pending_counts()
+
+	def get_rollup_count(self, status, period_type="Day"):
+		return sum(frappe.get_all("WhatsApp Message Rollup", filters={
+			"template_sid": self.template_sid,
+			"period_type": period_type,
+			"status": status,
+		}, pluck="message_count"))
+
+	def get_report_row(self):
+		today = now_datetime().date()
+		columns, data = execute({"from_date": today, "to_date": today, "group_by": "Template"})
+		return next(row for row in data if row.group == self.template_sid)
+
+	def test_expired_messages_are_counted_once(self):
+		for i in range(3):
+			message = self.insert_message()
+			message.db_set("modified", add_to_date(now_datetime(), days=-8), update_modified=False)
+		self.insert_message()
+
+		expire_whatsapp_message_queue()
+		self.flush()
+
+		expired_count = frappe.db.count("WhatsApp Message", {"template_sid": self.template_sid, "status": "Expired"})
+		self.assertEqual(expired_count, 3)
+		self.assertEqual(self.get_rollup_count("Expired", "Hour"), expired_count)
+		self.assertEqual(self.get_rollup_count("Expired", "Day"), expired_count)
+		self.assertEqual(self.get_report_row().expired, expired_count)
+
+	def test_read_after_delivered_is_delivered_once(self):
+		messages = [self.insert_message("Sent") for i in range(2)]
+
+		on_message_status_change(messages, message_rollup.DISPATCHED)
+		on_message_status_change(messages[:1], "Delivered")
+		messages[0].status = "Delivered"
+		on_message_status_change(messages, "Read")
+		self.flush()
+
+		self.assertEqual(self.get_rollup_count("Delivered"), 2)
+		self.assertEqual(self.get_rollup_count("Read"), 2)
+
+		row = self.get_report_row()
+		self.assertEqual(row.dispatched, 2)
+		self.assertEqual(row.delivery_rate, 100)
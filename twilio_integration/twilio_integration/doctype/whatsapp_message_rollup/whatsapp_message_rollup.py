@@ -0,0 +1,13 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class WhatsAppMessageRollup(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("WhatsApp Message Rollup", ("period_type", "period_start"), "index_period")
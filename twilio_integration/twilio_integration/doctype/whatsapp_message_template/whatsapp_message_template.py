@@ -11,6 +11,7 @@ from twilio.base.exceptions import TwilioRestException
 class WhatsAppMessageTemplate(Document):
 	def validate(self):
 		self.validate_button_variable()
+		self.validate_twilio_content_template()
 
 	def validate_button_variable(self):
 		if self.button_variable and self.button_variable not in [d.variable for d in self.parameters]:
@@ -18,6 +19,25 @@ class WhatsAppMessageTemplate(Document):
 				frappe.bold(self.button_variable)
 			))
 
+	def validate_twilio_content_template(self):
+		"""Check the template against the synced Twilio Content Template catalog, if it is a Twilio template"""
+		if not self.template_sid or not frappe.db.exists("Twilio Content Template", self.template_sid):
+			return
+
+		content_template = frappe.get_cached_doc("Twilio Content Template", self.template_sid)
+
+		variables = content_template.get_variables()
+		for variable in (self.media_variable, self.button_variable):
+			if variable and variables and variable not in variables:
+				frappe.msgprint(_("Variable {0} is not defined in Twilio Content Template {1}").format(
+					frappe.bold(variable), frappe.bold(self.template_sid)
+				), indicator="orange")
+
+		if content_template.approval_status and content_template.approval_status != "Approved":
+			frappe.msgprint(_("Twilio Content Template {0} is {1} for WhatsApp").format(
+				frappe.bold(self.template_sid), frappe.bold(content_template.approval_status)
+			), indicator="orange")
+
 	def get_content_variables(self, context):
 		"""
 		Returns a dictionary of variable:value pairs using the parameters child table.
@@ -46,9 +66,7 @@ class WhatsAppMessageTemplate(Document):
 
 @frappe.whitelist()
 def sync_twilio_template(template_sid):
-	from ...twilio_handler import Twilio
-
-	twilio = Twilio.connect()
+	from ..twilio_content_template.twilio_content_template import get_twilio_content_template
 
 	out = frappe._dict({
 		"body": "",
@@ -56,20 +74,12 @@ def sync_twilio_template(template_sid):
 	})
 
 	try:
-		content = twilio.get_whatsapp_template(template_sid)
-		if not content:
+		content_template = get_twilio_content_template(template_sid)
+		if not content_template:
 			frappe.throw(_("Unable to fetch template from Twilio"))
 
-		if content.types.get("twilio/text"):
-			out.body = content.types.get("twilio/text", {}).get("body", "")
-		else:
-			for type, obj in content.types.items():
-				out.body = obj.get("body", "")
-				if out.body:
-					break
-
-		if content.variables:
-			out.variables = content.variables
+		out.body = content_template.body or ""
+		out.variables = content_template.get_variables()
 
 	except TwilioRestException as e:
 		frappe.throw(_("Error fetching template from Twilio: {0}").format(e))
@@ -7,6 +7,7 @@ from frappe.utils import cstr
 from frappe.model.document import Document
 from frappe.utils.jinja import validate_template
 from frappe.utils.safe_exec import safe_exec, get_safe_globals
+from twilio_integration.twilio_integration.profiling import set_trace_reference, slow_trace
 
 
 class WhatsAppReplyHandler(Document):
@@ -17,7 +18,9 @@ class WhatsAppReplyHandler(Document):
 		for d in self.actions:
 			validate_template(cstr(d.reply_message))
 
+	@slow_trace("Reply Handler")
 	def handle_incoming_message(self, incoming_message, context_message):
+		set_trace_reference(self.doctype, self.name)
 		eval_globals = get_safe_globals()
 		context = frappe._dict({
 			"message": cstr(incoming_message.message),
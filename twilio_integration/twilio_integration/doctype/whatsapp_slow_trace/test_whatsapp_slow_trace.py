@@ -0,0 +1,32 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+from unittest.mock import patch
+from frappe.tests.utils import FrappeTestCase
+from twilio_integration.twilio_integration import profiling
+
+
+class TestWhatsAppSlowTrace(FrappeTestCase):
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_slow_trace_is_stored(self):
+		@profiling.slow_trace("Send")
+		def send():
+			profiling.set_trace_reference("WhatsApp Settings", "WhatsApp Settings")
+			frappe.db.sql("select 1")
+
+		with patch.object(profiling, "is_enabled", return_value=True), \
+			patch.object(profiling, "get_threshold", return_value=0), \
+			patch.object(frappe, "enqueue") as enqueue:
+			send()
+
+		profiling.insert_slow_trace(enqueue.call_args.kwargs["trace"])
+
+		trace = frappe.get_last_doc("WhatsApp Slow Trace")
+		self.assertEqual(trace.trace_type, "Send")
+		self.assertEqual(trace.method, f"{__name__}.{send.__qualname__}")
+		self.assertEqual(trace.reference_doctype, "WhatsApp Settings")
+		self.assertEqual(trace.query_count, 1)
+		self.assertIn("select 1", trace.queries)
@@ -0,0 +1,357 @@
+"""
+Stand-in servers for the Twilio, Freshchat and Genesys APIs used by WhatsApp messages, for benchmarks and
+local testing without provider accounts. Each server accepts any credentials, keeps sent messages in
+memory and can add latency, server errors and rate limiting to its responses.
+
+Run one on its own with
+
+	python -m twilio_integration.twilio_integration.fake_providers Freshchat --port 8090 --latency 0.05
+
+and point the provider's API endpoint settings at it. The Twilio client has fixed API hosts, use
+`FakeTwilioHttpClient` to send its requests to the server.
+"""
+
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from datetime import datetime, timezone
+from twilio.http.http_client import TwilioHttpClient
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+PROVIDERS = ("Twilio", "Freshchat", "Genesys")
+
+# a few bytes of a JPEG image served as message media
+MEDIA_CONTENT = bytes.fromhex("ffd8ffe000104a46494600010100000100010000ffd9") + b"\0" * 1024
+
+
+class FakeProviderServer:
+	"""
+	Fake API server of a WhatsApp provider, run in a background thread
+
+	:param provider: Twilio, Freshchat or Genesys
+	:param latency: seconds added to every response
+	:param latency_jitter: up to this many seconds are randomly added to the latency
+	:param error_rate: fraction of requests answered with a 500 error
+	:param rate_limit_rate: fraction of requests answered with a 429 error and a Retry-After header
+	"""
+
+	def __init__(self, provider, port=0, latency=0, latency_jitter=0, error_rate=0, rate_limit_rate=0):
+		if provider not in PROVIDERS:
+			raise ValueError(f"Unknown provider {provider}, expected one of {', '.join(PROVIDERS)}")
+
+		self.provider = provider
+		self.port = port
+		self.latency = latency
+		self.latency_jitter = latency_jitter
+		self.error_rate = error_rate
+		self.rate_limit_rate = rate_limit_rate
+
+		self.messages = {}
+		self.request_count = 0
+		self.response_counts = {}
+		self.lock = threading.Lock()
+
+		self.httpd = None
+		self.thread = None
+
+	@property
+	def base_url(self):
+		return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+	def start(self):
+		handler = type(f"Fake{self.provider}Handler", (HANDLERS[self.provider],), {"server_state": self})
+		self.httpd = ThreadingHTTPServer(("127.0.0.1", self.port), handler)
+		self.httpd.daemon_threads = True
+
+		self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+		self.thread.start()
+		return self.base_url
+
+	def stop(self):
+		if self.httpd:
+			self.httpd.shutdown()
+			self.httpd.server_close()
+			self.thread.join()
+			self.httpd = None
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, *exc):
+		self.stop()
+
+	def add_message(self, message_id, message):
+		message["created_at"] = datetime.now(timezone.utc)
+		with self.lock:
+			self.messages[message_id] = message
+
+	def get_message(self, message_id):
+		with self.lock:
+			return self.messages.get(message_id)
+
+	def get_messages(self):
+		with self.lock:
+			return list(self.messages.items())
+
+	def record_response(self, status_code):
+		with self.lock:
+			self.request_count += 1
+			self.response_counts[status_code] = self.response_counts.get(status_code, 0) + 1
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+	server_state = None
+	protocol_version = "HTTP/1.1"
+
+	# (method, path pattern, handler method name)
+	routes = ()
+
+	def do_GET(self):
+		self.handle_route("GET")
+
+	def do_POST(self):
+		self.handle_route("POST")
+
+	def do_DELETE(self):
+		self.handle_route("DELETE")
+
+	def handle_route(self, method):
+		state = self.server_state
+		url = urlsplit(self.path)
+		self.query = {key: values[0] for key, values in parse_qs(url.query).items()}
+		self.body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+		delay = state.latency + random.uniform(0, state.latency_jitter)
+		if delay:
+			time.sleep(delay)
+
+		draw = random.random()
+		if draw < state.rate_limit_rate:
+			return self.send_json({"message": "Too many requests", "code": 20429}, 429, {"Retry-After": "1"})
+		elif draw < state.rate_limit_rate + state.error_rate:
+			return self.send_json({"message": "Internal server error", "code": 20500}, 500)
+
+		for route_method, pattern, handler in self.routes:
+			match = re.fullmatch(pattern, url.path)
+			if route_method == method and match:
+				return getattr(self, handler)(**match.groupdict())
+
+		self.send_json({"message": f"Not found: {method} {url.path}", "code": 20404}, 404)
+
+	def get_form(self):
+		return {key: values[0] for key, values in parse_qs(self.body.decode()).items()}
+
+	def get_json(self):
+		return json.loads(self.body or b"{}")
+
+	def send_json(self, data, status_code=200, headers=None):
+		self.send_content(json.dumps(data, default=str).encode(), "application/json", status_code, headers)
+
+	def send_content(self, content, content_type, status_code=200, headers=None):
+		self.server_state.record_response(status_code)
+
+		self.send_response(status_code)
+		self.send_header("Content-Type", content_type)
+		self.send_header("Content-Length", str(len(content)))
+		for key, value in (headers or {}).items():
+			self.send_header(key, value)
+		self.end_headers()
+		self.wfile.write(content)
+
+	def send_media(self, **kwargs):
+		self.send_content(MEDIA_CONTENT, "image/jpeg")
+
+	def log_message(self, format, *args):
+		pass
+
+
+class TwilioHandler(FakeProviderHandler):
+	routes = (
+		("POST", r"/2010-04-01/Accounts/(?P<account_sid>\w+)/Messages\.json", "create_message"),
+		("GET", r"/2010-04-01/Accounts/(?P<account_sid>\w+)/Messages/(?P<sid>\w+)\.json", "fetch_message"),
+		("DELETE", r"/2010-04-01/Accounts/(?P<account_sid>\w+)/Recordings/(?P<sid>\w+)\.json", "delete_resource"),
+		("GET", r"/2010-04-01/Accounts/\w+/(Messages/\w+/Media|Recordings)/\w+(\.\w+)?", "send_media"),
+		("GET", r"/media/[\w.-]+", "send_media"),
+		("GET", r"/v1/ContentAndApprovals", "list_content"),
+	)
+
+	def create_message(self, account_sid):
+		form = self.get_form()
+		sid = "SM" + uuid.uuid4().hex
+		message = {
+			"account_sid": account_sid,
+			"api_version": "2010-04-01",
+			"body": form.get("Body"),
+			"from": form.get("From"),
+			"to": form.get("To"),
+			"direction": "outbound-api",
+			"messaging_service_sid": None,
+			"num_media": "1" if form.get("MediaUrl") else "0",
+			"num_segments": "1",
+			"price": None,
+			"price_unit": "USD",
+			"error_code": None,
+			"error_message": None,
+			"sid": sid,
+			"uri": f"/2010-04-01/Accounts/{account_sid}/Messages/{sid}.json",
+			"subresource_uris": {},
+		}
+		self.server_state.add_message(sid, message)
+		self.send_json(self.get_message_resource(message, "queued"), 201)
+
+	def fetch_message(self, account_sid, sid):
+		message = self.server_state.get_message(sid)
+		if not message:
+			return self.send_json({"message": f"Message {sid} was not found", "code": 20404, "status": 404}, 404)
+
+		self.send_json(self.get_message_resource(message, "delivered"))
+
+	def delete_resource(self, account_sid, sid):
+		self.send_content(b"", "application/json", 204)
+
+	def get_message_resource(self, message, status):
+		date_created = format_datetime(message["created_at"], usegmt=True)
+		return dict(
+			{key: value for key, value in message.items() if key != "created_at"},
+			status=status,
+			date_created=date_created,
+			date_updated=date_created,
+			date_sent=date_created if status != "queued" else None,
+		)
+
+	def list_content(self):
+		now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+		contents = [
+			{
+				"sid": f"HX{i:032d}",
+				"account_sid": "AC" + "0" * 32,
+				"friendly_name": f"benchmark_template_{i}",
+				"language": "en",
+				"variables": {"1": "name"},
+				"types": {"twilio/text": {"body": "Hello {{1}}"}},
+				"approval_requests": {"name": f"benchmark_template_{i}", "category": "UTILITY", "status": "approved"},
+				"date_created": now,
+				"date_updated": now,
+				"url": f"https://content.twilio.com/v1/Content/HX{i:032d}",
+			}
+			for i in range(1, 4)
+		]
+		self.send_json({
+			"contents": contents,
+			"meta": {
+				"page": 0,
+				"page_size": len(contents),
+				"first_page_url": "https://content.twilio.com/v1/ContentAndApprovals?PageSize=50&Page=0",
+				"previous_page_url": None,
+				"next_page_url": None,
+				"url": "https://content.twilio.com/v1/ContentAndApprovals?PageSize=50&Page=0",
+				"key": "contents",
+			},
+		})
+
+
+class FreshchatHandler(FakeProviderHandler):
+	routes = (
+		("POST", r"/v2/outbound-messages/whatsapp", "create_message"),
+		("GET", r"/v2/outbound-messages", "list_messages"),
+		("GET", r"/media/[\w.-]+", "send_media"),
+	)
+
+	def create_message(self):
+		request_id = str(uuid.uuid4())
+		self.server_state.add_message(request_id, {"request": self.get_json()})
+		self.send_json({"request_id": request_id}, 202)
+
+	def list_messages(self):
+		"""Messages by `request_id`, or all messages accepted by the server one page at a time"""
+		if self.query.get("request_id"):
+			message = self.server_state.get_message(self.query["request_id"])
+			messages = [(self.query["request_id"], message)] if message else []
+		else:
+			page = int(self.query.get("page") or 1)
+			page_size = int(self.query.get("items_per_page") or 100)
+			messages = self.server_state.get_messages()[(page - 1) * page_size:page * page_size]
+
+		self.send_json({
+			"outbound_messages": [
+				{"request_id": request_id, "status": "DELIVERED", "created_on": message["created_at"].isoformat()}
+				for request_id, message in messages
+			],
+		})
+
+
+class GenesysHandler(FakeProviderHandler):
+	routes = (
+		("POST", r"/oauth/token", "create_token"),
+		("POST", r"/api/v2/conversations/messages/agentless", "create_message"),
+		("GET", r"/api/v2/conversations/messages/(?P<conversation_id>[\w-]+)/messages/(?P<message_id>[\w-]+)",
+			"fetch_message"),
+		("GET", r"/media/[\w.-]+", "send_media"),
+	)
+
+	def create_token(self):
+		self.send_json({"access_token": uuid.uuid4().hex, "token_type": "bearer", "expires_in": 86400})
+
+	def create_message(self):
+		message_id = uuid.uuid4().hex
+		conversation_id = str(uuid.uuid4())
+		self.server_state.add_message(message_id, {"conversation_id": conversation_id, "request": self.get_json()})
+		self.send_json({"id": message_id, "conversationId": conversation_id}, 202)
+
+	def fetch_message(self, conversation_id, message_id):
+		message = self.server_state.get_message(message_id)
+		if not message or message["conversation_id"] != conversation_id:
+			return self.send_json({"message": "Message not found", "code": "not.found"}, 404)
+
+		self.send_json({"id": message_id, "status": "delivery-success"})
+
+
+HANDLERS = {
+	"Twilio": TwilioHandler,
+	"Freshchat": FreshchatHandler,
+	"Genesys": GenesysHandler,
+}
+
+
+class FakeTwilioHttpClient(TwilioHttpClient):
+	"""Sends requests of the Twilio client to a fake server instead of the Twilio API hosts"""
+
+	def __init__(self, base_url, **kwargs):
+		super().__init__(**kwargs)
+		self.base_url = base_url
+
+	def request(self, method, url, *args, **kwargs):
+		parts = urlsplit(url)
+		url = self.base_url + parts.path + (f"?{parts.query}" if parts.query else "")
+		return super().request(method, url, *args, **kwargs)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Run a fake WhatsApp provider API server")
+	parser.add_argument("provider", choices=PROVIDERS)
+	parser.add_argument("--port", type=int, default=8090)
+	parser.add_argument("--latency", type=float, default=0, help="seconds added to every response")
+	parser.add_argument("--latency-jitter", type=float, default=0)
+	parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests failing with 500")
+	parser.add_argument("--rate-limit-rate", type=float, default=0, help="fraction of requests failing with 429")
+	args = parser.parse_args()
+
+	server = FakeProviderServer(args.provider, port=args.port, latency=args.latency,
+		latency_jitter=args.latency_jitter, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate)
+	print(f"Fake {args.provider} API listening on {server.start()}")
+
+	try:
+		server.thread.join()
+	except KeyboardInterrupt:
+		server.stop()
+
+
+if __name__ == "__main__":
+	main()
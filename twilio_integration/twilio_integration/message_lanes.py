@@ -0,0 +1,112 @@
+import frappe
+from frappe.utils import cint
+from redis.exceptions import LockError
+import time
+
+LANES = ("Transactional", "Notification", "Campaign")
+DEFAULT_LANE = "Notification"
+
+# Lanes share the outgoing queue by weight, campaigns are additionally capped in rate (messages per
+# minute) and in concurrent sends so that a bulk send cannot hold up transactional messages.
+# Override per lane with the `whatsapp_lanes` site config, e.g. {"Campaign": {"rate_limit": 1200}}.
+DEFAULT_LANE_CONFIG = {
+	"Transactional": {"weight": 6, "rate_limit": 0, "concurrency": 0, "queue": "short"},
+	"Notification": {"weight": 3, "rate_limit": 0, "concurrency": 0, "queue": "default"},
+	"Campaign": {"weight": 1, "rate_limit": 600, "concurrency": 2, "queue": "long"},
+}
+
+RATE_KEY_PREFIX = "whatsapp_lane_rate"
+SLOT_KEY_PREFIX = "whatsapp_lane_slot"
+SLOT_TIMEOUT = 120  # seconds
+
+
+def get_lane(lane):
+	return lane if lane in LANES else DEFAULT_LANE
+
+
+def get_lane_config(lane):
+	lane = get_lane(lane)
+	config = DEFAULT_LANE_CONFIG[lane].copy()
+	config.update((frappe.conf.get("whatsapp_lanes") or {}).get(lane) or {})
+	return frappe._dict(config)
+
+
+def get_lane_queue(lane):
+	return get_lane_config(lane).queue or "default"
+
+
+def interleave_lanes(messages_by_lane, limit):
+	"""Merge per-lane queues with smooth weighted round robin, each lane gets a share of `limit` by weight
+	and capacity left unused by a lane goes to the others."""
+	queues = {lane: list(messages) for lane, messages in messages_by_lane.items() if messages}
+	weights = {lane: max(cint(get_lane_config(lane).weight), 1) for lane in queues}
+	current = {lane: 0 for lane in queues}
+
+	out = []
+	while queues and len(out) < limit:
+		total = sum(weights[lane] for lane in queues)
+		for lane in queues:
+			current[lane] += weights[lane]
+
+		lane = max(queues, key=lambda l: current[l])
+		current[lane] -= total
+
+		out.append(queues[lane].pop(0))
+		if not queues[lane]:
+			del queues[lane]
+
+	return out
+
+
+def get_remaining_rate_budget(lane):
+	"""Messages the lane may still send in the current minute, None if not rate limited"""
+	rate_limit = cint(get_lane_config(lane).rate_limit)
+	if not rate_limit:
+		return None
+
+	sent = cint(frappe.cache().get(get_rate_key(lane)))
+	return max(rate_limit - sent, 0)
+
+
+def consume_rate_budget(lane):
+	rate_limit = cint(get_lane_config(lane).rate_limit)
+	if not rate_limit:
+		return True
+
+	key = get_rate_key(lane)
+	pipeline = frappe.cache().pipeline()
+	pipeline.incr(key)
+	pipeline.expire(key, 120)
+	sent = cint(pipeline.execute()[0])
+
+	return sent <= rate_limit
+
+
+def acquire_send_slot(lane):
+	"""Returns a lock held while sending, None if the lane has no concurrency limit
+	and False if all its slots are in use."""
+	concurrency = cint(get_lane_config(lane).concurrency)
+	if not concurrency:
+		return None
+
+	for i in range(concurrency):
+		lock = frappe.cache().lock(frappe.cache().make_key(f"{SLOT_KEY_PREFIX}|{get_lane(lane)}|{i}"),
+			timeout=SLOT_TIMEOUT)
+		if lock.acquire(blocking=False):
+			return lock
+
+	return False
+
+
+def release_send_slot(slot):
+	if not slot:
+		return
+
+	try:
+		slot.release()
+	except LockError:
+		pass
+
+
+def get_rate_key(lane):
+	return frappe.cache().make_key(f"{RATE_KEY_PREFIX}|{get_lane(lane)}|{int(time.time() // 60)}")
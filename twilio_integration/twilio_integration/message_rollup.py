@@ -0,0 +1,118 @@
+import frappe
+from frappe.utils import cint, get_datetime, now_datetime
+from redis.exceptions import LockError
+import hashlib
+import json
+
+PENDING_KEY = "whatsapp_message_rollup_pending"
+FLUSH_KEY = "whatsapp_message_rollup_flushing"
+FLUSH_LOCK_KEY = "whatsapp_message_rollup_flush_lock"
+
+PERIOD_TYPES = ("Hour", "Day")
+# counted when a message is handed over to the provider, the base for delivery rates
+DISPATCHED = "Dispatched"
+
+
+def record_status_change(messages, status):
+	"""
+	Count messages moving into `status` for the hourly and daily rollups. Counts are buffered in Redis once
+	the transaction commits and written by `flush_message_rollups`, so status updates do not contend on
+	rollup rows.
+
+	:param messages: documents or dicts with `whatsapp_provider`, `template_sid`, `notification_type`
+		and optionally `error_class`
+	"""
+	if not messages or not status:
+		return
+
+	counts = {}
+	now = now_datetime()
+	for message in messages:
+		for period_type in PERIOD_TYPES:
+			key = json.dumps([
+				period_type,
+				str(get_period_start(now, period_type)),
+				message.get("whatsapp_provider") or "",
+				message.get("template_sid") or "",
+				message.get("notification_type") or "",
+				status,
+				(message.get("error_class") or "") if status == "Error" else "",
+			])
+			counts[key] = counts.get(key, 0) + 1
+
+	frappe.db.after_commit.add(lambda: add_pending_counts(counts))
+
+
+def add_pending_counts(counts):
+	pipeline = frappe.cache().pipeline()
+	for key, count in counts.items():
+		pipeline.hincrby(frappe.cache().make_key(PENDING_KEY), key, count)
+	pipeline.execute()
+
+
+def flush_message_rollups():
+	"""Write buffered counts to WhatsApp Message Rollup, called from scheduler"""
+	cache = frappe.cache()
+	lock = cache.lock(cache.make_key(FLUSH_LOCK_KEY), timeout=300)
+	if not lock.acquire(blocking=False):
+		return
+
+	try:
+		write_pending_counts()
+	finally:
+		try:
+			lock.release()
+		except LockError:
+			pass
+
+
+def write_pending_counts():
+	cache = frappe.cache()
+	pending_key = cache.make_key(PENDING_KEY)
+	flush_key = cache.make_key(FLUSH_KEY)
+
+	# counts of a previous flush that failed are written first
+	if not cache.exists(FLUSH_KEY):
+		if not cache.exists(PENDING_KEY):
+			return
+		cache.rename(pending_key, flush_key)
+
+	for key, count in (cache.execute_command("HGETALL", flush_key) or {}).items():
+		period_type, period_start, provider, template_sid, notification_type, status, error_class = \
+			json.loads(frappe.safe_decode(key))
+
+		name = hashlib.md5(frappe.safe_decode(key).encode()).hexdigest()
+		now = now_datetime()
+
+		frappe.db.sql("""
+			insert into `tabWhatsApp Message Rollup`
+				(name, creation, modified, owner, modified_by, period_type, period_start,
+				whatsapp_provider, template_sid, notification_type, status, error_class, message_count)
+			values
+				(%(name)s, %(now)s, %(now)s, 'Administrator', 'Administrator', %(period_type)s, %(period_start)s,
+				%(provider)s, %(template_sid)s, %(notification_type)s, %(status)s, %(error_class)s, %(count)s)
+			on duplicate key update
+				message_count = message_count + values(message_count), modified = values(modified)
+		""", {
+			"name": name,
+			"now": now,
+			"period_type": period_type,
+			"period_start": period_start,
+			"provider": provider,
+			"template_sid": template_sid,
+			"notification_type": notification_type,
+			"status": status,
+			"error_class": error_class,
+			"count": cint(count),
+		})
+
+	frappe.db.commit()
+	cache.delete_value(FLUSH_KEY)
+
+
+def get_period_start(date, period_type):
+	date = get_datetime(date)
+	if period_type == "Day":
+		return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+	return date.replace(minute=0, second=0, microsecond=0)
@@ -0,0 +1,234 @@
+import frappe
+from frappe import _
+from frappe.utils import cint, convert_utc_to_system_timezone, flt
+from contextlib import contextmanager
+from datetime import datetime
+from werkzeug.wrappers import Response
+import hmac
+import time
+
+METRICS_KEY = "whatsapp_metrics"
+THROUGHPUT_KEY = "whatsapp_metrics_minute"
+THROUGHPUT_RETENTION = 2 * 60 * 60  # seconds
+
+# upper bounds of the histogram buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_HISTOGRAM = "whatsapp_send_stage_seconds"
+MESSAGES_COUNTER = "whatsapp_messages_sent_total"
+
+
+def is_enabled():
+	return not cint(frappe.conf.get("whatsapp_disable_metrics"))
+
+
+class SendTimer:
+	"""Collects stage durations of one send, written to Redis in a single round trip by `flush`"""
+
+	def __init__(self, provider):
+		self.provider = provider or "None"
+		self.observations = []
+		self.counters = []
+		self.previous_timer = None
+		self.start = time.perf_counter()
+
+	@contextmanager
+	def stage(self, stage):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.observations.append((stage, time.perf_counter() - start))
+
+	def count(self, name, label):
+		self.counters.append((name, label))
+
+	def flush(self):
+		self.observations.append(("total", time.perf_counter() - self.start))
+		if not is_enabled():
+			return
+
+		key = frappe.cache().make_key(METRICS_KEY)
+		pipeline = frappe.cache().pipeline()
+		for stage, duration in self.observations:
+			field = f"{STAGE_HISTOGRAM}|{stage}|{self.provider}"
+			pipeline.hincrby(key, f"{field}|{get_bucket(duration)}", 1)
+			pipeline.hincrbyfloat(key, f"{field}|sum", duration)
+			pipeline.hincrby(key, f"{field}|count", 1)
+
+		# counts per minute for throughput
+		minute_key = get_throughput_key(get_minute())
+		for name, label in self.counters:
+			pipeline.hincrby(key, f"{name}|{label}|{self.provider}", 1)
+			pipeline.hincrby(minute_key, f"{label}|{self.provider}", 1)
+
+		if self.counters:
+			pipeline.expire(minute_key, THROUGHPUT_RETENTION)
+
+		try:
+			pipeline.execute()
+		except Exception:
+			# metrics must never fail a send
+			pass
+
+
+def start_send_timer(provider):
+	"""Start timing a send, stages timed with `timed` until `finish_send_timer` are recorded on it"""
+	timer = SendTimer(provider)
+	timer.previous_timer = getattr(frappe.local, "whatsapp_send_timer", None)
+	frappe.local.whatsapp_send_timer = timer
+	return timer
+
+
+def finish_send_timer(timer):
+	frappe.local.whatsapp_send_timer = timer.previous_timer
+	timer.flush()
+
+
+@contextmanager
+def timed(stage):
+	"""Record the duration of a stage on the send being timed, no-op outside a send"""
+	timer = getattr(frappe.local, "whatsapp_send_timer", None)
+	if not timer:
+		yield
+		return
+
+	with timer.stage(stage):
+		yield
+
+
+def get_bucket(duration):
+	for i, upper_bound in enumerate(BUCKETS):
+		if duration <= upper_bound:
+			return i
+
+	return len(BUCKETS)
+
+
+@frappe.whitelist(allow_guest=True)
+def prometheus_metrics():
+	"""Metrics in the Prometheus text format. Authenticate with the `whatsapp_metrics_token` site config as a
+	bearer token, or as a System Manager."""
+	validate_metrics_request()
+
+	return Response(get_prometheus_metrics(), mimetype="text/plain", content_type="text/plain; version=0.0.4")
+
+
+def validate_metrics_request():
+	token = frappe.conf.get("whatsapp_metrics_token")
+	authorization = frappe.get_request_header("Authorization") or ""
+	if token and hmac.compare_digest(authorization, f"Bearer {token}"):
+		return
+
+	frappe.only_for("System Manager")
+
+
+def get_prometheus_metrics():
+	histograms, counters = get_metrics()
+
+	lines = [
+		f"# HELP {STAGE_HISTOGRAM} Duration of WhatsApp send stages",
+		f"# TYPE {STAGE_HISTOGRAM} histogram",
+	]
+	for (stage, provider), histogram in sorted(histograms.items()):
+		labels = f'stage="{stage}",provider="{provider}"'
+		cumulative = 0
+		for i, upper_bound in enumerate(BUCKETS):
+			cumulative += histogram.buckets.get(i, 0)
+			lines.append(f'{STAGE_HISTOGRAM}_bucket{{{labels},le="{upper_bound}"}} {cumulative}')
+		lines.append(f'{STAGE_HISTOGRAM}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+		lines.append(f"{STAGE_HISTOGRAM}_sum{{{labels}}} {histogram.sum}")
+		lines.append(f"{STAGE_HISTOGRAM}_count{{{labels}}} {histogram.count}")
+
+	lines += [
+		f"# HELP {MESSAGES_COUNTER} WhatsApp messages handed to a provider by result",
+		f"# TYPE {MESSAGES_COUNTER} counter",
+	]
+	for (name, label, provider), value in sorted(counters.items()):
+		lines.append(f'{name}{{result="{label}",provider="{provider}"}} {value}')
+
+	return "\n".join(lines) + "\n"
+
+
+def get_metrics():
+	"""Returns histograms by (stage, provider) and counters by (name, label, provider)"""
+	histograms = {}
+	counters = {}
+
+	raw = frappe.cache().execute_command("HGETALL", frappe.cache().make_key(METRICS_KEY)) or {}
+	for field, value in raw.items():
+		parts = frappe.safe_decode(field).split("|")
+		value = frappe.safe_decode(value)
+
+		if parts[0] == STAGE_HISTOGRAM and len(parts) == 4:
+			name, stage, provider, suffix = parts
+			histogram = histograms.setdefault((stage, provider), frappe._dict(buckets={}, sum=0, count=0))
+			if suffix == "sum":
+				histogram.sum = flt(value)
+			elif suffix == "count":
+				histogram.count = cint(value)
+			else:
+				histogram.buckets[cint(suffix)] = cint(value)
+
+		elif len(parts) == 3:
+			counters[tuple(parts)] = cint(value)
+
+	return histograms, counters
+
+
+def get_stage_summary():
+	"""Average duration and count of each stage by provider, for desk pages"""
+	histograms, counters = get_metrics()
+	return [
+		frappe._dict({
+			"stage": stage,
+			"provider": provider,
+			"count": histogram.count,
+			"average": flt(histogram.sum / histogram.count, 4) if histogram.count else 0,
+		})
+		for (stage, provider), histogram in sorted(histograms.items())
+	]
+
+
+def get_throughput(minutes=60):
+	"""
+	Messages per minute over the last `minutes` by provider and result, as chart labels and a series of
+	values for each "provider result" pair
+	"""
+	minutes = min(cint(minutes) or 60, THROUGHPUT_RETENTION // 60)
+	current_minute = get_minute()
+	minute_list = list(range(current_minute - minutes + 1, current_minute + 1))
+
+	pipeline = frappe.cache().pipeline()
+	for minute in minute_list:
+		pipeline.hgetall(get_throughput_key(minute))
+	counts = pipeline.execute()
+
+	series = {}
+	for i, minute_counts in enumerate(counts):
+		for field, value in (minute_counts or {}).items():
+			label, provider = frappe.safe_decode(field).split("|", 1)
+			series.setdefault(f"{provider} {label}", [0] * len(minute_list))[i] = cint(value)
+
+	return frappe._dict({
+		"labels": [
+			convert_utc_to_system_timezone(datetime.utcfromtimestamp(minute * 60)).strftime("%H:%M")
+			for minute in minute_list
+		],
+		"series": series,
+	})
+
+
+def get_throughput_key(minute):
+	return frappe.cache().make_key(f"{THROUGHPUT_KEY}:{minute}")
+
+
+def get_minute():
+	return int(time.time() // 60)
+
+
+@frappe.whitelist()
+def reset_metrics():
+	frappe.only_for("System Manager")
+	frappe.cache().delete_value(METRICS_KEY)
+	return _("WhatsApp metrics reset")
@@ -0,0 +1,130 @@
+import frappe
+from redis.exceptions import ResponseError
+from contextlib import contextmanager
+import os
+import socket
+
+STREAM_KEY = "whatsapp_outbound_stream"
+CONSUMER_GROUP = "whatsapp_dispatcher"
+
+MAX_LENGTH = 100000
+RECLAIM_IDLE = 60 * 1000  # milliseconds before a message not acked by a consumer is taken over
+RECLAIM_INTERVAL = 60  # seconds between scans for messages to take over
+
+
+def is_stream_backend_enabled():
+	"""Outbound messages are queued on a Redis Stream consumed by the dispatcher instead of one job per message.
+	Enable with `"whatsapp_queue_backend": "redis_stream"` in site config."""
+	return frappe.conf.get("whatsapp_queue_backend") == "redis_stream"
+
+
+def publish_message(message_name):
+	"""Add a message to the stream once the current transaction commits"""
+	if not frappe.flags.whatsapp_stream_messages:
+		frappe.flags.whatsapp_stream_messages = []
+		frappe.db.after_commit.add(flush_published_messages)
+		frappe.db.after_rollback.add(discard_published_messages)
+
+	frappe.flags.whatsapp_stream_messages.append(message_name)
+
+
+def flush_published_messages():
+	message_names = frappe.flags.whatsapp_stream_messages or []
+	frappe.flags.whatsapp_stream_messages = None
+	if not message_names:
+		return
+
+	pipeline = frappe.cache().pipeline()
+	for message_name in message_names:
+		pipeline.xadd(get_stream_key(), {"name": message_name}, maxlen=MAX_LENGTH, approximate=True)
+	pipeline.execute()
+
+
+def discard_published_messages():
+	frappe.flags.whatsapp_stream_messages = None
+
+
+def read_messages(count, block):
+	"""
+	Returns (entry id, message name) pairs of new messages for this consumer. Blocks for `block` milliseconds
+	if the stream is empty.
+	"""
+	ensure_consumer_group()
+
+	stream_key = get_stream_key()
+	with handle_missing_group():
+		result = frappe.cache().xreadgroup(CONSUMER_GROUP, get_consumer_name(), {stream_key: ">"},
+			count=count, block=block)
+
+	return get_message_entries(result[0][1] if result else [])
+
+
+def reclaim_messages(count):
+	"""
+	Returns (entry id, message name) pairs of messages left unacknowledged by a consumer that stopped.
+	The pending list is scanned from where the previous call of this process stopped.
+	"""
+	ensure_consumer_group()
+
+	with handle_missing_group():
+		result = frappe.cache().xautoclaim(get_stream_key(), CONSUMER_GROUP, get_consumer_name(),
+			min_idle_time=RECLAIM_IDLE, start_id=frappe.flags.whatsapp_stream_reclaim_cursor or "0-0", count=count)
+
+	if not result:
+		return []
+
+	# cursor is 0-0 once the whole pending list was scanned
+	frappe.flags.whatsapp_stream_reclaim_cursor = frappe.safe_decode(result[0])
+	return get_message_entries(result[1])
+
+
+def get_message_entries(entries):
+	return [
+		(entry_id, frappe.safe_decode(fields.get(b"name") or fields.get("name")))
+		for entry_id, fields in entries
+		if fields
+	]
+
+
+@contextmanager
+def handle_missing_group():
+	try:
+		yield
+	except ResponseError as e:
+		# stream was removed, e.g. Redis was flushed
+		if "NOGROUP" in str(e):
+			frappe.flags.whatsapp_stream_group_created = False
+			frappe.flags.whatsapp_stream_reclaim_cursor = None
+		raise
+
+
+def ack_messages(entry_ids):
+	if not entry_ids:
+		return
+
+	stream_key = get_stream_key()
+	pipeline = frappe.cache().pipeline()
+	pipeline.xack(stream_key, CONSUMER_GROUP, *entry_ids)
+	pipeline.xdel(stream_key, *entry_ids)
+	pipeline.execute()
+
+
+def ensure_consumer_group():
+	if frappe.flags.whatsapp_stream_group_created:
+		return
+
+	try:
+		frappe.cache().xgroup_create(get_stream_key(), CONSUMER_GROUP, id="0", mkstream=True)
+	except ResponseError as e:
+		if "BUSYGROUP" not in str(e):
+			raise
+
+	frappe.flags.whatsapp_stream_group_created = True
+
+
+def get_stream_key():
+	return frappe.cache().make_key(STREAM_KEY)
+
+
+def get_consumer_name():
+	return f"{socket.gethostname()}-{os.getpid()}"
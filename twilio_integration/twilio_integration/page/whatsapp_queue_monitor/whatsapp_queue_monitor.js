@@ -0,0 +1,188 @@
+// Copyright (c) 2026, Frappe and contributors
+// For license information, please see license.txt
+
+frappe.pages['whatsapp-queue-monitor'].on_page_load = function (wrapper) {
+	let page = frappe.ui.make_app_page({
+		parent: wrapper,
+		title: __("WhatsApp Queue Monitor"),
+		single_column: true,
+	});
+
+	wrapper.queue_monitor = new WhatsAppQueueMonitor(page);
+}
+
+frappe.pages['whatsapp-queue-monitor'].on_page_show = function (wrapper) {
+	wrapper.queue_monitor && wrapper.queue_monitor.start();
+}
+
+frappe.pages['whatsapp-queue-monitor'].on_page_hide = function (wrapper) {
+	wrapper.queue_monitor && wrapper.queue_monitor.stop();
+}
+
+class WhatsAppQueueMonitor {
+	constructor(page) {
+		this.page = page;
+		this.refresh_interval = 30 * 1000;
+
+		this.page.set_primary_action(__("Refresh"), () => this.refresh(true), "refresh");
+
+		this.$alerts = $(`<div class="mb-4"></div>`).appendTo(this.page.main);
+		this.$queues = $(`<div class="mb-4"></div>`).appendTo(this.page.main);
+		$(`<h5 class="mb-2">${__("Messages per Minute")}</h5>`).appendTo(this.page.main);
+		this.$chart = $(`<div class="mb-4"></div>`).appendTo(this.page.main);
+		this.$stages = $(`<div class="mb-4"></div>`).appendTo(this.page.main);
+	}
+
+	start() {
+		this.stop();
+		this.refresh();
+		this.timer = setInterval(() => this.refresh(), this.refresh_interval);
+	}
+
+	stop() {
+		clearInterval(this.timer);
+	}
+
+	refresh(force) {
+		frappe.call({
+			method: "twilio_integration.twilio_integration.page.whatsapp_queue_monitor.whatsapp_queue_monitor.get_queue_status",
+			args: {
+				refresh: force ? 1 : 0,
+			},
+			callback: (r) => {
+				if (r.message) {
+					this.render(r.message);
+				}
+			},
+		});
+	}
+
+	render(data) {
+		this.render_alerts(data.open_providers);
+		this.render_queues(data.queues);
+		this.render_throughput(data.throughput);
+		this.render_stages(data.stages);
+	}
+
+	render_alerts(open_providers) {
+		this.$alerts.empty();
+		(open_providers || []).forEach((provider) => {
+			this.$alerts.append(`<div class="alert alert-danger">
+				${__("{0} is failing, sends are paused until it recovers", [frappe.utils.escape_html(provider)])}
+			</div>`);
+		});
+	}
+
+	render_queues(queues) {
+		let rows = (queues.rows || []).map((row) => `<tr>
+			<td>${__(row.queue)}</td>
+			<td>${frappe.utils.escape_html(row.whatsapp_provider || "")}</td>
+			<td>${frappe.utils.escape_html(row.lane || "")}</td>
+			<td class="text-right">${format_number(row.count, null, 0)}</td>
+			<td class="text-right">${row.due == null ? "" : format_number(row.due, null, 0)}</td>
+			<td class="text-right">${row.waiting_for_media ? format_number(row.waiting_for_media, null, 0) : ""}</td>
+			<td class="text-right">${this.format_age(row.age)}</td>
+		</tr>`).join("");
+
+		this.$queues.html(`
+			<table class="table table-bordered">
+				<thead>
+					<tr>
+						<th>${__("Queue")}</th>
+						<th>${__("Provider")}</th>
+						<th>${__("Lane")}</th>
+						<th class="text-right">${__("Messages")}</th>
+						<th class="text-right">${__("Due")}</th>
+						<th class="text-right">${__("Waiting for Media")}</th>
+						<th class="text-right">${__("Oldest")}</th>
+					</tr>
+				</thead>
+				<tbody>
+					${rows || `<tr><td colspan="7" class="text-muted text-center">${__("All queues are empty")}</td></tr>`}
+				</tbody>
+			</table>
+			<div class="text-muted small">
+				${__("Updated {0}", [frappe.datetime.comment_when(queues.generated_at)])}
+			</div>
+		`);
+	}
+
+	render_throughput(throughput) {
+		let datasets = Object.keys(throughput.series || {}).sort().map((name) => ({
+			name: name,
+			values: throughput.series[name],
+		}));
+
+		if (!datasets.length) {
+			this.chart = null;
+			this.$chart.html(`<div class="text-muted">${__("No messages sent in the last hour")}</div>`);
+			return;
+		}
+
+		let data = {
+			labels: throughput.labels,
+			datasets: datasets,
+		};
+
+		if (this.chart && this.chart.data.datasets.length === datasets.length) {
+			this.chart.update(data);
+			return;
+		}
+
+		this.$chart.empty();
+		this.chart = new frappe.Chart(this.$chart[0], {
+			type: "line",
+			height: 240,
+			data: data,
+			axisOptions: {
+				xIsSeries: 1,
+			},
+			lineOptions: {
+				hideDots: 1,
+			},
+		});
+	}
+
+	render_stages(stages) {
+		if (!stages || !stages.length) {
+			this.$stages.empty();
+			return;
+		}
+
+		let rows = stages.map((row) => `<tr>
+			<td>${frappe.utils.escape_html(row.stage)}</td>
+			<td>${frappe.utils.escape_html(row.provider)}</td>
+			<td class="text-right">${format_number(row.count, null, 0)}</td>
+			<td class="text-right">${format_number(row.average * 1000, null, 1)}</td>
+		</tr>`).join("");
+
+		this.$stages.html(`
+			<h5 class="mb-2">${__("Send Stages")}</h5>
+			<table class="table table-bordered">
+				<thead>
+					<tr>
+						<th>${__("Stage")}</th>
+						<th>${__("Provider")}</th>
+						<th class="text-right">${__("Count")}</th>
+						<th class="text-right">${__("Average (ms)")}</th>
+					</tr>
+				</thead>
+				<tbody>${rows}</tbody>
+			</table>
+		`);
+	}
+
+	format_age(seconds) {
+		if (!seconds) {
+			return "";
+		} else if (seconds < 60) {
+			return __("{0}s", [seconds]);
+		} else if (seconds < 3600) {
+			return __("{0}m", [Math.floor(seconds / 60)]);
+		} else if (seconds < 86400) {
+			return __("{0}h {1}m", [Math.floor(seconds / 3600), Math.floor((seconds % 3600) / 60)]);
+		}
+
+		return __("{0}d {1}h", [Math.floor(seconds / 86400), Math.floor((seconds % 86400) / 3600)]);
+	}
+}
@@ -0,0 +1,94 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import cint, now_datetime, time_diff_in_seconds
+from twilio_integration.twilio_integration import circuit_breaker, metrics
+from twilio_integration.twilio_integration.doctype.whatsapp_message.whatsapp_message import (
+	get_status_webhook_providers,
+)
+
+CACHE_KEY = "whatsapp_queue_monitor"
+CACHE_TTL = 30  # seconds
+
+
+@frappe.whitelist()
+def get_queue_status(refresh=False):
+	"""
+	Queue depths and ages, cached as they aggregate over WhatsApp Message, with throughput and stage timings
+	from the send path metrics
+	"""
+	frappe.only_for("System Manager")
+
+	queues = None if cint(refresh) else frappe.cache().get_value(CACHE_KEY)
+	if not queues:
+		queues = frappe._dict({
+			"rows": get_queue_depths(),
+			"generated_at": now_datetime(),
+		})
+		frappe.cache().set_value(CACHE_KEY, queues, expires_in_sec=CACHE_TTL)
+
+	return {
+		"queues": queues,
+		"open_providers": circuit_breaker.get_open_providers(),
+		"throughput": metrics.get_throughput(),
+		"stages": metrics.get_stage_summary(),
+	}
+
+
+def get_queue_depths():
+	now = now_datetime()
+	rows = []
+
+	# Outgoing messages waiting to be sent
+	rows += frappe.db.sql("""
+		select 'Not Sent' as queue, whatsapp_provider, lane,
+			count(*) as count,
+			sum(next_attempt_at is null or next_attempt_at <= %(now)s) as due,
+			sum(outgoing_media_status = 'To Prepare') as waiting_for_media,
+			min(creation) as oldest
+		from `tabWhatsApp Message`
+		where status = 'Not Sent' and sent_received = 'Sent'
+		group by whatsapp_provider, lane
+	""", {"now": now}, as_dict=True)
+
+	# Sends in progress, old ones are stuck
+	rows += frappe.db.sql("""
+		select 'Sending' as queue, whatsapp_provider, lane,
+			count(*) as count,
+			min(modified) as oldest
+		from `tabWhatsApp Message`
+		where status = 'Sending' and sent_received = 'Sent'
+		group by whatsapp_provider, lane
+	""", as_dict=True)
+
+	# Sent messages without a final delivery status
+	rows += frappe.db.sql("""
+		select 'Pending Reconciliation' as queue, whatsapp_provider,
+			count(*) as count,
+			min(creation) as oldest
+		from `tabWhatsApp Message`
+		where status in ('Sent', 'Queued') and sent_received = 'Sent'
+			and status_reconciliation_failed = 0 and id is not null
+		group by whatsapp_provider
+	""", as_dict=True)
+
+	# Received media not yet stored
+	rows += frappe.db.sql("""
+		select if(incoming_media_status = 'To Download', 'Media Download', 'Media Downloading') as queue,
+			whatsapp_provider,
+			count(*) as count,
+			sum(next_attempt_at is null or next_attempt_at <= %(now)s) as due,
+			min(creation) as oldest
+		from `tabWhatsApp Message`
+		where incoming_media_status in ('To Download', 'Downloading') and sent_received = 'Received'
+		group by incoming_media_status, whatsapp_provider
+	""", {"now": now}, as_dict=True)
+
+	webhook_providers = get_status_webhook_providers()
+	for row in rows:
+		row.age = cint(time_diff_in_seconds(now, row.oldest)) if row.oldest else 0
+		if row.queue == "Pending Reconciliation":
+			row.status_webhook = row.whatsapp_provider in webhook_providers
+
+	return rows
@@ -0,0 +1,137 @@
+import frappe
+from frappe.utils import cint, cstr, now_datetime
+from redis.exceptions import LockError
+import json
+import hashlib
+
+CACHE_KEY_PREFIX = "whatsapp_print_format_pdf"
+CACHE_INDEX_KEY = "whatsapp_print_format_pdf_index"
+
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024  # bytes
+DEFAULT_CACHE_EXPIRY = 6 * 60 * 60  # seconds
+RENDER_LOCK_TIMEOUT = 120  # seconds
+
+
+def get_print_format_pdf(attachment):
+	"""Returns `frappe.attach_print` output for a print format attachment.
+
+	Renders are shared through Redis, keyed on the document version and print options, so all
+	messages of one notification fan-out and repeated provider fetches use a single render.
+	"""
+	attachment = attachment.copy()
+	attachment.pop("print_format_attachment", None)
+
+	cache_key = get_cache_key(attachment)
+	if not cache_key:
+		return frappe.attach_print(**attachment)
+
+	print_format_file = get_cached_pdf(cache_key)
+	if print_format_file:
+		return print_format_file
+
+	# Only one worker renders a document version, others wait for its result
+	try:
+		with frappe.cache().lock(frappe.cache().make_key(f"{cache_key}|lock"),
+				timeout=RENDER_LOCK_TIMEOUT, blocking_timeout=RENDER_LOCK_TIMEOUT):
+			print_format_file = get_cached_pdf(cache_key)
+			if not print_format_file:
+				print_format_file = frappe.attach_print(**attachment)
+				set_cached_pdf(cache_key, print_format_file)
+	except LockError:
+		print_format_file = get_cached_pdf(cache_key) or frappe.attach_print(**attachment)
+
+	return print_format_file
+
+
+def get_cache_key(attachment):
+	if not get_cache_size() or not attachment.get("doctype") or not attachment.get("name"):
+		return None
+
+	modified = frappe.db.get_value(attachment.get("doctype"), attachment.get("name"), "modified")
+	if not modified:
+		return None
+
+	key = json.dumps({
+		"doctype": attachment.get("doctype"),
+		"name": attachment.get("name"),
+		"file_name": attachment.get("file_name"),
+		"print_format": attachment.get("print_format"),
+		"letterhead": attachment.get("letterhead"),
+		"print_letterhead": attachment.get("print_letterhead"),
+		"lang": attachment.get("lang") or frappe.local.lang,
+		"modified": cstr(modified),
+	}, sort_keys=True)
+
+	return "{0}|{1}".format(CACHE_KEY_PREFIX, hashlib.md5(key.encode()).hexdigest())
+
+
+def get_cached_pdf(cache_key):
+	print_format_file = frappe.cache().get_value(cache_key)
+	if not print_format_file:
+		return None
+
+	entry = frappe.cache().hget(CACHE_INDEX_KEY, cache_key)
+	if entry:
+		entry["accessed"] = now_datetime().timestamp()
+		frappe.cache().hset(CACHE_INDEX_KEY, cache_key, entry)
+
+	return print_format_file
+
+
+def set_cached_pdf(cache_key, print_format_file):
+	cache_size = get_cache_size()
+	size = len(print_format_file.get("fcontent") or b"")
+
+	# a single document larger than a quarter of the cache would evict everything else
+	if not size or size > cache_size / 4:
+		return
+
+	frappe.cache().set_value(cache_key, print_format_file, expires_in_sec=get_cache_expiry())
+	frappe.cache().hset(CACHE_INDEX_KEY, cache_key, {
+		"size": size,
+		"accessed": now_datetime().timestamp(),
+	})
+
+	evict_cached_pdfs(cache_size)
+
+
+def evict_cached_pdfs(cache_size):
+	"""Remove least recently used renders until the cache fits within `cache_size` bytes."""
+	entries = []
+	for cache_key, entry in (frappe.cache().hgetall(CACHE_INDEX_KEY) or {}).items():
+		cache_key = frappe.safe_decode(cache_key)
+
+		# entries expired from Redis do not count towards the cache size
+		if not frappe.cache().exists(cache_key):
+			frappe.cache().hdel(CACHE_INDEX_KEY, cache_key)
+			continue
+
+		entries.append((entry.get("accessed") or 0, cache_key, cint(entry.get("size"))))
+
+	total_size = sum(size for accessed, cache_key, size in entries)
+	for accessed, cache_key, size in sorted(entries):
+		if total_size <= cache_size:
+			break
+
+		frappe.cache().delete_value(cache_key)
+		frappe.cache().hdel(CACHE_INDEX_KEY, cache_key)
+		total_size -= size
+
+
+def clear_print_format_cache():
+	for cache_key in (frappe.cache().hgetall(CACHE_INDEX_KEY) or {}):
+		frappe.cache().delete_value(frappe.safe_decode(cache_key))
+
+	frappe.cache().delete_value(CACHE_INDEX_KEY)
+
+
+def get_cache_size():
+	cache_size = frappe.conf.get("whatsapp_print_format_cache_size")
+	if cache_size is None:
+		return DEFAULT_CACHE_SIZE
+
+	return cint(cache_size)
+
+
+def get_cache_expiry():
+	return cint(frappe.conf.get("whatsapp_print_format_cache_expiry")) or DEFAULT_CACHE_EXPIRY
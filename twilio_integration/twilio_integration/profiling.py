@@ -0,0 +1,211 @@
+import frappe
+from frappe.utils import cint, flt, now_datetime
+from collections import Counter
+from functools import wraps
+import json
+import os
+import sys
+import threading
+import time
+
+SAMPLING_INTERVAL = 0.01  # seconds
+MAX_STACK_DEPTH = 40
+MAX_STACKS = 100
+MAX_QUERIES = 200
+MAX_QUERY_LENGTH = 1000
+
+
+def slow_trace(trace_type):
+	"""
+	Profile the decorated function when slow traces are enabled in WhatsApp Settings and store a
+	WhatsApp Slow Trace if it runs longer than the threshold. Traces started while another one is running
+	are recorded as spans of the outer trace.
+	"""
+	def decorator(f):
+		@wraps(f)
+		def decorated_function(*args, **kwargs):
+			current_trace = get_current_trace()
+			if current_trace:
+				with current_trace.span(f"{trace_type}: {f.__name__}"):
+					return f(*args, **kwargs)
+
+			if not is_enabled():
+				return f(*args, **kwargs)
+
+			trace = SlowTrace(trace_type, f"{f.__module__}.{f.__qualname__}")
+			trace.start()
+			try:
+				return f(*args, **kwargs)
+			finally:
+				trace.stop()
+
+		return decorated_function
+
+	return decorator
+
+
+def set_trace_reference(reference_doctype, reference_name):
+	"""Link the running trace to a document, the outermost reference is kept"""
+	trace = get_current_trace()
+	if trace and not trace.reference_doctype:
+		trace.reference_doctype = reference_doctype
+		trace.reference_name = reference_name
+
+
+def get_current_trace():
+	return getattr(frappe.local, "whatsapp_slow_trace", None)
+
+
+def is_enabled():
+	return cint(frappe.get_cached_value("WhatsApp Settings", None, "enable_slow_traces"))
+
+
+def get_threshold():
+	return flt(frappe.get_cached_value("WhatsApp Settings", None, "slow_trace_threshold")) or 5
+
+
+class SlowTrace:
+	def __init__(self, trace_type, method):
+		self.trace_type = trace_type
+		self.method = method
+		self.reference_doctype = None
+		self.reference_name = None
+		self.spans = []
+		self.queries = []
+		self.query_count = 0
+		self.query_duration = 0
+		self.sampler = None
+		self.stop_query_capture = None
+		self.started_at = None
+		self.start_time = None
+
+	def start(self):
+		self.started_at = now_datetime()
+		self.start_time = time.perf_counter()
+		frappe.local.whatsapp_slow_trace = self
+
+		self.sampler = StackSampler(threading.get_ident())
+		self.sampler.start()
+		self.stop_query_capture = capture_queries(self.add_query)
+
+	def stop(self):
+		duration = time.perf_counter() - self.start_time
+		frappe.local.whatsapp_slow_trace = None
+		self.sampler.stop()
+		self.stop_query_capture()
+
+		if duration >= get_threshold():
+			self.store(duration)
+
+	def span(self, name):
+		return TraceSpan(self, name)
+
+	def add_query(self, query, duration):
+		self.query_count += 1
+		self.query_duration += duration
+		if len(self.queries) < MAX_QUERIES:
+			self.queries.append({"query": frappe.safe_decode(query)[:MAX_QUERY_LENGTH], "duration": round(duration, 4)})
+
+	def store(self, duration):
+		# stored from a job so that the trace is kept if the traced transaction is rolled back
+		frappe.enqueue(
+			"twilio_integration.twilio_integration.profiling.insert_slow_trace",
+			queue="short",
+			enqueue_after_commit=False,
+			trace={
+				"trace_type": self.trace_type,
+				"method": self.method,
+				"started_at": str(self.started_at),
+				"duration": round(duration, 3),
+				"reference_doctype": self.reference_doctype,
+				"reference_name": self.reference_name,
+				"query_count": self.query_count,
+				"query_duration": round(self.query_duration, 3),
+				"sample_count": self.sampler.sample_count,
+				"profile": self.sampler.get_folded_stacks(),
+				"spans": json.dumps(self.spans, indent=1) if self.spans else None,
+				"queries": json.dumps(self.queries, indent=1) if self.queries else None,
+			},
+		)
+
+
+class TraceSpan:
+	def __init__(self, trace, name):
+		self.trace = trace
+		self.name = name
+		self.start_time = None
+
+	def __enter__(self):
+		self.start_time = time.perf_counter()
+
+	def __exit__(self, *exc):
+		self.trace.spans.append({
+			"name": self.name,
+			"offset": round(self.start_time - self.trace.start_time, 3),
+			"duration": round(time.perf_counter() - self.start_time, 3),
+		})
+
+
+class StackSampler(threading.Thread):
+	"""Samples the stack of a thread at a fixed interval"""
+
+	def __init__(self, thread_id):
+		super().__init__(daemon=True)
+		self.thread_id = thread_id
+		self.stacks = Counter()
+		self.sample_count = 0
+		self.stopped = threading.Event()
+
+	def run(self):
+		while not self.stopped.wait(SAMPLING_INTERVAL):
+			frame = sys._current_frames().get(self.thread_id)
+			if frame:
+				self.stacks[get_stack(frame)] += 1
+				self.sample_count += 1
+
+	def stop(self):
+		self.stopped.set()
+		self.join()
+
+	def get_folded_stacks(self):
+		"""Most frequent stacks as `outer;inner count` lines, the format read by flame graph tools"""
+		return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common(MAX_STACKS))
+
+
+def capture_queries(on_query):
+	"""Call `on_query(query, duration)` after each query of this connection, until the returned function is called"""
+	db = frappe.local.db
+	original_sql = db.__dict__.get("sql")
+	sql = db.sql
+
+	def traced_sql(*args, **kwargs):
+		start = time.perf_counter()
+		try:
+			return sql(*args, **kwargs)
+		finally:
+			on_query(db.last_query or (args[0] if args else ""), time.perf_counter() - start)
+
+	def stop():
+		if original_sql:
+			db.sql = original_sql
+		else:
+			del db.sql
+
+	db.sql = traced_sql
+	return stop
+
+
+def get_stack(frame):
+	frames = []
+	while frame and len(frames) < MAX_STACK_DEPTH:
+		code = frame.f_code
+		frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+		frame = frame.f_back
+
+	return ";".join(reversed(frames))
+
+
+def insert_slow_trace(trace):
+	doc = frappe.new_doc("WhatsApp Slow Trace")
+	doc.update(trace)
+	doc.insert(ignore_permissions=True)
@@ -0,0 +1,46 @@
+// Copyright (c) 2026, Frappe and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["WhatsApp Delivery Analytics"] = {
+	filters: [
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.add_days(frappe.datetime.get_today(), -7),
+			reqd: 1,
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.get_today(),
+			reqd: 1,
+		},
+		{
+			fieldname: "period_type",
+			label: __("Period"),
+			fieldtype: "Select",
+			options: "Day\nHour",
+			default: "Day",
+		},
+		{
+			fieldname: "group_by",
+			label: __("Group By"),
+			fieldtype: "Select",
+			options: "Period\nWhatsApp Provider\nTemplate\nNotification Type\nError Class",
+			default: "Period",
+		},
+		{
+			fieldname: "whatsapp_provider",
+			label: __("WhatsApp Provider"),
+			fieldtype: "Select",
+			options: "\nTwilio\nFreshchat\nGenesys",
+		},
+		{
+			fieldname: "notification_type",
+			label: __("Notification Type"),
+			fieldtype: "Data",
+		},
+	],
+};
@@ -0,0 +1,67 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, flt, getdate
+
+STATUSES = ("Dispatched", "Queued", "Sent", "Delivered", "Read", "Failed", "Undelivered", "Error", "Expired", "Received")
+
+GROUP_BY_FIELDS = {
+	"Period": "period_start",
+	"WhatsApp Provider": "whatsapp_provider",
+	"Template": "template_sid",
+	"Notification Type": "notification_type",
+	"Error Class": "error_class",
+}
+
+
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	group_by = GROUP_BY_FIELDS.get(filters.group_by) or "period_start"
+	return get_columns(filters, group_by), get_data(filters, group_by)
+
+
+def get_columns(filters, group_by):
+	if group_by == "period_start":
+		columns = [{"fieldname": "group", "label": _("Period"), "fieldtype": "Datetime", "width": 160}]
+	else:
+		columns = [{"fieldname": "group", "label": _(filters.group_by), "fieldtype": "Data", "width": 200}]
+
+	for status in STATUSES:
+		columns.append({"fieldname": frappe.scrub(status), "label": _(status), "fieldtype": "Int", "width": 100})
+
+	columns.append({"fieldname": "delivery_rate", "label": _("Delivery Rate %"), "fieldtype": "Percent", "width": 120})
+	return columns
+
+
+def get_data(filters, group_by):
+	conditions = [
+		["period_type", "=", filters.period_type or "Day"],
+		["period_start", ">=", getdate(filters.from_date)],
+		["period_start", "<", add_days(getdate(filters.to_date), 1)],
+	]
+	if filters.whatsapp_provider:
+		conditions.append(["whatsapp_provider", "=", filters.whatsapp_provider])
+	if filters.notification_type:
+		conditions.append(["notification_type", "=", filters.notification_type])
+
+	rows = frappe.get_all("WhatsApp Message Rollup",
+		filters=conditions,
+		fields=[f"{group_by} as `group`", "status", "sum(message_count) as message_count"],
+		group_by=f"{group_by}, status",
+		order_by=f"{group_by} asc",
+	)
+
+	data = {}
+	for row in rows:
+		group = row.group or _("Not Set")
+		data.setdefault(group, frappe._dict({"group": group}))
+		data[group][frappe.scrub(row.status)] = row.message_count
+
+	# Delivered counts every message that reached Delivered or Read once, so the rate includes read messages
+	for row in data.values():
+		if row.dispatched:
+			row.delivery_rate = flt((row.delivered or 0) / row.dispatched * 100, 2)
+
+	return list(data.values())
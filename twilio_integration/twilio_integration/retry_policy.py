@@ -0,0 +1,96 @@
+import frappe
+from frappe.utils import add_to_date, cint, now_datetime
+from twilio.base.exceptions import TwilioRestException
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import random
+import requests
+
+# Retries allowed per class of error, override with the `whatsapp_retry_limits` site config,
+# e.g. {"Rate Limited": 20}. Errors caused by the request itself are not worth retrying often.
+DEFAULT_RETRY_LIMITS = {
+	"Timeout": 8,
+	"Rate Limited": 10,
+	"Server Error": 6,
+	"Client Error": 1,
+	"Other": 3,
+}
+TRANSPORT_ERROR_CLASSES = ("Timeout", "Rate Limited", "Server Error")
+
+BASE_DELAY = 30  # seconds
+MAX_DELAY = 6 * 60 * 60  # seconds
+
+
+def get_error_class(exc):
+	if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+		return "Timeout"
+
+	status_code = cint(get_status_code(exc))
+	if status_code == 429:
+		return "Rate Limited"
+	elif status_code >= 500:
+		return "Server Error"
+	elif status_code >= 400:
+		return "Client Error"
+
+	return "Other"
+
+
+def is_transport_error(exc):
+	"""Timeouts, connection errors, rate limiting and server errors. Other errors are specific to a message."""
+	return get_error_class(exc) in TRANSPORT_ERROR_CLASSES
+
+
+def should_retry(retry, error_class):
+	return cint(retry) < get_retry_limit(error_class)
+
+
+def get_retry_limit(error_class):
+	limits = DEFAULT_RETRY_LIMITS.copy()
+	limits.update(frappe.conf.get("whatsapp_retry_limits") or {})
+	return cint(limits.get(error_class, limits["Other"]))
+
+
+def get_next_attempt_at(retry, exc=None):
+	"""Exponential backoff with jitter, a provider's Retry-After is honoured if it is longer"""
+	delay = min(BASE_DELAY * 2 ** cint(retry), MAX_DELAY)
+	delay = random.uniform(delay / 2, delay)
+
+	retry_after = get_retry_after(exc)
+	if retry_after:
+		delay = max(delay, min(retry_after, MAX_DELAY))
+
+	return add_to_date(now_datetime(), seconds=int(delay))
+
+
+def get_status_code(exc):
+	if isinstance(exc, requests.HTTPError) and exc.response is not None:
+		return exc.response.status_code
+	elif isinstance(exc, TwilioRestException):
+		return exc.status
+
+
+def get_retry_after(exc):
+	"""
+	Seconds to wait from the Retry-After header of a failed request, given as seconds or an HTTP date.
+	Errors raised by the Twilio client do not carry response headers, their backoff is not extended.
+	"""
+	response = getattr(exc, "response", None)
+	if response is None or not hasattr(response, "headers"):
+		return None
+
+	retry_after = (response.headers.get("Retry-After") or "").strip()
+	if not retry_after:
+		return None
+	elif retry_after.isdigit():
+		return int(retry_after)
+
+	try:
+		retry_at = parsedate_to_datetime(retry_after)
+	except (TypeError, ValueError):
+		return None
+
+	if retry_at.tzinfo is None:
+		retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+	return max(int((retry_at - datetime.now(timezone.utc)).total_seconds()), 0)
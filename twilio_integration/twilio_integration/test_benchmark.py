@@ -0,0 +1,26 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import unittest
+from twilio_integration.twilio_integration.benchmark import get_percentile
+
+
+class TestBenchmark(unittest.TestCase):
+	def test_percentiles(self):
+		values = list(range(100, 0, -1))
+
+		self.assertEqual(get_percentile(values, 50), 50)
+		self.assertEqual(get_percentile(values, 95), 95)
+		self.assertEqual(get_percentile(values, 99), 99)
+		self.assertEqual(get_percentile(values, 100), 100)
+
+	def test_percentile_rounds_up_to_a_measured_value(self):
+		values = [0.3, 0.1, 0.2]
+
+		self.assertEqual(get_percentile(values, 50), 0.2)
+		self.assertEqual(get_percentile(values, 95), 0.3)
+		self.assertEqual(get_percentile(values, 0), 0.1)
+
+	def test_percentile_of_no_values(self):
+		self.assertIsNone(get_percentile([], 50))
+		self.assertIsNone(get_percentile(None, 95))
@@ -0,0 +1,66 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from twilio_integration.twilio_integration import call_log
+from twilio_integration.twilio_integration.call_log import apply_call_log_update, merge_call_log_updates
+
+CALL_SID = "CA00000000000000000000000000000001"
+
+
+def get_entry(**values):
+	return json.dumps(dict(values, id=CALL_SID))
+
+
+class TestCallLog(unittest.TestCase):
+	def apply(self, values, twilio_status="completed", exists=False):
+		twilio = MagicMock()
+		twilio.get_call_info.return_value = frappe._dict({"status": twilio_status, "duration": 42})
+		doc = MagicMock()
+
+		with patch.object(call_log.Twilio, "connect", return_value=twilio), \
+			patch.object(call_log.frappe.db, "exists", return_value=exists), \
+			patch.object(call_log.frappe, "new_doc", return_value=doc), \
+			patch.object(call_log.frappe, "get_doc", return_value=doc):
+			apply_call_log_update(CALL_SID, values)
+
+		return twilio, doc.update.call_args.args[0] if doc.update.called else None
+
+	def test_fetched_status_replaces_merged_create_status(self):
+		updates = merge_call_log_updates([
+			get_entry(type="Incoming", status="Ringing", **{"from": "+15550000001", "to": "+15550000002"}),
+			get_entry(fetch_call_info=1),
+		])
+
+		twilio, values = self.apply(updates[CALL_SID])
+		self.assertEqual(values["status"], "Completed")
+		self.assertEqual(values["duration"], 42)
+		self.assertEqual(values["type"], "Incoming")
+
+	def test_explicit_status_of_fetch_entry_is_kept(self):
+		updates = merge_call_log_updates([
+			get_entry(type="Incoming", status="Ringing"),
+			get_entry(status="No Answer", fetch_call_info=1),
+		])
+
+		twilio, values = self.apply(updates[CALL_SID])
+		self.assertEqual(values["status"], "No Answer")
+
+	def test_status_after_fetch_entry_is_kept(self):
+		updates = merge_call_log_updates([
+			get_entry(fetch_call_info=1),
+			get_entry(status="Busy"),
+		])
+
+		twilio, values = self.apply(updates[CALL_SID], exists=True)
+		self.assertEqual(values["status"], "Busy")
+
+	def test_call_not_logged_is_not_fetched(self):
+		updates = merge_call_log_updates([get_entry(recording_url="https://api.twilio.com/rec", fetch_call_info=1)])
+
+		twilio, values = self.apply(updates[CALL_SID])
+		twilio.get_call_info.assert_not_called()
+		self.assertIsNone(values)
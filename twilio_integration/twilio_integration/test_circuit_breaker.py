@@ -0,0 +1,96 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+import requests
+import time
+import unittest
+from unittest.mock import patch
+from twilio_integration.twilio_integration import circuit_breaker
+
+PROVIDER = "Twilio"
+
+
+class TestCircuitBreaker(unittest.TestCase):
+	def setUp(self):
+		# state is kept apart from the site's real circuits
+		test_run = frappe.generate_hash(length=10)
+		get_key = circuit_breaker.get_key
+		patchers = [
+			patch.object(circuit_breaker, "get_key",
+				side_effect=lambda provider, *args: get_key(f"test|{test_run}|{provider}", *args)),
+			patch.dict(frappe.local.conf, {
+				"whatsapp_circuit_breaker_window": 3600,
+				"whatsapp_circuit_breaker_min_calls": 4,
+				"whatsapp_circuit_breaker_failure_rate": 0.5,
+				"whatsapp_circuit_breaker_open_duration": 60,
+			}),
+		]
+		for patcher in patchers:
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+		self.addCleanup(circuit_breaker.close_circuit, PROVIDER)
+
+	def record_failures(self, count):
+		for i in range(count):
+			circuit_breaker.record_failure(PROVIDER, requests.Timeout())
+
+	def open_circuit(self):
+		self.record_failures(4)
+		self.assertTrue(circuit_breaker.is_open(PROVIDER))
+
+	def test_closed_below_min_calls(self):
+		self.record_failures(3)
+		self.assertFalse(circuit_breaker.is_open(PROVIDER))
+		self.assertTrue(circuit_breaker.allow_request(PROVIDER))
+
+	def test_opens_at_failure_rate(self):
+		for i in range(3):
+			circuit_breaker.record_success(PROVIDER)
+		self.record_failures(2)
+		self.assertFalse(circuit_breaker.is_open(PROVIDER))
+
+		self.record_failures(1)
+		self.assertTrue(circuit_breaker.is_open(PROVIDER))
+		self.assertFalse(circuit_breaker.allow_request(PROVIDER))
+		self.assertIn(PROVIDER, circuit_breaker.get_open_providers())
+
+	def test_errors_of_a_message_are_not_counted(self):
+		for i in range(10):
+			circuit_breaker.record_failure(PROVIDER, frappe.ValidationError())
+
+		self.assertFalse(circuit_breaker.is_open(PROVIDER))
+
+	def test_half_open_lets_one_probe_through(self):
+		self.open_circuit()
+
+		with patch.object(circuit_breaker.time, "time", return_value=time.time() + 61):
+			self.assertFalse(circuit_breaker.is_open(PROVIDER))
+			self.assertTrue(circuit_breaker.allow_request(PROVIDER))
+			self.assertFalse(circuit_breaker.allow_request(PROVIDER))
+
+	def test_successful_probe_closes_circuit(self):
+		self.open_circuit()
+
+		with patch.object(circuit_breaker.time, "time", return_value=time.time() + 61):
+			self.assertTrue(circuit_breaker.allow_request(PROVIDER))
+
+		circuit_breaker.record_success(PROVIDER)
+		self.assertFalse(circuit_breaker.is_open(PROVIDER))
+		self.assertTrue(circuit_breaker.allow_request(PROVIDER))
+
+		# failures before the circuit opened are not counted again
+		self.record_failures(3)
+		self.assertFalse(circuit_breaker.is_open(PROVIDER))
+
+	def test_failed_probe_reopens_circuit(self):
+		self.open_circuit()
+
+		probe_time = time.time() + 61
+		with patch.object(circuit_breaker.time, "time", return_value=probe_time):
+			self.assertTrue(circuit_breaker.allow_request(PROVIDER))
+			self.record_failures(1)
+
+			self.assertTrue(circuit_breaker.is_open(PROVIDER))
+			self.assertFalse(circuit_breaker.allow_request(PROVIDER))
@@ -0,0 +1,65 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+import unittest
+from unittest.mock import patch
+from twilio_integration.twilio_integration.message_lanes import interleave_lanes
+
+
+def get_messages(lane, count):
+	return [f"{lane}-{i}" for i in range(count)]
+
+
+class TestMessageLanes(unittest.TestCase):
+	def setUp(self):
+		# lane weights of the default config, 6:3:1
+		patcher = patch.dict(frappe.local.conf, {"whatsapp_lanes": {}})
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_lanes_share_limit_by_weight(self):
+		messages = interleave_lanes({
+			"Transactional": get_messages("Transactional", 20),
+			"Notification": get_messages("Notification", 20),
+			"Campaign": get_messages("Campaign", 20),
+		}, 10)
+
+		lanes = [message.split("-")[0] for message in messages]
+		self.assertEqual(len(messages), 10)
+		self.assertEqual(lanes.count("Transactional"), 6)
+		self.assertEqual(lanes.count("Notification"), 3)
+		self.assertEqual(lanes.count("Campaign"), 1)
+
+	def test_lanes_are_interleaved(self):
+		messages = interleave_lanes({
+			"Transactional": get_messages("Transactional", 20),
+			"Campaign": get_messages("Campaign", 20),
+		}, 14)
+
+		# smooth round robin spreads the campaign messages instead of sending them in a burst
+		campaign_positions = [i for i, message in enumerate(messages) if message.startswith("Campaign")]
+		self.assertEqual(len(campaign_positions), 2)
+		self.assertGreater(campaign_positions[1] - campaign_positions[0], 1)
+
+	def test_unused_share_goes_to_other_lanes(self):
+		messages = interleave_lanes({
+			"Transactional": get_messages("Transactional", 2),
+			"Campaign": get_messages("Campaign", 20),
+		}, 10)
+
+		self.assertEqual(len(messages), 10)
+		self.assertEqual(sum(message.startswith("Transactional") for message in messages), 2)
+
+	def test_order_within_lane_is_kept(self):
+		messages = interleave_lanes({
+			"Notification": get_messages("Notification", 5),
+			"Campaign": get_messages("Campaign", 5),
+		}, 10)
+
+		self.assertEqual([m for m in messages if m.startswith("Notification")], get_messages("Notification", 5))
+		self.assertEqual([m for m in messages if m.startswith("Campaign")], get_messages("Campaign", 5))
+
+	def test_empty_lanes(self):
+		self.assertEqual(interleave_lanes({"Transactional": [], "Campaign": []}, 10), [])
+		self.assertEqual(interleave_lanes({"Campaign": get_messages("Campaign", 3)}, 0), [])
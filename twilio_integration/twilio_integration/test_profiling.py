@@ -0,0 +1,53 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+import unittest
+from unittest.mock import patch
+from twilio_integration.twilio_integration import profiling
+from twilio_integration.twilio_integration.profiling import capture_queries, slow_trace
+
+
+class TestProfiling(unittest.TestCase):
+	def test_queries_are_counted_until_stopped(self):
+		queries = []
+		sql = frappe.db.sql
+		stop = capture_queries(lambda query, duration: queries.append(query))
+
+		frappe.db.sql("select 1")
+		frappe.db.sql("select 2")
+		stop()
+		frappe.db.sql("select 3")
+
+		self.assertEqual(len(queries), 2)
+		self.assertIn("select 2", queries[1])
+		self.assertEqual(frappe.db.sql, sql)
+
+	def test_nested_traces_are_spans_of_the_outer_trace(self):
+		@slow_trace("Reply Handler")
+		def inner():
+			frappe.db.sql("select 1")
+
+		@slow_trace("Send")
+		def outer():
+			inner()
+			inner()
+
+		with patch.object(profiling, "is_enabled", return_value=True), \
+			patch.object(profiling, "get_threshold", return_value=0), \
+			patch.object(frappe, "enqueue") as enqueue:
+			outer()
+
+		trace = enqueue.call_args.kwargs["trace"]
+		self.assertEqual(trace["trace_type"], "Send")
+		self.assertEqual(trace["query_count"], 2)
+		self.assertEqual(len(frappe.parse_json(trace["spans"])), 2)
+		self.assertIsNone(profiling.get_current_trace())
+
+	def test_fast_trace_is_not_stored(self):
+		with patch.object(profiling, "is_enabled", return_value=True), \
+			patch.object(profiling, "get_threshold", return_value=60), \
+			patch.object(frappe, "enqueue") as enqueue:
+			slow_trace("Send")(lambda: frappe.db.sql("select 1"))()
+
+		enqueue.assert_not_called()
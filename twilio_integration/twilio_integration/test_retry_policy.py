@@ -0,0 +1,58 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+import requests
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from frappe.utils import add_to_date
+from twilio_integration.twilio_integration import retry_policy
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def get_rate_limited_error(retry_after):
+	response = requests.Response()
+	response.status_code = 429
+	response.headers["Retry-After"] = retry_after
+	return requests.HTTPError(response=response)
+
+
+class TestRetryPolicy(unittest.TestCase):
+	def get_next_attempt_at(self, retry, exc=None, jitter=max):
+		with patch.object(retry_policy, "now_datetime", return_value=NOW), \
+			patch.object(retry_policy.random, "uniform", side_effect=lambda a, b: jitter(a, b)):
+			return retry_policy.get_next_attempt_at(retry, exc)
+
+	def test_backoff_doubles_with_each_retry(self):
+		self.assertEqual(self.get_next_attempt_at(0), add_to_date(NOW, seconds=30))
+		self.assertEqual(self.get_next_attempt_at(1), add_to_date(NOW, seconds=60))
+		self.assertEqual(self.get_next_attempt_at(3), add_to_date(NOW, seconds=240))
+
+	def test_jitter_waits_at_least_half_the_delay(self):
+		self.assertEqual(self.get_next_attempt_at(2, jitter=min), add_to_date(NOW, seconds=60))
+
+	def test_backoff_is_capped(self):
+		self.assertEqual(self.get_next_attempt_at(20), add_to_date(NOW, seconds=retry_policy.MAX_DELAY))
+
+	def test_longer_retry_after_is_honoured(self):
+		self.assertEqual(self.get_next_attempt_at(0, get_rate_limited_error("600")), add_to_date(NOW, seconds=600))
+
+	def test_shorter_retry_after_keeps_backoff(self):
+		self.assertEqual(self.get_next_attempt_at(3, get_rate_limited_error("5")), add_to_date(NOW, seconds=240))
+
+	def test_retry_after_is_capped(self):
+		self.assertEqual(self.get_next_attempt_at(0, get_rate_limited_error(str(retry_policy.MAX_DELAY * 2))),
+			add_to_date(NOW, seconds=retry_policy.MAX_DELAY))
+
+	def test_retry_after_http_date(self):
+		with patch.object(retry_policy, "datetime") as mock_datetime:
+			mock_datetime.now.return_value = datetime(2026, 1, 1, 12, 0, 0, tzinfo=retry_policy.timezone.utc)
+			retry_after = retry_policy.get_retry_after(get_rate_limited_error("Thu, 01 Jan 2026 12:15:00 GMT"))
+
+		self.assertEqual(retry_after, 900)
+
+	def test_invalid_retry_after_is_ignored(self):
+		self.assertIsNone(retry_policy.get_retry_after(get_rate_limited_error("soon")))
+		self.assertIsNone(retry_policy.get_retry_after(frappe.ValidationError()))
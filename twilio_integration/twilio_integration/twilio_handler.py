@@ -6,12 +6,25 @@ from twilio.request_validator import RequestValidator
 
 import frappe
 from frappe import _
-from frappe.utils.password import get_decrypted_password
+from frappe.utils import flt, now_datetime
 from .utils import get_public_url, merge_dicts
-from functools import wraps
+from .profiling import slow_trace
+from functools import wraps, cached_property
 import requests
 import base64
 
+VOICE_ROUTING_TABLE_CACHE_KEY = "twilio_voice_routing_table"
+AGENT_PRESENCE_CACHE_KEY = "twilio_agent_presence"
+AGENT_PRESENCE_STATUSES = ('available', 'busy', 'offline')
+AGENT_PRESENCE_TTL = 90  # seconds, the softphone heartbeats every 30 seconds
+AGENT_LAST_BUSY_CACHE_KEY = "twilio_agent_last_busy"
+AGENT_LAST_BUSY_TTL = 24 * 60 * 60  # seconds, refreshed whenever an agent becomes busy
+MAX_SIMULTANEOUS_DIAL = 10  # maximum nouns Twilio dials in parallel
+VOICE_ACCESS_TOKEN_CACHE_KEY = "twilio_voice_access_token"
+
+# Twilio connection per site, reused across requests of a process
+_connections = {}
+
 
 class Twilio:
 	"""Twilio connector over TwilioClient.
@@ -24,18 +37,36 @@ class Twilio:
 		self.account_sid = settings.account_sid
 		self.application_sid = settings.twiml_sid
 		self.api_key = settings.api_key
-		self.api_secret = settings.get_password("api_secret")
-		self.twilio_client = self.get_twilio_client()
+
+	@cached_property
+	def api_secret(self):
+		return self.settings.get_password("api_secret")
+
+	@cached_property
+	def auth_token(self):
+		return self.settings.get_password("auth_token")
+
+	@cached_property
+	def twilio_client(self):
+		"""Client is built on first use, generating TwiML does not need it.
+		"""
+		return TwilioClient(self.account_sid, self.auth_token)
 
 	@classmethod
 	def connect(cls):
 		"""Make a twilio connection.
+		The connection is reused by the process until Twilio Settings are changed,
+		so that credentials are decrypted and the client is built once.
 		"""
-		settings = frappe.get_doc("Twilio Settings")
+		settings = frappe.get_cached_doc("Twilio Settings")
 		if not (settings and settings.enabled):
 			frappe.throw(_("Twilio is not enabled"))
 
-		return Twilio(settings=settings)
+		twilio = _connections.get(frappe.local.site)
+		if not twilio or twilio.settings.modified != settings.modified:
+			twilio = _connections[frappe.local.site] = Twilio(settings=settings)
+
+		return twilio
 
 	def get_phone_numbers(self):
 		"""Get account's twilio phone numbers.
@@ -60,6 +91,27 @@ class Twilio:
 		token.add_grant(voice_grant)
 		return token.to_jwt()
 
+	def get_voice_access_token(self, from_number: str, identity: str, ttl=60*60):
+		"""Returns the identity's cached voice access token, a new one is generated when half of its ttl is over.
+		"""
+		cache_key = f"{VOICE_ACCESS_TOKEN_CACHE_KEY}|{identity}"
+		cached_token = frappe.cache().get_value(cache_key, expires=True)
+		if (
+			cached_token
+			and cached_token.get('from_number') == from_number
+			and cached_token.get('api_key') == self.api_key
+		):
+			return cached_token['token']
+
+		token = frappe.safe_decode(self.generate_voice_access_token(from_number, identity, ttl=ttl))
+		frappe.cache().set_value(cache_key, {
+			'token': token,
+			'from_number': from_number,
+			'api_key': self.api_key,
+		}, expires_in_sec=ttl // 2)
+
+		return token
+
 	@classmethod
 	def safe_identity(cls, identity: str):
 		"""Create a safe identity by replacing unsupported special charaters `@` with (at)).
@@ -109,16 +161,32 @@ class Twilio:
 		resp.append(dial)
 		return resp
 
+	def generate_twilio_simultaneous_dial_response(self, from_number: str, attenders, ring_tone='at'):
+		"""Generates voice call instructions to ring all attenders (Phones and computers) in parallel.
+		The call is connected to whoever answers first.
+		"""
+		resp = VoiceResponse()
+		dial = Dial(
+			caller_id=from_number if any(d['call_receiving_device'] == 'Phone' for d in attenders) else None,
+			ring_tone=ring_tone,
+			record=self.settings.record_calls,
+			recording_status_callback=self.get_recording_status_callback_url(),
+			recording_status_callback_event='completed'
+		)
+		for attender in attenders[:MAX_SIMULTANEOUS_DIAL]:
+			if attender['call_receiving_device'] == 'Phone':
+				dial.number(attender['mobile_no'])
+			else:
+				dial.client(self.safe_identity(attender['name']))
+		resp.append(dial)
+		return resp
+
 	@classmethod
 	def get_twilio_client(cls):
-		twilio_settings = frappe.get_doc("Twilio Settings")
-		if not twilio_settings.enabled:
+		if not frappe.get_cached_value("Twilio Settings", None, "enabled"):
 			frappe.throw(_("Please enable twilio settings before sending WhatsApp messages"))
 
-		auth_token = get_decrypted_password("Twilio Settings", "Twilio Settings", 'auth_token')
-		client = TwilioClient(twilio_settings.account_sid, auth_token)
-
-		return client
+		return cls.connect().twilio_client
 
 	@classmethod
 	def get_whatsapp_template(cls, template_sid):
@@ -129,13 +197,9 @@ class Twilio:
 
 	@classmethod
 	def download_media_request(cls, media_url):
-		settings = frappe.get_doc("Twilio Settings")
-		if not settings.enabled:
-			frappe.throw(_("Twilio is not enabled"))
+		twilio = cls.connect()
 
-		auth_token = get_decrypted_password("Twilio Settings", "Twilio Settings", 'auth_token')
-
-		credentials = f"{settings.account_sid}:{auth_token}"
+		credentials = f"{twilio.account_sid}:{twilio.auth_token}"
 		encoded_credentials = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
 		headers = {
 			'Authorization': f'Basic {encoded_credentials}'
@@ -168,14 +232,21 @@ class IncomingCall:
 		* Check call attender settings and forward the call to Phone
 		"""
 		twilio = Twilio.connect()
+		routing_strategy = twilio.settings.call_routing_strategy or 'First Available'
 		owners = get_twilio_number_owners(self.to_number)
-		attender = get_the_call_attender(owners)
+		attenders = get_call_attenders(owners, routing_strategy)
 
-		if not attender:
+		if not attenders:
 			resp = VoiceResponse()
 			resp.say(_('Agent is unavailable to take the call, please call after some time.'))
 			return resp
 
+		if routing_strategy == 'Simultaneous Ring':
+			return twilio.generate_twilio_simultaneous_dial_response(self.from_number, attenders)
+
+		attender = attenders[0]
+		set_agent_last_busy(attender['name'])
+
 		if attender['call_receiving_device'] == 'Phone':
 			return twilio.generate_twilio_dial_response(self.from_number, attender['mobile_no'])
 		else:
@@ -222,6 +293,14 @@ class TwilioCallDetails:
 		}
 
 
+def get_user_twilio_number(user):
+	"""Get the twilio number the user is using, from the voice routing table.
+	"""
+	for phone_number, owners in get_voice_routing_table().items():
+		if user in owners:
+			return phone_number
+
+
 def get_twilio_number_owners(phone_number):
 	"""Get list of users who is using the phone_number.
 	>>> get_twilio_number_owners('+11234567890')
@@ -230,56 +309,151 @@ def get_twilio_number_owners(phone_number):
 		'owner2': {....}
 	}
 	"""
+	return get_voice_routing_table().get(phone_number) or {}
+
+
+def get_voice_routing_table():
+	"""Get phone number wise owners from cache, built from Voice Call Settings when not cached.
+	"""
+	return frappe.cache().get_value(VOICE_ROUTING_TABLE_CACHE_KEY, generator=build_voice_routing_table)
+
+
+def build_voice_routing_table():
+	"""Build the twilio number -> owners routing table.
+	>>> build_voice_routing_table()
+	{
+		'+11234567890': {'owner1': {...}, 'owner2': {...}},
+	}
+	"""
 	user_voice_settings = frappe.get_all(
 		'Voice Call Settings',
-		filters={'twilio_number': phone_number},
-		fields=["name", "call_receiving_device"]
+		filters={'twilio_number': ['is', 'set']},
+		fields=["name", "twilio_number", "call_receiving_device"]
 	)
 	user_wise_voice_settings = {user['name']: user for user in user_voice_settings}
 
 	user_general_settings = frappe.get_all(
 		'User',
-		filters = [['name', 'IN', user_wise_voice_settings.keys()]],
+		filters = [['name', 'IN', list(user_wise_voice_settings.keys()) or ['']], ['enabled', '=', 1]],
 		fields = ['name', 'mobile_no']
 	)
 	user_wise_general_settings = {user['name']: user for user in user_general_settings}
 
-	return merge_dicts(user_wise_general_settings, user_wise_voice_settings)
+	routing_table = {}
+	for name, details in merge_dicts(user_wise_general_settings, user_wise_voice_settings).items():
+		phone_number = details.pop('twilio_number')
+		routing_table.setdefault(phone_number, {})[name] = details
+
+	return routing_table
+
+
+def clear_voice_access_tokens():
+	"""Invalidate cached voice access tokens of all users, called on change of Twilio Settings.
+	"""
+	frappe.cache().delete_keys(VOICE_ACCESS_TOKEN_CACHE_KEY)
+
+
+def clear_voice_routing_table(doc=None, method=None, *args):
+	"""Invalidate the voice routing table, called on change of Voice Call Settings and User.
+	"""
+	if (
+		doc and doc.doctype == 'User' and method == 'on_update'
+		and not (doc.has_value_changed('mobile_no') or doc.has_value_changed('enabled'))
+	):
+		return
+
+	frappe.cache().delete_value(VOICE_ROUTING_TABLE_CACHE_KEY)
+
+
+def set_agent_presence(user, status):
+	"""Record presence of an agent's browser softphone, refreshed by its heartbeat.
+	"""
+	if status not in AGENT_PRESENCE_STATUSES:
+		frappe.throw(_("Invalid presence status {0}").format(status))
+
+	if status == 'busy':
+		set_agent_last_busy(user)
+
+	if status == 'offline':
+		frappe.cache().delete_value(get_agent_presence_key(user))
+	else:
+		frappe.cache().set_value(get_agent_presence_key(user), status, expires_in_sec=AGENT_PRESENCE_TTL)
+
+
+def get_agent_presence(user):
+	"""Returns `available` or `busy` if the agent's softphone is registered, else None.
+	"""
+	return frappe.cache().get_value(get_agent_presence_key(user), expires=True)
 
 
-def get_active_loggedin_users(users):
-	"""Filter the current loggedin users from the given users list
+def get_available_agents(users):
+	"""Filter the users whose softphone is registered and not on a call
 	"""
-	rows = frappe.db.sql("""
-		SELECT `user`
-		FROM `tabSessions`
-		WHERE `user` IN %(users)s
-		""", {'users': users})
-	return [row[0] for row in set(rows)]
+	return [user for user in users if get_agent_presence(user) == 'available']
+
+
+def get_agent_presence_key(user):
+	return f"{AGENT_PRESENCE_CACHE_KEY}|{user}"
+
+
+def set_agent_last_busy(user):
+	"""Record when the agent was last routed a call or finished one. Times expire a day after the last call
+	of any agent, agents without a time are routed first.
+	"""
+	key = frappe.cache().make_key(AGENT_LAST_BUSY_CACHE_KEY)
+	pipeline = frappe.cache().pipeline()
+	pipeline.hset(key, user, now_datetime().timestamp())
+	pipeline.expire(key, AGENT_LAST_BUSY_TTL)
+	pipeline.execute()
+
+
+def get_agents_last_busy(users):
+	if not users:
+		return {}
+
+	values = frappe.cache().execute_command("HMGET", frappe.cache().make_key(AGENT_LAST_BUSY_CACHE_KEY), *users)
+	return {user: flt(frappe.safe_decode(value)) if value else 0 for user, value in zip(users, values)}
 
 
 def get_the_call_attender(owners):
 	"""Get attender details from list of owners
 	"""
-	if not owners: return
-	current_loggedin_users = get_active_loggedin_users(list(owners.keys()))
+	attenders = get_call_attenders(owners)
+	return attenders[0] if attenders else None
+
+
+def get_call_attenders(owners, routing_strategy='First Available'):
+	"""Get the owners who can attend a call, ordered by the routing strategy
+	* First Available: in owners order
+	* Simultaneous Ring: in owners order, all of them are dialed
+	* Least Recently Busy: agent whose last call is the oldest first
+	"""
+	if not owners: return []
+	available_agents = get_available_agents(list(owners.keys()))
+
+	attenders = []
 	for name, details in owners.items():
 		if ((details['call_receiving_device'] == 'Phone' and details['mobile_no']) or
-			(details['call_receiving_device'] == 'Computer' and name in current_loggedin_users)):
-			return details
+			(details['call_receiving_device'] == 'Computer' and name in available_agents)):
+			attenders.append(details)
+
+	if routing_strategy == 'Least Recently Busy':
+		last_busy = get_agents_last_busy([d['name'] for d in attenders])
+		attenders.sort(key=lambda d: last_busy[d['name']])
+
+	return attenders
 
 
 def validate_twilio_request(f):
 	"""Validates that incoming requests genuinely originated from Twilio"""
+	traced_function = slow_trace("Webhook")(f)
+
 	@wraps(f)
 	def decorated_function(*args, **kwargs):
-		twilio_settings = frappe.get_doc("Twilio Settings")
-		if not twilio_settings.enabled:
+		if not frappe.get_cached_value("Twilio Settings", None, "enabled"):
 			frappe.throw(_("Twilio is not enabled"), exc=frappe.PermissionError)
 
-		auth_token = get_decrypted_password("Twilio Settings", "Twilio Settings", 'auth_token')
-
-		validator = RequestValidator(auth_token)
+		validator = RequestValidator(Twilio.connect().auth_token)
 
 		request_valid = validator.validate(
 			frappe.request.url,
@@ -290,7 +464,7 @@ def validate_twilio_request(f):
 		# Continue processing the request if it's valid, return a 403 error if
 		# it's not
 		if request_valid:
-			return f(*args, **kwargs)
+			return traced_function(*args, **kwargs)
 		else:
 			frappe.throw(_("Invalid Signature"), exc=frappe.PermissionError)
 